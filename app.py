@@ -18,7 +18,7 @@ import time
 try:
     from dropdown_component import simple_multiselect_dropdown
     from popup import show_welcome_screen
-    from calculate_business_days import calculate_business_days
+    from calculate_business_days import business_days, business_days_per_month
     from fullscreen_image_component import create_fullscreen_image_viewer
 except ImportError:
     st.warning("Componentes 'dropdown_component', 'popup', 'calculate_business_days' ou 'fullscreen_image_component' não encontrados. Alguns recursos podem não funcionar como esperado.")
@@ -27,10 +27,31 @@ except ImportError:
         return st.multiselect(label, options, default=default_selected, key=key)
     def show_welcome_screen():
         return False
-    def calculate_business_days(start, end):
-        if pd.isna(start) or pd.isna(end):
-            return None
-        return np.busday_count(pd.to_datetime(start).date(), pd.to_datetime(end).date())
+    try:
+        # O bloco acima falha inteiro se qualquer componente faltar; os dias úteis podem estar disponíveis
+        from calculate_business_days import business_days, business_days_per_month
+    except ImportError:
+        # Mesma regra de calculate_business_days.business_days, só sem feriados: extremos inclusos,
+        # negativo quando o fim vem antes do início e NaN quando falta alguma data
+        def business_days(start, end):
+            index = start.index if isinstance(start, pd.Series) else None
+            escalar = np.ndim(start) == 0 and np.ndim(end) == 0
+            inicio, fim = np.broadcast_arrays(
+                np.asarray(pd.to_datetime(start if np.ndim(start) else [start]), dtype='datetime64[ns]'),
+                np.asarray(pd.to_datetime(end if np.ndim(end) else [end]), dtype='datetime64[ns]'),
+            )
+            validos = ~(np.isnat(inicio) | np.isnat(fim))
+            sinal = np.where(fim[validos] < inicio[validos], -1, 1)
+            dia_inicio, dia_fim = inicio[validos].astype('datetime64[D]'), fim[validos].astype('datetime64[D]')
+            dias = np.full(inicio.shape, np.nan)
+            dias[validos] = np.busday_count(
+                np.minimum(dia_inicio, dia_fim), np.maximum(dia_inicio, dia_fim) + np.timedelta64(1, 'D')
+            ) * sinal
+            if escalar:
+                return float(dias[0])
+            return pd.Series(dias, index=index) if index is not None else dias
+        def business_days_per_month():
+            return 21.75
     def create_fullscreen_image_viewer(img_path):
         st.info(f"Componente de visualização de imagem em tela cheia não carregado. Imagem: {img_path}")
 
@@ -38,24 +59,37 @@ except ImportError:
 @st.cache_resource
 def load_data_processing_scripts():
     try:
-        from processa_venda_registro import tratar_e_retornar_dados_previstos
-        from processa_venda_smartsheet import main as processar_smartsheet_main
-        return tratar_e_retornar_dados_previstos, processar_smartsheet_main
+        from processa_venda_registro import tratar_e_retornar_previstos_por_etapa
+        from processa_venda_smartsheet import obter_dados_processados
+        return tratar_e_retornar_previstos_por_etapa, obter_dados_processados
     except ImportError:
         st.warning("Scripts de processamento não encontrados. O app usará dados de exemplo.")
         return None, None
 
-tratar_e_retornar_dados_previstos, processar_smartsheet_main = load_data_processing_scripts()
+tratar_e_retornar_previstos_por_etapa, obter_dados_smartsheet = load_data_processing_scripts()
 # ============================================
 # CONFIGURAÇÃO DE AUTO-REFRESH (3 HORAS)
 # ============================================
 import logging
+import os
+import threading
+from collections import OrderedDict
 import pytz
+from filelock import FileLock, Timeout
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # Constante de TTL para cache (3 horas)
 TTL_HOURS = 3
 TTL_SECONDS = TTL_HOURS * 60 * 60  # 10800 segundos
 
+# Cache compartilhado entre réplicas (volume comum): snapshot Parquet + metadados,
+# protegido por trava de arquivo para que só um processo busque os dados por TTL
+DIRETORIO_CACHE_DADOS = os.getenv("DIRETORIO_CACHE_DADOS", ".cache_dados")
+VERSAO_CACHE_DADOS = 1  # incrementar quando construir_dados mudar o formato do DataFrame
+ESPERA_MAXIMA_TRAVA = 600  # segundos esperando outro processo terminar a atualização
+INTERVALO_NOVA_TENTATIVA = 300  # segundos entre tentativas automáticas após uma atualização falhar
+
 # Logging para monitoramento de refresh
 logging.basicConfig(
     format='%(asctime)s [AUTO-REFRESH] %(message)s',
@@ -81,20 +115,32 @@ def abreviar_nome(nome):
     
     return nome
 
-@st.cache_data
-def converter_porcentagem(valor):
-    if pd.isna(valor) or valor == '': return 0.0
-    if isinstance(valor, str):
-        valor = ''.join(c for c in valor if c.isdigit() or c in ['.', ',']).replace(',', '.').strip()
-        if not valor: return 0.0
-    try:
-        val_float = float(valor)
-        # Ajuste para tolerância de ponto flutuante: considera 1.0001 como 1.0 (100%)
-        # Valores muito baixos (ex: 0.01 = 1%) também serão multiplicados (ex: 1.0)
-        # Assumiremos que valores <= 1.5 sejam decimais, para evitar erros com "1.00000001"
-        return val_float * 100 if val_float <= 1.01 else val_float
-    except (ValueError, TypeError):
-        return 0.0
+# Valores até este limite são frações (0.5 = 50%); a folga cobre ruído de ponto flutuante (1.0001 = 100%)
+LIMITE_FRACAO_PORCENTAGEM = 1.01
+
+def converter_porcentagens(valores):
+    """
+    Converte uma coluna de porcentagens para float em pontos percentuais (0-100).
+
+    Textos mantêm só dígitos, "." e "," (vírgula vira ponto); vazios e inválidos
+    viram 0. Valores <= LIMITE_FRACAO_PORCENTAGEM são frações e são multiplicados
+    por 100. Feita uma vez na carga; o resto do app usa a coluna já convertida.
+    """
+    valores = pd.Series(valores)
+    numeros = pd.to_numeric(valores, errors='coerce')
+
+    if pd.api.types.infer_dtype(valores, skipna=True) in ('string', 'mixed', 'mixed-integer', 'empty'):
+        textos = valores.str.len().notna()  # .str só dá resultado para elementos texto
+        if textos.any():
+            limpos = (
+                valores[textos]
+                .str.replace(r'[^\d.,]', '', regex=True)
+                .str.replace(',', '.', regex=False)
+            )
+            numeros[textos] = pd.to_numeric(limpos, errors='coerce')
+
+    numeros = numeros.astype(float).fillna(0.0)
+    return numeros.where(numeros > LIMITE_FRACAO_PORCENTAGEM, numeros * 100)
 
 @st.cache_data
 def formatar_data(data):
@@ -103,9 +149,8 @@ def formatar_data(data):
 @st.cache_data
 def calcular_dias_uteis(inicio, fim):
     if pd.notna(inicio) and pd.notna(fim):
-        data_inicio = np.datetime64(inicio.date())
-        data_fim = np.datetime64(fim.date())
-        return np.busday_count(data_inicio, data_fim) + 1
+        # Mesmo calendário (com feriados) de business_days
+        return int(business_days(inicio, fim))
     return 0
 
 @st.cache_data
@@ -137,9 +182,9 @@ def calcular_variacao_termino(termino_real, termino_previsto):
     Retorna uma tupla (texto_variacao, cor_variacao)
     """
     if pd.notna(termino_real) and pd.notna(termino_previsto):
-        # Usando a função calculate_business_days importada no início
-        diferenca_dias = calculate_business_days(termino_previsto, termino_real)
-        if pd.isna(diferenca_dias): diferenca_dias = 0 # Lidar com casos em que calculate_business_days retorna NA
+        # Usando a função business_days importada no início
+        diferenca_dias = business_days(termino_previsto, termino_real)
+        diferenca_dias = 0 if pd.isna(diferenca_dias) else int(diferenca_dias) # business_days retorna NaN sem data
         
         if diferenca_dias > 0:
             # Atrasado - vermelho
@@ -159,7 +204,7 @@ def calcular_porcentagem_correta(grupo):
     if '% concluído' not in grupo.columns:
         return 0.0
     
-    porcentagens = grupo['% concluído'].astype(str).apply(converter_porcentagem)
+    porcentagens = pd.to_numeric(grupo['% concluído'], errors='coerce')
     porcentagens = porcentagens[(porcentagens >= 0) & (porcentagens <= 100)]
     
     if len(porcentagens) == 0:
@@ -240,13 +285,13 @@ for setor, etapas in SETOR.items():
     for etapa in etapas:
         SETOR_POR_ETAPA[etapa] = setor
 
-def padronizar_etapa(etapa_str):
-    if pd.isna(etapa_str): return 'UNKNOWN'
-    etapa_limpa = str(etapa_str).strip().upper()
-    if etapa_limpa in mapeamento_variacoes_real: return mapeamento_variacoes_real[etapa_limpa]
-    if etapa_limpa in nome_completo_para_sigla: return nome_completo_para_sigla[etapa_limpa]
-    if etapa_limpa in sigla_para_nome_completo: return etapa_limpa
-    return 'UNKNOWN'
+# Tabela única de padronização de etapas (variações do Smartsheet/planejador, nomes completos e siglas)
+ETAPA_NAO_ESPECIFICADA = "Não especificado"
+TABELA_ETAPAS = {
+    **{sigla: sigla for sigla in ORDEM_ETAPAS_GLOBAL},
+    **nome_completo_para_sigla,
+    **mapeamento_variacoes_real,
+}
 
 # --- Funções de Filtragem e Ordenação ---
 @st.cache_data
@@ -255,55 +300,21 @@ def filtrar_etapas_nao_concluidas(df):
         return df
     
     df_copy = df.copy()
-    df_copy['% concluído'] = df_copy['% concluído'].apply(converter_porcentagem)
+    df_copy['% concluído'] = pd.to_numeric(df_copy['% concluído'], errors='coerce')
     df_filtrado = df_copy[df_copy['% concluído'] < 100]
     return df_filtrado
 
-@st.cache_data
-def obter_data_meta_assinatura(df_original, empreendimento):
-    df_meta = df_original[(df_original['Empreendimento'] == empreendimento) & (df_original['Etapa'] == 'M')]
-    
-    if df_meta.empty:
-        return pd.Timestamp.max
-    
-    if pd.notna(df_meta['Termino_Prevista'].iloc[0]):
-        return df_meta['Termino_Prevista'].iloc[0]
-    elif pd.notna(df_meta['Inicio_Prevista'].iloc[0]):
-        return df_meta['Inicio_Prevista'].iloc[0]
-    elif pd.notna(df_meta['Termino_Real'].iloc[0]):
-        return df_meta['Termino_Real'].iloc[0]
-    elif pd.notna(df_meta['Inicio_Real'].iloc[0]):
-        return df_meta['Inicio_Real'].iloc[0]
-    else:
-        return pd.Timestamp.max
-
-@st.cache_data
-def criar_ordenacao_empreendimentos(df_original):
-    empreendimentos_meta = {}
-    
-    for empreendimento in df_original['Empreendimento'].unique():
-        data_meta = obter_data_meta_assinatura(df_original, empreendimento)
-        empreendimentos_meta[empreendimento] = data_meta
-        # empreendimentos_meta[empreendimento] = data_meta # Removido para usar a linha abaixo
-    
-    empreendimentos_ordenados = sorted(
-        empreendimentos_meta.keys(),
-        key=lambda x: empreendimentos_meta[x]
-    )
-    
-    return empreendimentos_ordenados
-
 @st.cache_data
 def aplicar_ordenacao_final(df, empreendimentos_ordenados):
     if df.empty:
         return df
     
     ordem_empreendimentos = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados)}
-    df['ordem_empreendimento'] = df['Empreendimento'].map(ordem_empreendimentos)
+    df['ordem_empreendimento'] = mapear_valores(df['Empreendimento'], ordem_empreendimentos)
     # df['Empreendimento_Abreviado'] = df['Empreendimento'].apply(abreviar_nome) # Removido para evitar conflito
     
     ordem_etapas = {etapa: idx for idx, etapa in enumerate(ORDEM_ETAPAS_GLOBAL)}
-    df['ordem_etapa'] = df['Etapa'].map(ordem_etapas).fillna(len(ordem_etapas))
+    df['ordem_etapa'] = mapear_valores(df['Etapa'], ordem_etapas).fillna(len(ordem_etapas))
     
     df_ordenado = df.sort_values(['ordem_empreendimento', 'ordem_etapa']).drop(
         ['ordem_empreendimento', 'ordem_etapa'], axis=1
@@ -326,36 +337,24 @@ def aplicar_regra_definicao_modulo(df_completo):
         return df_completo
 
     df_modificado = df_completo.copy()
-    
-    # Itera sobre cada empreendimento individualmente
-    for empreendimento in df_modificado['Empreendimento'].unique():
-        # Filtra os dados apenas para o empreendimento atual
-        indices_empreendimento = df_modificado[df_modificado['Empreendimento'] == empreendimento].index
-        
-        # Localiza a etapa de Módulo e as outras etapas
-        indice_dm = df_modificado[(df_modificado['Empreendimento'] == empreendimento) & (df_modificado['Etapa'] == ETAPA_MODULO)].index
-        
-        # Verifica se existe alguma outra etapa com 100% concluído
-        outras_etapas_100 = df_modificado[(df_modificado['Empreendimento'] == empreendimento) & 
-                                         (df_modificado['Etapa'] != ETAPA_MODULO) & 
-                                         (df_modificado['% concluído'].astype(str).apply(converter_porcentagem) >= 100)]
-        
-        # Se a etapa DM existe e não tem Termino_Real e outras etapas estão 100%
-        if not indice_dm.empty:
-            dm_row = df_modificado.loc[indice_dm[0]]
-            
-            # Verifica se Termino_Real está vazio/NaN
-            termino_real_vazio = pd.isna(dm_row.get('Termino_Real'))
-            
-            if termino_real_vazio and not outras_etapas_100.empty:
-                # Aplica 100% de conclusão
-                df_modificado.loc[indice_dm[0], '% concluído'] = 100.0
-                # Opcional: Se necessário, você pode querer preencher Inicio_Real e Termino_Real com as datas da primeira etapa 100%
-                # Por exemplo, usando a data de Termino_Real da primeira etapa 100%
-                # if 'Termino_Real' in outras_etapas_100.columns and pd.notna(outras_etapas_100['Termino_Real'].iloc[0]):
-                #     df_modificado.loc[indice_dm[0], 'Termino_Real'] = outras_etapas_100['Termino_Real'].iloc[0]
-                pass # Manter apenas a alteração de % concluído por enquanto
-                
+    empreendimento = df_modificado['Empreendimento']
+    percentual = pd.to_numeric(df_modificado['% concluído'], errors='coerce')
+    e_dm = (df_modificado['Etapa'] == ETAPA_MODULO).to_numpy()
+
+    # Alguma outra etapa do mesmo empreendimento está 100% concluída (uma passada para todos)
+    outra_etapa_100 = pd.Series(~e_dm & (percentual >= 100).to_numpy(), index=df_modificado.index)
+    tem_outra_100 = outra_etapa_100.groupby(empreendimento, observed=True).transform('any')
+    tem_outra_100 = tem_outra_100.eq(True).to_numpy()  # empreendimento vazio (NaN) fica fora
+
+    # Só a primeira linha DM de cada empreendimento, e apenas se não tiver Termino_Real
+    primeira_dm = e_dm & empreendimento.notna().to_numpy()
+    primeira_dm[primeira_dm] = ~empreendimento[primeira_dm].duplicated().to_numpy()
+    if 'Termino_Real' in df_modificado.columns:
+        termino_real_vazio = df_modificado['Termino_Real'].isna().to_numpy()
+    else:
+        termino_real_vazio = np.ones(len(df_modificado), dtype=bool)
+
+    df_modificado.loc[primeira_dm & termino_real_vazio & tem_outra_100, '% concluído'] = 100.0
     return df_modificado
 
 # --- Funções do Novo Gráfico Gantt ---
@@ -373,7 +372,7 @@ def calcular_periodo_datas(df, meses_padding_inicio=1, meses_padding_fim=36):
     colunas_data = ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]
     for col in colunas_data:
         if col in df.columns:
-            datas_validas = pd.to_datetime(df[col], errors='coerce').dropna()
+            datas_validas = df[col].dropna()
             datas.extend(datas_validas.tolist())
 
     if not datas:
@@ -392,221 +391,183 @@ def calcular_dias_uteis_novo(data_inicio, data_fim):
     # Esta função é a mesma que calcular_dias_uteis, mas mantida para compatibilidade
     return calcular_dias_uteis(data_inicio, data_fim)
 
-def obter_data_meta_assinatura_novo(df_empreendimento):
-    # Esta função é a mesma que obter_data_meta_assinatura, mas mantida para compatibilidade
-    # No contexto do novo código, a etapa 'M' (Demanda Mínima) é a meta de assinatura
-    df_meta = df_empreendimento[df_empreendimento["Etapa"] == "M"]
-    if df_meta.empty:
-        return None
-    
-    # MODIFICAÇÃO AQUI: Prioridade alterada para Inicio_Prevista primeiro
-    for col in ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]:
-        if col in df_meta.columns and pd.notna(df_meta[col].iloc[0]):
-            return pd.to_datetime(df_meta[col].iloc[0])
-    return None
-
-# --- CÓDIGO MODIFICADO ---
-def converter_dados_para_gantt(df):
-    # Conversão explícita de colunas de data para datetime
-    for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-
-    if df.empty:
-        return []
-
-    gantt_data = []
-
-    for empreendimento in df["Empreendimento"].unique():
-        df_emp = df[df["Empreendimento"] == empreendimento].copy()
+def calcular_metricas_etapas(df_agg, inicio_real_como_fallback=True, agora=None):
+    """
+    Acrescenta ao agregado (Empreendimento, Etapa) as métricas exibidas nos Gantts:
+    datas efetivas (com as mesmas regras de preenchimento das views), durações em
+    dias úteis e corridos, VT, VD e status_color_class. Calculado uma vez por
+    agregado; a montagem das tasks só formata estas colunas.
+
+    Na visão por projeto o início/término previsto vazio cai para o real; na
+    consolidada (inicio_real_como_fallback=False) vai direto para hoje/+30 dias.
+    'agora' é o instante de referência (padrão: o atual); quem guarda o resultado
+    em cache passa o mesmo instante usado na chave.
+    """
+    df = df_agg.copy()
+    agora = pd.Timestamp.now() if agora is None else pd.Timestamp(agora)
+    hoje = agora.normalize()
+
+    progresso = df["% concluído"] if "% concluído" in df.columns else pd.Series(0, index=df.index)
+    inicio_real = df["Inicio_Real"]
+    termino_real = df["Termino_Real"]
+
+    inicio = df["Inicio_Prevista"]
+    termino = df["Termino_Prevista"]
+    if inicio_real_como_fallback:
+        inicio = inicio.fillna(inicio_real)
+        termino = termino.fillna(termino_real)
+    inicio = inicio.fillna(agora)
+    termino = termino.fillna(inicio + pd.Timedelta(days=30))
+
+    df["Inicio_Efetivo"] = inicio
+    df["Termino_Efetivo"] = termino
+    df["Termino_Real_Visual"] = termino_real.mask(
+        inicio_real.notna() & (progresso < 100) & termino_real.isna(), agora
+    )
 
-        # DEBUG: Verificar etapas disponíveis
-        etapas_disponiveis = df_emp["Etapa"].unique()
-        print(f"=== ETAPAS PARA {empreendimento} ===")
-        print(f"Etapas disponíveis: {etapas_disponiveis}")
-        
-        tasks = []
-        
-        # CORREÇÃO: Garantir que todas as etapas da ORDEM_ETAPAS_GLOBAL sejam incluídas
-        # mesmo que não estejam presentes nos dados
-        etapas_para_processar = []
-        
-        for etapa_sigla in ORDEM_ETAPAS_GLOBAL:
-            # Verificar se esta etapa existe nos dados
-            etapa_data = df_emp[df_emp["Etapa"] == etapa_sigla]
-            if not etapa_data.empty:
-                # Se existe, adicionar todas as linhas desta etapa
-                for idx, row in etapa_data.iterrows():
-                    etapas_para_processar.append((etapa_sigla, row))
-            else:
-                # Se não existe, criar uma linha vazia para manter a ordem
-                etapas_para_processar.append((etapa_sigla, None))
-        
-        print(f"Etapas ordenadas para processamento: {[e[0] for e in etapas_para_processar]}")
-
-        for i, (etapa_sigla, row) in enumerate(etapas_para_processar):
-            if row is None:
-                # Criar task vazia para etapa que não existe nos dados
-                etapa_nome_completo = sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
-                task = {
-                    "id": f"t{i}", 
-                    "name": etapa_nome_completo,
-                    "name_sigla": etapa_sigla,
-                    "numero_etapa": i + 1,
-                    "start_previsto": None,
-                    "end_previsto": None,
-                    "start_real": None,
-                    "end_real": None,
-                    "end_real_original_raw": None,
-                    "setor": "Não especificado",
-                    "grupo": GRUPO_POR_ETAPA.get(etapa_sigla, "Não especificado"),
-                    "progress": 0,
-                    "inicio_previsto": "N/D",
-                    "termino_previsto": "N/D",
-                    "inicio_real": "N/D",
-                    "termino_real": "N/D",
-                    "duracao_prev_meses": "-",
-                    "duracao_real_meses": "-",
-                    "vt_text": "-",
-                    "vd_text": "-",
-                    "status_color_class": 'status-default'
-                }
-                tasks.append(task)
-                continue
-
-            # Processar etapa existente nos dados
-            start_date = row.get("Inicio_Prevista")
-            end_date = row.get("Termino_Prevista")
-            start_real = row.get("Inicio_Real")
-            end_real_original = row.get("Termino_Real")
+    df["Dias_Uteis_Previstos"] = business_days(inicio, termino)
+    df["Dias_Uteis_Reais"] = business_days(inicio_real, termino_real)
+    df["Dias_Corridos_Previstos"] = (termino - inicio).dt.days
+    df["Dias_Corridos_Reais"] = (termino_real - inicio_real).dt.days
+    df["VT"] = business_days(termino, termino_real)
+    df["VD"] = df["Dias_Uteis_Reais"] - df["Dias_Uteis_Previstos"]
+
+    concluida = (progresso == 100) & termino_real.notna()
+    df["status_color_class"] = np.select(
+        [
+            concluida & (termino_real <= termino),
+            concluida & (termino_real > termino),
+            (progresso < 100) & inicio_real.notna() & termino_real.notna() & (termino_real < hoje),
+        ],
+        ['status-green', 'status-red', 'status-yellow'],
+        default='status-default',
+    )
+    return df
 
-            # Garantir que as datas são objetos datetime
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
-            if pd.notna(start_real): start_real = pd.to_datetime(start_real)
-            if pd.notna(end_real_original): end_real_original = pd.to_datetime(end_real_original)
-            
-            progress = row.get("% concluído", 0)
 
-            etapa_nome_completo = sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
+def _formatar_por_valor(valores, formatar, vazio):
+    """
+    Aplica `formatar` só aos valores distintos e espalha o texto pelas linhas
+    (datas e dias úteis se repetem muito no agregado); vazios viram `vazio`.
+    Devolve lista de str nativas, pronta para json.
+    """
+    codigos, unicos = pd.factorize(valores)
+    textos = np.array([formatar(valor) for valor in unicos] + [vazio], dtype=object)
+    return textos[codigos].tolist()
 
-            # Lógica para tratar datas vazias
-            if pd.isna(start_date) or start_date is None: 
-                start_date = start_real if pd.notna(start_real) else datetime.now()
-            if pd.isna(end_date) or end_date is None: 
-                end_date = end_real_original if pd.notna(end_real_original) else (start_date + timedelta(days=30))
-            
-            # Garante que start_date e end_date são datetime se não forem None
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
 
-            end_real_visual = end_real_original
-            if pd.notna(start_real) and progress < 100 and pd.isna(end_real_original):
-                end_real_visual = datetime.now()
+def _formatar_datas(datas, formato, vazio=None):
+    dias = pd.Series(datas).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    return _formatar_por_valor(dias, lambda dia: pd.Timestamp(dia).strftime(formato), vazio)
 
-            # Mapeamento de Grupo
-            grupo = "Não especificado"
-            if etapa_sigla in GRUPO_POR_ETAPA:
-                grupo = GRUPO_POR_ETAPA[etapa_sigla]
 
-            print(f"Processando: {etapa_sigla} -> {etapa_nome_completo} -> Grupo: {grupo}")
+def _formatar_meses(dias_uteis, dias_uteis_mes):
+    return _formatar_por_valor((dias_uteis / dias_uteis_mes).to_numpy(), lambda meses: f"{meses:.1f}".replace('.', ','), "-")
 
-            # Cálculos de duração
-            dur_prev_meses = None
-            if pd.notna(start_date) and pd.notna(end_date):
-                duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-                dur_prev_meses = duracao_prevista_uteis / 21.75
 
-            dur_real_meses = None
-            if pd.notna(start_real) and pd.notna(end_real_original):
-                duracao_real_uteis = calculate_business_days(start_real, end_real_original)
-                dur_real_meses = duracao_real_uteis / 21.75
+def _formatar_variacao(dias):
+    return _formatar_por_valor(dias.to_numpy(), lambda valor: f"{int(valor):+d}d", "-")
 
-            # Variações
-            vt = calculate_business_days(end_date, end_real_original)
-            duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-            duracao_real_uteis = calculate_business_days(start_real, end_real_original)
-            
-            vd = None
-            if pd.notna(duracao_real_uteis) and pd.notna(duracao_prevista_uteis):
-                vd = duracao_real_uteis - duracao_prevista_uteis
 
-            # Lógica de Cor do Status
-            status_color_class = 'status-default'
-            hoje = pd.Timestamp.now().normalize()
+def calcular_datas_meta_novo(df):
+    """
+    Data da meta de assinatura (etapa 'M') por empreendimento no agregado:
+    primeira linha 'M' de cada um, com prioridade Inicio_Prevista, Termino_Prevista,
+    Inicio_Real, Termino_Real. Empreendimentos sem 'M' ficam de fora.
+    """
+    df_meta = df[df["Etapa"] == "M"]
+    data_meta = df_meta["Inicio_Prevista"]
+    for col in ["Termino_Prevista", "Inicio_Real", "Termino_Real"]:
+        if col in df_meta.columns:
+            data_meta = data_meta.fillna(df_meta[col])
+    primeira = ~df_meta["Empreendimento"].duplicated()
+    return pd.Series(data_meta[primeira].to_numpy(), index=df_meta.loc[primeira, "Empreendimento"].to_numpy())
 
-            if progress == 100:
-                if pd.notna(end_real_original) and pd.notna(end_date):
-                    if end_real_original <= end_date:
-                        status_color_class = 'status-green'
-                    else:
-                        status_color_class = 'status-red'
-            elif progress < 100 and pd.notna(start_real) and pd.notna(end_real_original) and (end_real_original < hoje):
-                status_color_class = 'status-yellow'
 
-            task = {
-                "id": f"t{i}", 
-                "name": etapa_nome_completo,
-                "name_sigla": etapa_sigla,
-                "numero_etapa": i + 1,
-                "start_previsto": start_date.strftime("%Y-%m-%d") if pd.notna(start_date) and start_date is not None else None,
-                "end_previsto": end_date.strftime("%Y-%m-%d") if pd.notna(end_date) and end_date is not None else None,
-                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
-                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
-                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
-                "setor": row.get("SETOR", "Não especificado"),
-                "grupo": grupo,
-                "progress": int(progress),
-                "inicio_previsto": start_date.strftime("%d/%m/%y") if pd.notna(start_date) and start_date is not None else "N/D",
-                "termino_previsto": end_date.strftime("%d/%m/%y") if pd.notna(end_date) and end_date is not None else "N/D",
-                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
-                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
-                "duracao_prev_meses": f"{dur_prev_meses:.1f}".replace('.', ',') if dur_prev_meses is not None else "-",
-                "duracao_real_meses": f"{dur_real_meses:.1f}".replace('.', ',') if dur_real_meses is not None else "-",
-                "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
-                "vd_text": f"{int(vd):+d}d" if pd.notna(vd) else "-",
-                "status_color_class": status_color_class
-            }
-            tasks.append(task)
+# --- CÓDIGO MODIFICADO ---
+def converter_dados_para_gantt(df):
+    """
+    Monta a lista de projetos do Gantt a partir do agregado (Empreendimento, Etapa)
+    em colunas inteiras: reindexa cada empreendimento contra ORDEM_ETAPAS_GLOBAL
+    (etapas ausentes viram tasks vazias, etapas fora da ordem são ignoradas),
+    formata datas, durações e variações por coluna (só os valores distintos) e
+    gera todas as tasks numa passada, fatiadas por projeto.
+    """
+    # Datas já chegam como datetime64 (ESQUEMA_DADOS, validado na carga)
+    if df.empty:
+        return []
+    if "VT" not in df.columns:
+        df = calcular_metricas_etapas(df)
+    dias_uteis_mes = business_days_per_month()
+
+    empreendimentos = pd.unique(df["Empreendimento"].to_numpy(dtype=object))
+    n_etapas = len(ORDEM_ETAPAS_GLOBAL)
+    grade = pd.MultiIndex.from_product([empreendimentos, ORDEM_ETAPAS_GLOBAL], names=["Empreendimento", "Etapa"])
+    chave = pd.MultiIndex.from_arrays([df["Empreendimento"].to_numpy(dtype=object), df["Etapa"].to_numpy(dtype=object)])
+    # O agregado tem uma linha por (Empreendimento, Etapa); a grade acrescenta as ausentes
+    df_grade = df.set_axis(chave)[~chave.duplicated()].reindex(grade)
+    presente = pd.Series(df_grade.index.isin(chave), index=df_grade.index)
+
+    siglas = np.tile(np.array(ORDEM_ETAPAS_GLOBAL, dtype=object), len(empreendimentos))
+    posicao = np.tile(np.arange(n_etapas), len(empreendimentos))
+    if "SETOR" in df_grade.columns:
+        setor = df_grade["SETOR"].astype(object).where(presente, "Não especificado").tolist()
+    else:
+        setor = ["Não especificado"] * len(df_grade)
+    progresso = df_grade["% concluído"] if "% concluído" in df_grade.columns else pd.Series(0, index=df_grade.index)
+
+    colunas = {
+        "id": [f"t{i}" for i in range(n_etapas)] * len(empreendimentos),
+        "name": [sigla_para_nome_completo.get(sigla, sigla) for sigla in siglas],
+        "name_sigla": siglas.tolist(),
+        "numero_etapa": (posicao + 1).tolist(),
+        "start_previsto": _formatar_datas(df_grade["Inicio_Efetivo"], "%Y-%m-%d"),
+        "end_previsto": _formatar_datas(df_grade["Termino_Efetivo"], "%Y-%m-%d"),
+        "start_real": _formatar_datas(df_grade["Inicio_Real"], "%Y-%m-%d"),
+        "end_real": _formatar_datas(df_grade["Termino_Real_Visual"], "%Y-%m-%d"),
+        "end_real_original_raw": _formatar_datas(df_grade["Termino_Real"], "%Y-%m-%d"),
+        "setor": setor,
+        "grupo": [GRUPO_POR_ETAPA.get(sigla, "Não especificado") for sigla in siglas],
+        "progress": progresso.where(presente, 0).fillna(0).astype(int).tolist(),
+        "inicio_previsto": _formatar_datas(df_grade["Inicio_Efetivo"], "%d/%m/%y", "N/D"),
+        "termino_previsto": _formatar_datas(df_grade["Termino_Efetivo"], "%d/%m/%y", "N/D"),
+        "inicio_real": _formatar_datas(df_grade["Inicio_Real"], "%d/%m/%y", "N/D"),
+        "termino_real": _formatar_datas(df_grade["Termino_Real"], "%d/%m/%y", "N/D"),
+        "duracao_prev_meses": _formatar_meses(df_grade["Dias_Uteis_Previstos"], dias_uteis_mes),
+        "duracao_real_meses": _formatar_meses(df_grade["Dias_Uteis_Reais"], dias_uteis_mes),
+        "vt_text": _formatar_variacao(df_grade["VT"]),
+        "vd_text": _formatar_variacao(df_grade["VD"]),
+        "status_color_class": df_grade["status_color_class"].astype(object).where(presente, "status-default").tolist(),
+    }
+    # Equivale a DataFrame(colunas).to_dict('records'), sem converter valor a valor para tipos nativos
+    tarefas = [dict(zip(colunas, linha)) for linha in zip(*colunas.values())]
 
-        data_meta = obter_data_meta_assinatura_novo(df_emp)
+    datas_meta = calcular_datas_meta_novo(df)
+    datas_meta = dict(zip(datas_meta.index, _formatar_datas(datas_meta, "%Y-%m-%d")))
 
-        project = {
-            "id": f"p{len(gantt_data)}", 
+    return [
+        {
+            "id": f"p{k}",
             "name": empreendimento,
-            "tasks": tasks,
-            "meta_assinatura_date": data_meta.strftime("%Y-%m-%d") if data_meta else None
+            "tasks": tarefas[k * n_etapas:(k + 1) * n_etapas],
+            "meta_assinatura_date": datas_meta.get(empreendimento),
         }
-        gantt_data.append(project)
-
-    return gantt_data
-
-def converter_porcentagem(valor):
-    if pd.isna(valor) or valor == "":
-        return 0.0
-    if isinstance(valor, str):
-        valor = "".join(c for c in valor if c.isdigit() or c in [".", ","]).replace(",", ".").strip()
-        if not valor: return 0.0
-    try:
-        val_float = float(valor)
-        return val_float * 100 if val_float <= 1 else val_float
-    except (ValueError, TypeError):
-        return 0.0
+        for k, empreendimento in enumerate(empreendimentos)
+    ]
 
 def formatar_data(data):
     return data.strftime("%d/%m/%y") if pd.notna(data) else "N/D"
 
 def calcular_dias_uteis(inicio, fim):
     if pd.notna(inicio) and pd.notna(fim):
-        data_inicio = np.datetime64(inicio.date())
-        data_fim = np.datetime64(fim.date())
-        return np.busday_count(data_inicio, data_fim) + 1
+        # Mesmo calendário (com feriados) de business_days
+        return int(business_days(inicio, fim))
     return 0
 
 def calcular_variacao_termino(termino_real, termino_previsto):
     if pd.notna(termino_real) and pd.notna(termino_previsto):
-        diferenca_dias = calculate_business_days(termino_previsto, termino_real)
-        if pd.isna(diferenca_dias): diferenca_dias = 0
+        diferenca_dias = business_days(termino_previsto, termino_real)
+        diferenca_dias = 0 if pd.isna(diferenca_dias) else int(diferenca_dias)
         if diferenca_dias > 0: return f"V: +{diferenca_dias}d", "#89281d"
         elif diferenca_dias < 0: return f"V: {diferenca_dias}d", "#0b803c"
         else: return "V: 0d", "#666666"
@@ -615,7 +576,7 @@ def calcular_variacao_termino(termino_real, termino_previsto):
 
 def calcular_porcentagem_correta(grupo):
     if "% concluído" not in grupo.columns: return 0.0
-    porcentagens = grupo["% concluído"].astype(str).apply(converter_porcentagem)
+    porcentagens = pd.to_numeric(grupo["% concluído"], errors='coerce')
     porcentagens = porcentagens[(porcentagens >= 0) & (porcentagens <= 100)]
     if porcentagens.empty: return 0.0
     porcentagens_validas = porcentagens.dropna()
@@ -624,56 +585,83 @@ def calcular_porcentagem_correta(grupo):
 
 def padronizar_etapa(etapa_str):
     """
-    Função robusta para padronizar o nome da etapa.
+    Padroniza um rótulo de etapa para a sigla de ORDEM_ETAPAS_GLOBAL.
+    Rótulos sem correspondência voltam limpos (maiúsculos), para irem ao final.
     """
-    if pd.isna(etapa_str) or etapa_str == "" or etapa_str == "Não especificado":
-        return "Não especificado"
+    if pd.isna(etapa_str) or etapa_str == "" or etapa_str == ETAPA_NAO_ESPECIFICADA:
+        return ETAPA_NAO_ESPECIFICADA
     
     # Converter para string e limpar
     etapa_limpa = str(etapa_str).strip().upper()
     
-    # Mapeamento direto dos valores que vêm do Smartsheet para as siglas da ORDEM_ETAPAS_GLOBAL
-    mapeamento_direto = {
-    'DEFINIÇÃO DO MÓDULO': 'DM', 'DOCUMENTAÇÃO': 'DOC', 'LAE': 'LAE', 'MEMORIAL': 'MEM',
-    'CONTRATAÇÃO': 'CONT', 'PRÉ-ASSINATURA': 'ASS', 'ASS': 'ASS', '1º PJ': 'PJ',
-    'PLANEJamento': 'DM', 'MEMORIAL DE INCORPORAÇÃO': 'MEM', 'EMISSÃO DO LAE': 'LAE',
-    'CONTESTAÇÃO': 'LAE', 'DJE': 'CONT', 'ANÁLISE DE RISCO': 'CONT', 'MORAR BEM': 'ASS',
-    'SEGUROS': 'ASS', 'ATESTE': 'ASS', 'DEMANDA MÍNIMA': 'M', 'DEMANDA MINIMA': 'M',
-    'PRIMEIRO PJ': 'PJ',
-    }
-    
-    # Tentar mapeamento direto primeiro
-    if etapa_limpa in mapeamento_direto:
-        return mapeamento_direto[etapa_limpa]
-    
-    # Verificar se já é uma sigla válida da ordem global
-    if etapa_limpa in ORDEM_ETAPAS_GLOBAL:
-        return etapa_limpa
+    # Mapeamento direto (variações conhecidas, nomes completos e siglas)
+    if etapa_limpa in TABELA_ETAPAS:
+        return TABELA_ETAPAS[etapa_limpa]
     
     # Tentar encontrar correspondência parcial
     for sigla in ORDEM_ETAPAS_GLOBAL:
         if sigla in etapa_limpa or etapa_limpa in sigla:
             return sigla
     
-    # Se não encontrar, retornar original (será colocado no final)
-    print(f"⚠️ Etapa não mapeada: '{etapa_str}' -> '{etapa_limpa}'")
     return etapa_limpa
 
 
+def padronizar_etapas(etapas):
+    """
+    Padroniza uma coluna inteira de etapas.
+
+    Fatoriza a coluna, aplica padronizar_etapa só aos rótulos distintos e
+    redistribui o resultado pelos códigos. Retorna a coluna categórica
+    (categorias em ordem alfabética) e um relatório dos rótulos não mapeados
+    (Rotulo, Etapa, Ocorrencias).
+    """
+    codigos, rotulos = pd.factorize(etapas)
+    padronizados = [padronizar_etapa(rotulo) for rotulo in rotulos]
+
+    # O código -1 (vazio) cai na última posição: ETAPA_NAO_ESPECIFICADA
+    valores = np.array(padronizados + [ETAPA_NAO_ESPECIFICADA], dtype=object)[codigos]
+    categorias = sorted(set(valores))
+    resultado = pd.Series(pd.Categorical(valores, categories=categorias), index=etapas.index, name=etapas.name)
+
+    nao_mapeados = [
+        (rotulo, etapa) for rotulo, etapa in zip(rotulos, padronizados)
+        if etapa not in ORDEM_ETAPAS_GLOBAL and etapa != ETAPA_NAO_ESPECIFICADA
+    ]
+    ocorrencias = np.bincount(codigos[codigos >= 0], minlength=len(rotulos))
+    indice = {rotulo: i for i, rotulo in enumerate(rotulos)}
+    relatorio = pd.DataFrame(
+        [(rotulo, etapa, int(ocorrencias[indice[rotulo]])) for rotulo, etapa in nao_mapeados],
+        columns=["Rotulo", "Etapa", "Ocorrencias"],
+    )
+    return resultado, relatorio
+
+
+def mapear_valores(serie, mapeamento):
+    """
+    Series.map para as colunas de dimensão (Etapa, Empreendimento, ...). Na
+    coluna categórica o mapeamento é feito só nas categorias; o resultado volta
+    como coluna comum (não categórica), para fillna/ordenação funcionarem como em texto.
+    """
+    resultado = serie.map(mapeamento)
+    if isinstance(resultado.dtype, pd.CategoricalDtype):
+        resultado = resultado.astype(object).infer_objects()
+    return resultado
+
+
+def unificar_categorias_etapa(*dfs):
+    """Deixa a coluna Etapa dos DataFrames com as mesmas categorias (o merge preserva o tipo categórico)"""
+    categorias = sorted(set().union(*(df["Etapa"].cat.categories for df in dfs)))
+    for df in dfs:
+        df["Etapa"] = df["Etapa"].cat.set_categories(categorias)
+
+
 # --- Funções de Filtragem e Ordenação ---
 def filtrar_etapas_nao_concluidas_func(df):
     if df.empty or "% concluído" not in df.columns: return df
     df_copy = df.copy()
-    df_copy["% concluído"] = df_copy["% concluído"].apply(converter_porcentagem)
+    df_copy["% concluído"] = pd.to_numeric(df_copy["% concluído"], errors='coerce')
     return df_copy[df_copy["% concluído"] < 100]
 
-def obter_data_meta_assinatura(df_original, empreendimento):
-    df_meta = df_original[(df_original["Empreendimento"] == empreendimento) & (df_original["Etapa"] == "DEM.MIN")]
-    if df_meta.empty: return pd.Timestamp.max
-    for col in ["Termino_Prevista", "Inicio_Prevista", "Termino_Real", "Inicio_Real"]:
-        if col in df_meta.columns and pd.notna(df_meta[col].iloc[0]): return df_meta[col].iloc[0]
-    return pd.Timestamp.max
-
 def converter_nome_empreendimento(nome):
     """
     Converte siglas de empreendimentos para nomes completos.
@@ -684,20 +672,41 @@ def converter_nome_empreendimento(nome):
     nome_str = str(nome).strip()
     return sigla_para_nome_completo_emp.get(nome_str, nome_str)
 
+def calcular_datas_meta_assinatura(df_original):
+    """
+    Data da meta de assinatura (etapa 'M', DEMANDA MÍNIMA) de cada empreendimento,
+    com os nomes já convertidos. Usa a primeira linha 'M' do empreendimento e a
+    primeira data preenchida entre Termino_Prevista, Inicio_Prevista,
+    Termino_Real e Inicio_Real; sem meta, pd.Timestamp.max (vai para o fim).
+    """
+    empreendimentos = mapear_valores(df_original["Empreendimento"], converter_nome_empreendimento)
+    e_meta = (df_original["Etapa"] == "M").to_numpy()
+    meta = df_original[e_meta]
+
+    datas = pd.Series(pd.NaT, index=meta.index, dtype="datetime64[ns]")
+    for col in ["Termino_Prevista", "Inicio_Prevista", "Termino_Real", "Inicio_Real"]:
+        if col in meta.columns:
+            datas = datas.fillna(meta[col])
+
+    primeira_meta = (
+        pd.DataFrame({"Empreendimento": empreendimentos[e_meta], "Data_Meta": datas})
+        .drop_duplicates("Empreendimento")
+        .set_index("Empreendimento")["Data_Meta"]
+    )
+    return primeira_meta.reindex(empreendimentos.unique()).fillna(pd.Timestamp.max)
+
 def criar_ordenacao_empreendimentos(df_original):
     """
     Cria uma lista ordenada dos nomes COMPLETOS dos empreendimentos
     com base na data da meta de assinatura (DEMANDA MÍNIMA).
+    Empates mantêm a ordem de aparição nos dados.
     """
-    # Aplica conversão aos nomes antes de criar a ordenação
-    df_convertido = df_original.copy()
-    df_convertido["Empreendimento"] = df_convertido["Empreendimento"].apply(converter_nome_empreendimento)
-    
-    empreendimentos_meta = {emp: obter_data_meta_assinatura(df_convertido, emp)
-                           for emp in df_convertido["Empreendimento"].unique()}
-    
-    # Retorna a lista de nomes COMPLETOS ordenados pela data meta
-    return sorted(empreendimentos_meta.keys(), key=empreendimentos_meta.get)
+    return calcular_datas_meta_assinatura(df_original).sort_values(kind="stable").index.tolist()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def ordenacao_por_meta(versao, _df_original):
+    """criar_ordenacao_empreendimentos memoizada por versão dos dados (carregado_em); o DataFrame fica fora do hash"""
+    return criar_ordenacao_empreendimentos(_df_original)
 
 
 def aplicar_ordenacao_final(df, empreendimentos_ordenados):
@@ -705,15 +714,15 @@ def aplicar_ordenacao_final(df, empreendimentos_ordenados):
         return df
         
     # Garantir que as etapas estão no formato correto (siglas)
-    df['Etapa'] = df['Etapa'].apply(padronizar_etapa)
+    df['Etapa'] = padronizar_etapas(df['Etapa'])[0]
     
     # Ordenação por empreendimento
     ordem_empreendimentos = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados)}
-    df["ordem_empreendimento"] = df["Empreendimento"].map(ordem_empreendimentos).fillna(len(empreendimentos_ordenados))
+    df["ordem_empreendimento"] = mapear_valores(df["Empreendimento"], ordem_empreendimentos).fillna(len(empreendimentos_ordenados))
     
     # Ordenação por etapa - usar a ordem das SIGLAS
     ordem_etapas = {etapa: idx for idx, etapa in enumerate(ORDEM_ETAPAS_GLOBAL)}
-    df["ordem_etapa"] = df["Etapa"].map(ordem_etapas).fillna(len(ordem_etapas))
+    df["ordem_etapa"] = mapear_valores(df["Etapa"], ordem_etapas).fillna(len(ordem_etapas))
     
     # Ordenar
     df_ordenado = df.sort_values(["ordem_empreendimento", "ordem_etapa"]).drop(
@@ -809,48 +818,278 @@ def gerar_relatorio_txt(gantt_data):
             
     return "\n".join(relatorio)
 
+# --- Formato colunar dos dados dos Gantts no HTML ---
+# As tasks viajam em colunas: datas como dias a partir de "dia_base" (o menor dia do
+# payload), textos como códigos num dicionário por coluna, VT/VD como inteiros.
+# inicio_previsto, termino_previsto, inicio_real, termino_real e o id não viajam:
+# o decodificador JS refaz a partir das datas e de numero_etapa.
+CAMPOS_DIA_GANTT = ["start_previsto", "end_previsto", "start_real", "end_real", "end_real_original_raw"]
+CAMPOS_TEXTO_GANTT = ["name", "name_sigla", "setor", "grupo", "duracao_prev_meses", "duracao_real_meses", "status_color_class"]
+CAMPOS_INTEIRO_GANTT = ["numero_etapa", "progress"]
+CAMPOS_VARIACAO_GANTT = ["vt_text", "vd_text"]
+
+
+def _dias_epoca(datas):
+    """Datas (ISO, Timestamp ou datetime64) como dias desde 1970-01-01 (float, NaN quando vazias)"""
+    dias = pd.to_datetime(pd.Series(datas, dtype=object)).to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    return np.where(np.isnat(dias), np.nan, dias.astype(np.int64))
+
+
+def _inteiros_ou_nulos(valores):
+    valores = np.asarray(valores, dtype=float)
+    inteiros = np.nan_to_num(valores).astype(np.int64).astype(object)
+    inteiros[np.isnan(valores)] = None
+    return inteiros.tolist()
+
+
+def _codificar_textos(valores):
+    """Dicionário da coluna: textos distintos (ordem de aparição) e o código de cada linha; vazios viram None"""
+    codigos, unicos = pd.factorize(pd.Series(valores, dtype=object))
+    return {"valores": list(unicos), "codigos": _inteiros_ou_nulos(np.where(codigos < 0, np.nan, codigos))}
+
+
+def codificar_tarefas_gantt(tarefas, dia_base):
+    """Lista de tasks (dicts do Gantt) em colunas, no formato lido por decodificarTarefas (JS)"""
+    colunas = {}
+    for campo in (tarefas[0] if tarefas else []):
+        valores = [tarefa[campo] for tarefa in tarefas]
+        if campo in CAMPOS_DIA_GANTT:
+            colunas[campo] = _inteiros_ou_nulos(_dias_epoca(valores) - dia_base)
+        elif campo in CAMPOS_TEXTO_GANTT:
+            colunas[campo] = _codificar_textos(valores)
+        elif campo in CAMPOS_INTEIRO_GANTT:
+            colunas[campo] = valores
+        elif campo in CAMPOS_VARIACAO_GANTT:
+            colunas[campo] = [None if valor == "-" else int(valor[:-1]) for valor in valores]
+    return colunas
+
+
+def _dia_base(tarefas):
+    dias = _dias_epoca([tarefa[campo] for tarefa in tarefas for campo in CAMPOS_DIA_GANTT if campo in tarefa])
+    return int(np.nanmin(dias)) if np.isfinite(dias).any() else 0
+
+
+def codificar_gantt_projetos(gantt_data):
+    """JSON compacto da lista de projetos (converter_dados_para_gantt) para decodificarProjetosGantt"""
+    tarefas = [tarefa for projeto in gantt_data for tarefa in projeto["tasks"]]
+    dia_base = _dia_base(tarefas)
+    projetos = {
+        "nome": [projeto["name"] for projeto in gantt_data],
+        "meta": _inteiros_ou_nulos(_dias_epoca([projeto["meta_assinatura_date"] for projeto in gantt_data]) - dia_base),
+        "n_tarefas": [len(projeto["tasks"]) for projeto in gantt_data],
+    }
+    dados = {"dia_base": dia_base, "projetos": projetos, "tarefas": codificar_tarefas_gantt(tarefas, dia_base)}
+    return json.dumps(dados, separators=(",", ":"))
+
+
+def codificar_gantt_etapas(tarefas_por_etapa):
+    """JSON compacto de {etapa: tasks} (montar_tarefas_por_etapa) para decodificarEtapasGantt"""
+    tarefas = [tarefa for tarefas_etapa in tarefas_por_etapa.values() for tarefa in tarefas_etapa]
+    dia_base = _dia_base(tarefas)
+    etapas = {"nome": list(tarefas_por_etapa), "n_tarefas": [len(tarefas_etapa) for tarefas_etapa in tarefas_por_etapa.values()]}
+    dados = {"dia_base": dia_base, "etapas": etapas, "tarefas": codificar_tarefas_gantt(tarefas, dia_base)}
+    return json.dumps(dados, separators=(",", ":"))
+
+
+# Inverso de codificar_gantt_projetos/codificar_gantt_etapas, incluído nos dois HTMLs.
+# Datas e textos derivados são formatados no navegador (com cache por dia).
+DECODIFICADOR_GANTT_JS = """
+                    const _isoPorDia = new Map();
+                    function diaIso(dia) {
+                        if (dia === null) return null;
+                        let iso = _isoPorDia.get(dia);
+                        if (iso === undefined) {
+                            iso = new Date(dia * 86400000).toISOString().slice(0, 10);
+                            _isoPorDia.set(dia, iso);
+                        }
+                        return iso;
+                    }
+                    function diaBr(dia) {
+                        const iso = diaIso(dia);
+                        return iso === null ? 'N/D' : iso.slice(8, 10) + '/' + iso.slice(5, 7) + '/' + iso.slice(2, 4);
+                    }
+                    function textoVariacao(dias) {
+                        return dias === null ? '-' : (dias >= 0 ? '+' : '') + dias + 'd';
+                    }
+                    function decodificarTarefas(dados, inicio, fim, sufixoId) {
+                        const c = dados.tarefas;
+                        const texto = (coluna, k) => coluna.codigos[k] === null ? null : coluna.valores[coluna.codigos[k]];
+                        const dia = (coluna, k) => coluna[k] === null ? null : dados.dia_base + coluna[k];
+                        const tarefas = [];
+                        for (let k = inicio; k < fim; k++) {
+                            const tarefa = { id: 't' + (c.numero_etapa[k] - 1) + sufixoId, name: texto(c.name, k) };
+                            if (c.name_sigla) tarefa.name_sigla = texto(c.name_sigla, k);
+                            Object.assign(tarefa, {
+                                numero_etapa: c.numero_etapa[k],
+                                start_previsto: diaIso(dia(c.start_previsto, k)),
+                                end_previsto: diaIso(dia(c.end_previsto, k)),
+                                start_real: diaIso(dia(c.start_real, k)),
+                                end_real: diaIso(dia(c.end_real, k)),
+                                end_real_original_raw: diaIso(dia(c.end_real_original_raw, k)),
+                                setor: texto(c.setor, k),
+                                grupo: texto(c.grupo, k),
+                                progress: c.progress[k],
+                                inicio_previsto: diaBr(dia(c.start_previsto, k)),
+                                termino_previsto: diaBr(dia(c.end_previsto, k)),
+                                inicio_real: diaBr(dia(c.start_real, k)),
+                                termino_real: diaBr(dia(c.end_real_original_raw, k)),
+                                duracao_prev_meses: texto(c.duracao_prev_meses, k),
+                                duracao_real_meses: texto(c.duracao_real_meses, k),
+                                vt_text: textoVariacao(c.vt_text[k]),
+                                vd_text: textoVariacao(c.vd_text[k]),
+                                status_color_class: texto(c.status_color_class, k)
+                            });
+                            tarefas.push(tarefa);
+                        }
+                        return tarefas;
+                    }
+                    function decodificarProjetosGantt(dados) {
+                        const projetos = [];
+                        let inicio = 0;
+                        dados.projetos.nome.forEach((nome, p) => {
+                            const fim = inicio + dados.projetos.n_tarefas[p];
+                            projetos.push({
+                                id: 'p' + p,
+                                name: nome,
+                                tasks: decodificarTarefas(dados, inicio, fim, ''),
+                                meta_assinatura_date: diaIso(dados.projetos.meta[p] === null ? null : dados.dia_base + dados.projetos.meta[p])
+                            });
+                            inicio = fim;
+                        });
+                        return projetos;
+                    }
+                    function decodificarEtapasGantt(dados) {
+                        const porEtapa = {};
+                        let inicio = 0;
+                        dados.etapas.nome.forEach((nome, i) => {
+                            const fim = inicio + dados.etapas.n_tarefas[i];
+                            porEtapa[nome] = decodificarTarefas(dados, inicio, fim, '_' + i);
+                            inicio = fim;
+                        });
+                        return porEtapa;
+                    }
+"""
+
+
+# --- Cache dos payloads dos Gantts ---
+# Limite do cache de payloads (JSON já serializado) compartilhado entre as sessões
+LIMITE_CACHE_GANTT_BYTES = int(os.getenv("LIMITE_CACHE_GANTT_MB", "64")) * 1024 * 1024
+
+class CacheGantt:
+    """
+    LRU dos payloads dos Gantts (dicionários com o JSON pronto para o HTML),
+    limitado pelo tamanho total dos textos em bytes UTF-8. A chave traz a
+    versão dos dados e os filtros; reruns que não mudam nenhum dos dois
+    (ordenação do Tabelão, outros widgets) reaproveitam o payload sem
+    agregação nem conversão.
+    """
+
+    def __init__(self, limite_bytes=LIMITE_CACHE_GANTT_BYTES):
+        self.limite_bytes = limite_bytes
+        self._itens = OrderedDict()  # chave -> (payload, bytes), do menos para o mais usado
+        self._bytes = 0
+        self._trava = threading.Lock()
+
+    @staticmethod
+    def tamanho(payload):
+        if payload is None:
+            return 0
+        # Nem todo texto é JSON escapado (relatorio_txt tem acentos): conta os bytes em UTF-8
+        return sum(len(valor.encode("utf-8")) for valor in payload.values() if isinstance(valor, str))
+
+    def obter(self, chave, construir):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave][0]
+
+        # Construído fora da trava: outra sessão não espera por um payload que não é o dela
+        payload = construir()
+        tamanho = self.tamanho(payload)
+        with self._trava:
+            if chave not in self._itens and tamanho <= self.limite_bytes:
+                self._itens[chave] = (payload, tamanho)
+                self._bytes += tamanho
+                while self._bytes > self.limite_bytes:
+                    _, (_, removido) = self._itens.popitem(last=False)
+                    self._bytes -= removido
+        return payload
+
+
+@st.cache_resource
+def obter_cache_gantt():
+    return CacheGantt()
+
+
+def obter_payload_gantt(chave_cache, construir):
+    """Payload do cache compartilhado; sem chave, sempre constrói"""
+    if chave_cache is None:
+        return construir()
+    return obter_cache_gantt().obter(chave_cache, construir)
+
+
+def abreviar_empreendimentos(df):
+    """Cópia do df com os nomes de empreendimento abreviados para os Gantts"""
+    df = df.copy()
+    if 'Empreendimento' in df.columns:
+        df['Empreendimento'] = mapear_valores(df['Empreendimento'], abreviar_nome)
+    return df
+
+
+def montar_payload_gantt_projeto(df, agora=None):
+    """
+    Dados do Gantt por projeto já serializados (formato colunar, uma cópia de
+    todos os projetos), id/nome do primeiro (exibido na carga), período do eixo
+    e relatório TXT. None sem dados. 'agora' vai para calcular_metricas_etapas.
+    """
+    df_gantt = abreviar_empreendimentos(df)
+
+    if "% concluído" not in df_gantt.columns:
+        df_gantt["% concluído"] = 0
+    # A conversão já foi feita no load_data, então apenas garantimos 0 nos NaNs
+    df_gantt["% concluído"] = df_gantt["% concluído"].fillna(0)
+
+    # Agrega os dados (usando siglas)
+    df_gantt_agg = df_gantt.groupby(['Empreendimento', 'Etapa'], observed=True).agg(
+        Inicio_Prevista=('Inicio_Prevista', 'min'),
+        Termino_Prevista=('Termino_Prevista', 'max'),
+        Inicio_Real=('Inicio_Real', 'min'),
+        Termino_Real=('Termino_Real', 'max'),
+        **{'% concluído': ('% concluído', 'mean')},
+        SETOR=('SETOR', 'first')
+    ).reset_index()
+
+    # Mapear o SETOR e GRUPO (siglas mantidas; nome completo vem em converter_dados_para_gantt)
+    df_gantt_agg["SETOR"] = mapear_valores(df_gantt_agg["Etapa"], SETOR_POR_ETAPA).fillna(df_gantt_agg["SETOR"])
+    df_gantt_agg["GRUPO"] = mapear_valores(df_gantt_agg["Etapa"], GRUPO_POR_ETAPA).fillna("Não especificado")
+    df_gantt_agg = calcular_metricas_etapas(df_gantt_agg, agora=agora)
+
+    gantt_data = converter_dados_para_gantt(df_gantt_agg)
+    if not gantt_data:
+        return None
+
+    # Usa o primeiro projeto da lista
+    project = gantt_data[0]
+    data_min, data_max = calcular_periodo_datas(df_gantt_agg)
+    return {
+        "projeto_id": project["id"],
+        "projeto_nome": project["name"],
+        "num_tarefas": len(project["tasks"]),
+        "data_min": data_min,
+        "data_max": data_max,
+        "dados_json": codificar_gantt_projetos(gantt_data),
+        "relatorio_txt": gerar_relatorio_txt(gantt_data),
+    }
+
 # --- *** FUNÇÃO gerar_gantt_por_projeto MODIFICADA *** ---
-def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, pulmao_status, pulmao_meses):
+def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, pulmao_status, pulmao_meses, chave_cache=None, agora=None):
         """
         Gera um único gráfico de Gantt com todos os projetos.
         """
-        
-        # --- Processar DF SEM PULMÃO ---
-        df_sem_pulmao = df.copy()
-        df_gantt_sem_pulmao = df_sem_pulmao.copy()
-
-        # **CORREÇÃO: Garantir que as colunas de datas sejam datetime ANTES da agregação**
-        for col in ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]:
-            if col in df_gantt_sem_pulmao.columns:
-                df_gantt_sem_pulmao[col] = pd.to_datetime(df_gantt_sem_pulmao[col], errors="coerce")
-
-        if "% concluído" not in df_gantt_sem_pulmao.columns:
-            df_gantt_sem_pulmao["% concluído"] = 0
-        # A conversão já foi feita no load_data, então apenas garantimos 0 nos NaNs
-        df_gantt_sem_pulmao["% concluído"] = df_gantt_sem_pulmao["% concluído"].fillna(0)
-
-        # Agrega os dados (usando siglas)
-        df_gantt_agg_sem_pulmao = df_gantt_sem_pulmao.groupby(['Empreendimento', 'Etapa']).agg(
-            Inicio_Prevista=('Inicio_Prevista', 'min'),
-            Termino_Prevista=('Termino_Prevista', 'max'),
-            Inicio_Real=('Inicio_Real', 'min'),
-            Termino_Real=('Termino_Real', 'max'),
-            **{'% concluído': ('% concluído', 'mean')},
-            SETOR=('SETOR', 'first')
-        ).reset_index()
-
-        # CORREÇÃO: Manter as siglas para o processamento interno
-        # A conversão para nome completo será feita dentro da função converter_dados_para_gantt
-        
-        # Mapear o SETOR e GRUPO
-        df_gantt_agg_sem_pulmao["SETOR"] = df_gantt_agg_sem_pulmao["Etapa"].map(SETOR_POR_ETAPA).fillna(df_gantt_agg_sem_pulmao["SETOR"])
-        df_gantt_agg_sem_pulmao["GRUPO"] = df_gantt_agg_sem_pulmao["Etapa"].map(GRUPO_POR_ETAPA).fillna("Não especificado")
-
-        # Converte o DataFrame FILTRADO agregado em lista de projetos
-        gantt_data_base = converter_dados_para_gantt(df_gantt_agg_sem_pulmao)
+        payload = obter_payload_gantt(chave_cache, lambda: montar_payload_gantt_projeto(df, agora))
 
         # --- SE NÃO HÁ DADOS FILTRADOS, NÃO FAZ NADA ---
-        if not gantt_data_base:
+        if payload is None:
             st.warning("Nenhum dado disponível para exibir.")
             return
 
@@ -861,29 +1100,14 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
             "etapas": ["Todas"] + ORDEM_ETAPAS_NOME_COMPLETO
         }
 
-        # *** CORREÇÃO: USAR O PRIMEIRO PROJETO DA LISTA EM VEZ DE CRIAR "TODOS OS EMPREENDIMENTOS" ***
-        if gantt_data_base:
-            # Usa o primeiro projeto da lista
-            project = gantt_data_base[0]
-            project_id = f"p_{project['name'].replace(' ', '_').lower()}"
-            correct_project_index_for_js = 0
-        else:
-            return
-
-        # Filtra o DF agregado para cálculo de data_min/max
-        df_para_datas = df_gantt_agg_sem_pulmao
-
-        tasks_base_data = project['tasks'] if project else []
+        # Primeiro projeto da lista (o HTML só usa id e nome; as tarefas saem de allProjectsData)
+        project = {"id": payload["projeto_id"], "name": payload["projeto_nome"]}
+        correct_project_index_for_js = 0
 
-        data_min_proj, data_max_proj = calcular_periodo_datas(df_para_datas)
+        data_min_proj, data_max_proj = payload["data_min"], payload["data_max"]
         total_meses_proj = ((data_max_proj.year - data_min_proj.year) * 12) + (data_max_proj.month - data_min_proj.month) + 1
 
-        num_tasks = len(project["tasks"]) if project else 0
-            # Converte o DataFrame FILTRADO agregado em lista de projetos
-        gantt_data_base = converter_dados_para_gantt(df_gantt_agg_sem_pulmao)
-        
-        # DEBUG SIMPLES da ordem
-        debug_ordem_etapas(gantt_data_base)
+        num_tasks = payload["num_tarefas"]
 
         if num_tasks == 0:
             st.warning("Nenhuma tarefa disponível para exibir.")
@@ -1596,12 +1820,13 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
                     
                     const coresPorSetor = {json.dumps(StyleConfig.CORES_POR_SETOR)};
 
-                    const allProjectsData = {json.dumps(gantt_data_base)};
+{DECODIFICADOR_GANTT_JS}
+                    const allProjectsData = decodificarProjetosGantt({payload["dados_json"]});
 
                     let currentProjectIndex = {correct_project_index_for_js};
                     const initialProjectIndex = {correct_project_index_for_js};
 
-                    let projectData = {json.dumps([project])};
+                    let projectData = [JSON.parse(JSON.stringify(allProjectsData[initialProjectIndex]))];
 
                     // Datas originais (Python)
                     const dataMinStr = '{data_min_proj.strftime("%Y-%m-%d")}';
@@ -1649,7 +1874,7 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
 
                     const filterOptions = {json.dumps(filter_options)};
 
-                    let allTasks_baseData = {json.dumps(tasks_base_data)};
+                    let allTasks_baseData = JSON.parse(JSON.stringify(projectData[0].tasks));
 
                     const initialPulmaoStatus = '{pulmao_status}';
                     const initialPulmaoMeses = {pulmao_meses};
@@ -2821,8 +3046,8 @@ def gerar_gantt_por_projeto(df, tipo_visualizacao, df_original_para_ordenacao, p
         """
         # Exibe o componente HTML no Streamlit
         components.html(gantt_html, height=altura_gantt, scrolling=True)
-        # *** GERAÇÃO DO RELATÓRIO TXT ***
-        relatorio_txt = gerar_relatorio_txt(gantt_data_base)
+        # *** RELATÓRIO TXT (montado junto com o payload) ***
+        relatorio_txt = payload["relatorio_txt"]
 
         col1, col2 = st.columns([5, 1])
         with col2:
@@ -2930,10 +3155,10 @@ def converter_dados_para_gantt_consolidado(df, etapa_selecionada):
             if pd.notna(start_real) and pd.notna(end_real_original):
                 dur_real_meses = (end_real_original - start_real).days / 30.4375
 
-            vt = calculate_business_days(end_date, end_real_original)
+            vt = business_days(end_date, end_real_original)
             
-            duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-            duracao_real_uteis = calculate_business_days(start_real, end_real_original)
+            duracao_prevista_uteis = business_days(start_date, end_date)
+            duracao_real_uteis = business_days(start_real, end_real_original)
             
             vd = None
             if pd.notna(duracao_real_uteis) and pd.notna(duracao_prevista_uteis):
@@ -2986,21 +3211,67 @@ def converter_dados_para_gantt_consolidado(df, etapa_selecionada):
 
     return gantt_data
 # Substitua sua função gerar_gantt_consolidado inteira por esta
-def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, pulmao_status, pulmao_meses, etapa_selecionada_inicialmente):
+def montar_tarefas_por_etapa(df_gantt_agg, ordem_meta):
     """
-    Gera um gráfico de Gantt HTML consolidado que contém dados para TODAS as etapas
-    e permite a troca de etapas via menu flutuante.
-    
-    'etapa_selecionada_inicialmente' define qual etapa mostrar no carregamento.
+    Tarefas do Gantt consolidado de todas as etapas numa passada: o agregado
+    (Etapa, Empreendimento) é ordenado uma vez por etapa e ordem da meta de
+    assinatura (empreendimentos fora da ordenação vão para o fim, na ordem do
+    agregado), as colunas são formatadas inteiras e cada etapa é um bloco
+    contíguo das tasks. Retorna ({nome completo da etapa: tasks}, nomes na ordem).
     """
-    # # st.info(f"Exibindo visão comparativa. Etapa inicial: {etapa_selecionada_inicialmente}")
+    etapas = pd.unique(df_gantt_agg["Etapa"].to_numpy(dtype=object))
+    codigo_etapa = pd.Series(pd.factorize(df_gantt_agg["Etapa"].to_numpy(dtype=object))[0], index=df_gantt_agg.index)
+    df_ord = df_gantt_agg.assign(
+        codigo_etapa=codigo_etapa,
+        ordem_meta=mapear_valores(df_gantt_agg["Empreendimento"], ordem_meta).fillna(999),
+    ).sort_values(["codigo_etapa", "ordem_meta"], kind="stable")
+
+    # O id/numero_etapa usam o índice da linha no agregado, como antes
+    linha = df_ord.index.to_numpy()
+    codigo = df_ord["codigo_etapa"].to_numpy()
+    colunas = {
+        "id": [f"t{j}_{i}" for j, i in zip(linha.tolist(), codigo.tolist())],
+        "name": df_ord["Empreendimento"].astype(object).tolist(),
+        "numero_etapa": (linha + 1).tolist(),
+        "start_previsto": _formatar_datas(df_ord["Inicio_Efetivo"], "%Y-%m-%d"),
+        "end_previsto": _formatar_datas(df_ord["Termino_Efetivo"], "%Y-%m-%d"),
+        "start_real": _formatar_datas(df_ord["Inicio_Real"], "%Y-%m-%d"),
+        "end_real": _formatar_datas(df_ord["Termino_Real_Visual"], "%Y-%m-%d"),
+        "end_real_original_raw": _formatar_datas(df_ord["Termino_Real"], "%Y-%m-%d"),
+        "setor": df_ord["SETOR"].astype(object).tolist() if "SETOR" in df_ord.columns else ["Não especificado"] * len(df_ord),
+        "grupo": ["Consolidado"] * len(df_ord),
+        "progress": df_ord["% concluído"].astype(int).tolist() if "% concluído" in df_ord.columns else [0] * len(df_ord),
+        "inicio_previsto": _formatar_datas(df_ord["Inicio_Efetivo"], "%d/%m/%y"),
+        "termino_previsto": _formatar_datas(df_ord["Termino_Efetivo"], "%d/%m/%y"),
+        "inicio_real": _formatar_datas(df_ord["Inicio_Real"], "%d/%m/%y", "N/D"),
+        "termino_real": _formatar_datas(df_ord["Termino_Real"], "%d/%m/%y", "N/D"),
+        # Duração em meses corridos (dias / 30.4375), não em dias úteis como na visão por projeto
+        "duracao_prev_meses": _formatar_meses(df_ord["Dias_Corridos_Previstos"], 30.4375),
+        "duracao_real_meses": _formatar_meses(df_ord["Dias_Corridos_Reais"], 30.4375),
+        "vt_text": _formatar_variacao(df_ord["VT"]),
+        "vd_text": _formatar_variacao(df_ord["VD"]),
+        "status_color_class": df_ord["status_color_class"].astype(object).tolist(),
+    }
+    tarefas = [dict(zip(colunas, valores)) for valores in zip(*colunas.values())]
 
-    # --- 1. Preparação dos Dados (MODIFICADO) ---
-    df_gantt = df.copy() # df agora tem MÚLTIPLAS etapas
+    all_data_by_stage_js = {}
+    all_stage_names_full = []
+    limites = np.concatenate(([0], np.cumsum(np.bincount(codigo, minlength=len(etapas)))))
+    for i, etapa_sigla in enumerate(etapas):
+        etapa_nome_completo = sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
+        all_stage_names_full.append(etapa_nome_completo)
+        all_data_by_stage_js[etapa_nome_completo] = tarefas[limites[i]:limites[i + 1]]
+    return all_data_by_stage_js, all_stage_names_full
 
-    for col in ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]:
-        if col in df_gantt.columns:
-            df_gantt[col] = pd.to_datetime(df_gantt[col], errors="coerce")
+
+def montar_payload_gantt_consolidado(df, df_original_para_ordenacao, etapa_selecionada_inicialmente, empreendimentos_ordenados=None, agora=None):
+    """
+    Dados do Gantt consolidado já serializados: tarefas de todas as etapas (formato
+    colunar; a etapa inicial é escolhida no navegador), opções de filtro e período
+    do eixo. None sem dados.
+    """
+    # --- 1. Preparação dos Dados (MODIFICADO) ---
+    df_gantt = abreviar_empreendimentos(df) # df agora tem MÚLTIPLAS etapas
 
     if "% concluído" not in df_gantt.columns: 
         df_gantt["% concluído"] = 0
@@ -3008,7 +3279,7 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
     df_gantt["% concluído"] = df_gantt["% concluído"].fillna(0)
 
     # Agrupar por Etapa E Empreendimento
-    df_gantt_agg = df_gantt.groupby(['Etapa', 'Empreendimento']).agg(
+    df_gantt_agg = df_gantt.groupby(['Etapa', 'Empreendimento'], observed=True).agg(
         Inicio_Prevista=('Inicio_Prevista', 'min'),
         Termino_Prevista=('Termino_Prevista', 'max'),
         Inicio_Real=('Inicio_Real', 'min'),
@@ -3016,117 +3287,63 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
         **{'% concluído': ('% concluído', 'mean')},
         SETOR=('SETOR', 'first')
     ).reset_index()
-    
-    all_data_by_stage_js = {}
-    all_stage_names_full = [] # Para o novo filtro
-    # Iterar por cada etapa única
-    etapas_unicas_no_df = df_gantt_agg['Etapa'].unique()
-    
-    for i, etapa_sigla in enumerate(etapas_unicas_no_df):
-        df_etapa_agg = df_gantt_agg[df_gantt_agg['Etapa'] == etapa_sigla]
-        etapa_nome_completo = sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
-        all_stage_names_full.append(etapa_nome_completo)
-        
-        # *** ORDENAR EMPREENDIMENTOS POR META DE ASSINATURA ***
-        # Criar ordenação baseada na data de meta de cada empreendimento
-        empreendimentos_ordenados = criar_ordenacao_empreendimentos(df_original_para_ordenacao)
-        
-        # Criar mapeamento de ordem para esta etapa
-        ordem_meta = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados)}
-        
-        # Adicionar coluna de ordem e ordenar DataFrame da etapa por meta
-        df_etapa_agg['ordem_meta'] = df_etapa_agg['Empreendimento'].map(ordem_meta).fillna(999)
-        df_etapa_agg = df_etapa_agg.sort_values('ordem_meta')
-        
-        tasks_base_data_for_stage = []
-        
-        for j, row in df_etapa_agg.iterrows():
-            start_date = row.get("Inicio_Prevista")
-            end_date = row.get("Termino_Prevista")
-            start_real = row.get("Inicio_Real")
-            end_real_original = row.get("Termino_Real")
+    df_gantt_agg = calcular_metricas_etapas(df_gantt_agg, inicio_real_como_fallback=False, agora=agora)
 
-            # Garantir que as datas são objetos datetime, pois o .get() pode retornar NaT ou None
-            if pd.notna(start_date): start_date = pd.to_datetime(start_date)
-            if pd.notna(end_date): end_date = pd.to_datetime(end_date)
-            if pd.notna(start_real): start_real = pd.to_datetime(start_real)
-            if pd.notna(end_real_original): end_real_original = pd.to_datetime(end_real_original)
-            progress = row.get("% concluído", 0)
-
-            if pd.isna(start_date): start_date = datetime.now()
-            if pd.isna(end_date): end_date = start_date + timedelta(days=30)
-            end_real_visual = end_real_original
-            if pd.notna(start_real) and progress < 100 and pd.isna(end_real_original): end_real_visual = datetime.now()
+    # *** ORDENAR EMPREENDIMENTOS POR META DE ASSINATURA ***
+    # Uma ordenação para todas as etapas (o chamador pode passar a já memoizada)
+    if empreendimentos_ordenados is None:
+        empreendimentos_ordenados = criar_ordenacao_empreendimentos(df_original_para_ordenacao)
+    ordem_meta = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados)}
 
-            vt = calculate_business_days(end_date, end_real_original)
-            duracao_prevista_uteis = calculate_business_days(start_date, end_date)
-            duracao_real_uteis = calculate_business_days(start_real, end_real_original)
-            vd = None
-            if pd.notna(duracao_real_uteis) and pd.notna(duracao_prevista_uteis): vd = duracao_real_uteis - duracao_prevista_uteis
-            status_color_class = 'status-default'
-            hoje = pd.Timestamp.now().normalize()
-            if progress == 100:
-                if pd.notna(end_real_original) and pd.notna(end_date):
-                    if end_real_original <= end_date: status_color_class = 'status-green'
-                    else: status_color_class = 'status-red'
-            elif progress < 100 and pd.notna(start_real) and pd.notna(end_real_original) and (end_real_original < hoje): status_color_class = 'status-yellow'
+    all_data_by_stage_js, all_stage_names_full = montar_tarefas_por_etapa(df_gantt_agg, ordem_meta)
 
-            task = {
-                "id": f"t{j}_{i}", # ID único
-                "name": row["Empreendimento"], # O 'name' ainda é o Empreendimento
-                "numero_etapa": j + 1,
-                "start_previsto": start_date.strftime("%Y-%m-%d"),
-                "end_previsto": end_date.strftime("%Y-%m-%d"),
-                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
-                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
-                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
-                "setor": row.get("SETOR", "Não especificado"),
-                "grupo": "Consolidado", # Correto
-                "progress": int(progress),
-                "inicio_previsto": start_date.strftime("%d/%m/%y"),
-                "termino_previsto": end_date.strftime("%d/%m/%y"),
-                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
-                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
-                "duracao_prev_meses": f"{(end_date - start_date).days / 30.4375:.1f}".replace('.', ',') if pd.notna(start_date) and pd.notna(end_date) else "-",
-                "duracao_real_meses": f"{(end_real_original - start_real).days / 30.4375:.1f}".replace('.', ',') if pd.notna(start_real) and pd.notna(end_real_original) else "-",
-                "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
-                "vd_text": f"{int(vd):+d}d" if pd.notna(vd) else "-",
-                "status_color_class": status_color_class
-            }
-            tasks_base_data_for_stage.append(task)
-            
-        all_data_by_stage_js[etapa_nome_completo] = tasks_base_data_for_stage
-    
     if not all_data_by_stage_js:
-        st.warning("Nenhum dado válido para o Gantt Consolidado após a conversão.")
-        return
+        return None
 
     empreendimentos_no_df = sorted(list(df_gantt_agg["Empreendimento"].unique()))
-    
     filter_options = {
         "empreendimentos": ["Todos"] + empreendimentos_no_df, # Renomeado
         "etapas_consolidadas": sorted(all_stage_names_full) # Novo (sem "Todos")
     }
 
-    # Pegar os dados da *primeira* etapa selecionada para a renderização inicial
-    tasks_base_data_inicial = all_data_by_stage_js.get(etapa_selecionada_inicialmente, [])
+    data_min, data_max = calcular_periodo_datas(df_gantt_agg)
+    return {
+        "num_empreendimentos": len(empreendimentos_no_df),
+        "data_min": data_min,
+        "data_max": data_max,
+        "etapas_json": codificar_gantt_etapas(all_data_by_stage_js),
+        "filtros_json": json.dumps(filter_options),
+    }
+
+
+def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, pulmao_status, pulmao_meses, etapa_selecionada_inicialmente, empreendimentos_ordenados=None, chave_cache=None, agora=None):
+    """
+    Gera um gráfico de Gantt HTML consolidado que contém dados para TODAS as etapas
+    e permite a troca de etapas via menu flutuante.
+    
+    'etapa_selecionada_inicialmente' define qual etapa mostrar no carregamento.
+    """
+    # # st.info(f"Exibindo visão comparativa. Etapa inicial: {etapa_selecionada_inicialmente}")
 
-    # Criar um "projeto" único
+    payload = obter_payload_gantt(
+        chave_cache,
+        lambda: montar_payload_gantt_consolidado(df, df_original_para_ordenacao, etapa_selecionada_inicialmente, empreendimentos_ordenados, agora)
+    )
+    if payload is None:
+        st.warning("Nenhum dado válido para o Gantt Consolidado após a conversão.")
+        return
+
+    # Criar um "projeto" único (as tarefas da etapa inicial saem de allDataByStage no navegador)
     project_id = f"p_cons_{random.randint(1000, 9999)}"
     project = {
         "id": project_id,
         "name": f"Comparativo: {etapa_selecionada_inicialmente}", # Nome inicial
-        "tasks": tasks_base_data_inicial, # Dados iniciais
-        "meta_assinatura_date": None
     }
 
-    df_para_datas = df_gantt_agg
-    data_min_proj, data_max_proj = calcular_periodo_datas(df_para_datas)
+    data_min_proj, data_max_proj = payload["data_min"], payload["data_max"]
     total_meses_proj = ((data_max_proj.year - data_min_proj.year) * 12) + (data_max_proj.month - data_min_proj.month) + 1
 
-    num_tasks = len(project["tasks"])
-        
-    altura_gantt = max(400, (len(empreendimentos_no_df) * 30) + 150)
+    altura_gantt = max(400, (payload["num_empreendimentos"] * 30) + 150)
 
     # --- 4. Geração do HTML/JS Corrigido ---
     gantt_html = f"""
@@ -3982,15 +4199,22 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
                 const coresPorSetor = {json.dumps(StyleConfig.CORES_POR_SETOR)};
                 
                 // --- NOVAS VARIÁVEIS DE DADOS ---
+{DECODIFICADOR_GANTT_JS}
+                // 'allDataByStage' armazena TUDO, chaveado por nome de etapa (única cópia enviada)
+                const allDataByStage = decodificarEtapasGantt({payload["etapas_json"]});
+                const initialStageName = {json.dumps(etapa_selecionada_inicialmente)};
+
                 // 'projectData' armazena o estado ATUAL (inicia com a etapa selecionada)
-                const projectData = [{json.dumps(project)}]; 
-                // 'allDataByStage' armazena TUDO, chaveado por nome de etapa
-                const allDataByStage = {json.dumps(all_data_by_stage_js)};
-                
+                const projectData = [{{
+                    id: {json.dumps(project["id"])},
+                    name: {json.dumps(project["name"])},
+                    tasks: JSON.parse(JSON.stringify(allDataByStage[initialStageName] || [])),
+                    meta_assinatura_date: null
+                }}];
+
                 // 'allTasks_baseData' agora armazena os dados "crus" da etapa ATUAL
-                let allTasks_baseData = {json.dumps(tasks_base_data_inicial)}; 
+                let allTasks_baseData = JSON.parse(JSON.stringify(projectData[0].tasks));
                 
-                const initialStageName = {json.dumps(etapa_selecionada_inicialmente)};
                 let currentStageName = initialStageName;
                 // --- FIM NOVAS VARIÁVEIS ---
                 
@@ -4029,7 +4253,7 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
                 }}
 
                 // --- Dados de Filtro e Tasks ---
-                const filterOptions = {json.dumps(filter_options)};
+                const filterOptions = {payload["filtros_json"]};
                 // 'allTasks_baseData' (definido acima) é a base da etapa inicial
 
                 const initialPulmaoStatus = 'Sem Pulmão'; // Valor fixo
@@ -4642,18 +4866,17 @@ def gerar_gantt_consolidado(df, tipo_visualizacao, df_original_para_ordenacao, p
     # st.markdown("---") no consolidado, pois ele não é parte de um loop
 
 # --- FUNÇÃO PRINCIPAL DE GANTT (DISPATCHER) ---
-def gerar_gantt(df, tipo_visualizacao, filtrar_nao_concluidas, df_original_para_ordenacao, pulmao_status, pulmao_meses, etapa_selecionada_inicialmente):
+def gerar_gantt(df, tipo_visualizacao, filtrar_nao_concluidas, df_original_para_ordenacao, pulmao_status, pulmao_meses, etapa_selecionada_inicialmente, empreendimentos_ordenados=None, chave_cache=None, agora=None):
     """
     Decide qual Gantt gerar com base na seleção da etapa inicial.
+
+    'chave_cache' identifica versão dos dados + filtros; com ela o payload do
+    Gantt vem do CacheGantt. A abreviação dos nomes é feita na montagem do payload.
+    'agora' é o instante usado nas métricas; o dia dele deve estar na chave.
     """
     if df.empty:
         st.warning("Sem dados disponíveis para exibir o Gantt.")
         return
-    # APLICAR ABREVIAÇÃO AQUI
-    df_original_completo = df.copy()
-    if 'Empreendimento' in df.columns:
-        df['Empreendimento'] = df['Empreendimento'].apply(abreviar_nome)
-        df_original_completo['Empreendimento'] = df_original_completo['Empreendimento'].apply(abreviar_nome)
 
     # A decisão do modo é baseada no parâmetro, não mais no conteúdo do DF
     is_consolidated_view = etapa_selecionada_inicialmente != "Todos"
@@ -4665,7 +4888,10 @@ def gerar_gantt(df, tipo_visualizacao, filtrar_nao_concluidas, df_original_para_
             df_original_para_ordenacao, 
             pulmao_status, 
             pulmao_meses,
-            etapa_selecionada_inicialmente
+            etapa_selecionada_inicialmente,
+            empreendimentos_ordenados,
+            chave_cache,
+            agora
         )
     else:
         # Agora gera apenas UM gráfico com todos os empreendimentos
@@ -4674,7 +4900,9 @@ def gerar_gantt(df, tipo_visualizacao, filtrar_nao_concluidas, df_original_para_
             tipo_visualizacao, 
             df_original_para_ordenacao, 
             pulmao_status, 
-            pulmao_meses
+            pulmao_meses,
+            chave_cache,
+            agora
         )
 
 # O restante do código Streamlit...
@@ -4702,17 +4930,53 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
+# Esquema canônico do conjunto de dados carregado; o resto do app confia nestes tipos
+ESQUEMA_DADOS = {
+    'UGB': 'category',
+    'Empreendimento': 'category',
+    'Etapa': 'category',
+    'GRUPO': 'category',
+    'SETOR': 'category',
+    'Inicio_Prevista': 'datetime64[ns]',
+    'Termino_Prevista': 'datetime64[ns]',
+    'Inicio_Real': 'datetime64[ns]',
+    'Termino_Real': 'datetime64[ns]',
+    '% concluído': 'float32',
+}
+
+
+def aplicar_esquema_dados(df):
+    """Converte as colunas para ESQUEMA_DADOS e valida o resultado (uma vez, na carga)"""
+    df = df.copy()
+    for col, tipo in ESQUEMA_DADOS.items():
+        if col not in df.columns:
+            df[col] = pd.NaT if tipo.startswith('datetime') else (0.0 if tipo == 'float32' else pd.NA)
+        if tipo == 'category':
+            df[col] = df[col].astype('category')
+        elif tipo.startswith('datetime'):
+            df[col] = pd.to_datetime(df[col], errors='coerce').astype(tipo)
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(tipo)
+
+    problemas = [f"{col}: {df[col].dtype}" for col, tipo in ESQUEMA_DADOS.items() if str(df[col].dtype) != tipo]
+    if problemas:
+        raise ValueError(f"Dados fora do esquema: {problemas}")
+    return df
+
+
+def construir_dados():
+    """Monta o conjunto de dados (Smartsheet + planejador). Retorna None se nenhuma fonte carregar."""
     df_real = pd.DataFrame()
     df_previsto = pd.DataFrame()
 
     # CORREÇÃO: Carregar dados REAIS do Smartsheet (usando abordagem da versão antiga)
     try:
-        if processar_smartsheet_main:
-            # Método da versão antiga que funcionava
-            processar_smartsheet_main()  # Processa os dados
-            df_real = pd.read_csv('modulos_venda_tratados.csv')  # Lê o CSV gerado
+        if obter_dados_smartsheet:
+            # Recebe o DataFrame já tratado, sem gravar e reler o CSV
+            df_real = obter_dados_smartsheet()
+            if df_real is None:
+                # Smartsheet indisponível: usa o último CSV gerado
+                df_real = pd.read_csv('modulos_venda_tratados.csv')
             
             # Renomear colunas conforme versão antiga
             df_real.rename(columns={
@@ -4722,55 +4986,48 @@ def load_data():
             }, inplace=True)
             
             # Aplicar padronização de etapa
-            df_real['Etapa'] = df_real['Etapa'].apply(padronizar_etapa)
+            df_real['Etapa'], nao_mapeados = padronizar_etapas(df_real['Etapa'])
+            if not nao_mapeados.empty:
+                logging.warning(f"Etapas não mapeadas (Smartsheet): {nao_mapeados.to_dict('records')}")
             
-            # Converter porcentagem
-            df_real['% concluído'] = df_real.get('% concluído', pd.Series(0.0)).apply(converter_porcentagem)
+            # Converter porcentagem (uma vez, para a coluna inteira)
+            df_real['% concluído'] = converter_porcentagens(df_real.get('% concluído', pd.Series(0.0)))
             
             # Garantir coluna UGB
             if 'UGB' not in df_real.columns:
                 df_real['UGB'] = "Não especificado"
                 
     except Exception as e:
+        logging.error(f"Erro ao carregar dados reais do Smartsheet: {e}")
         st.error(f"❌ Erro ao carregar dados reais do Smartsheet: {e}")
         df_real = pd.DataFrame()
 
     # CORREÇÃO: Carregar dados PREVISTOS do NEO
     try:
-        if tratar_e_retornar_dados_previstos:
-            df_previsto = tratar_e_retornar_dados_previstos()
+        if tratar_e_retornar_previstos_por_etapa:
+            # Já vem uma linha por UGB/Empreendimento/Etapa com Inicio_Prevista e Termino_Prevista
+            df_previsto = tratar_e_retornar_previstos_por_etapa()
             
             if df_previsto is not None and not df_previsto.empty:
                 # Aplicar padronização (igual versão antiga)
-                df_previsto['Etapa'] = df_previsto['Etapa'].apply(padronizar_etapa)
-                df_previsto.rename(columns={'EMP': 'Empreendimento', 'Valor': 'Data_Prevista'}, inplace=True)
-                
-                # Criar pivot table (igual versão antiga)
-                df_previsto_pivot = df_previsto.pivot_table(
-                    index=['UGB', 'Empreendimento', 'Etapa'], 
-                    columns='Inicio_Fim', 
-                    values='Data_Prevista', 
-                    aggfunc='first'
-                ).reset_index()
-                
-                df_previsto_pivot.rename(columns={
-                    'INÍCIO': 'Inicio_Prevista', 
-                    'TÉRMINO': 'Termino_Prevista'
-                }, inplace=True)
-                
-                df_previsto = df_previsto_pivot
+                df_previsto['Etapa'], nao_mapeados = padronizar_etapas(df_previsto['Etapa'])
+                if not nao_mapeados.empty:
+                    logging.warning(f"Etapas não mapeadas (planejador): {nao_mapeados.to_dict('records')}")
+            else:
+                df_previsto = pd.DataFrame()
                 
     except Exception as e:
+        logging.error(f"Erro ao carregar dados previstos: {e}")
         st.error(f"❌ Erro ao carregar dados previstos: {e}")
         df_previsto = pd.DataFrame()
 
-    # Fallback para dados de exemplo
     if df_real.empty and df_previsto.empty:
-        st.warning("⚠️ Nenhuma fonte de dados carregada. Usando dados de exemplo.")
-        return criar_dados_exemplo()
+        return None
     
     # Merge dos dados (igual versão antiga)
     if not df_real.empty:
+        if not df_previsto.empty:
+            unificar_categorias_etapa(df_previsto, df_real)
         df_merged = pd.merge(
             df_previsto,
             df_real[['UGB', 'Empreendimento', 'Etapa', 'Inicio_Real', 'Termino_Real', '% concluído']],
@@ -4791,10 +5048,203 @@ def load_data():
     df_merged.dropna(subset=['Empreendimento', 'Etapa'], inplace=True)
     
     # Adicionar mapeamentos de grupo e setor
-    df_merged["GRUPO"] = df_merged["Etapa"].map(GRUPO_POR_ETAPA).fillna("Não especificado")
-    df_merged["SETOR"] = df_merged["Etapa"].map(SETOR_POR_ETAPA).fillna("Não especificado")
+    df_merged["GRUPO"] = mapear_valores(df_merged["Etapa"], GRUPO_POR_ETAPA).fillna("Não especificado")
+    df_merged["SETOR"] = mapear_valores(df_merged["Etapa"], SETOR_POR_ETAPA).fillna("Não especificado")
+
+    return aplicar_esquema_dados(df_merged)
+
+
+def _caminhos_cache_dados():
+    return (
+        os.path.join(DIRETORIO_CACHE_DADOS, "dados.parquet"),
+        os.path.join(DIRETORIO_CACHE_DADOS, "dados.json"),
+        os.path.join(DIRETORIO_CACHE_DADOS, "dados.lock"),
+    )
+
 
-    return df_merged
+def carregar_cache_compartilhado():
+    """
+    Lê o snapshot compartilhado. Retorna (dados, carregado_em) ou None se não
+    existir, estiver ilegível ou for de outra VERSAO_CACHE_DADOS.
+
+    Versão e horário vêm dos metadados do próprio Parquet, gravados junto com
+    os dados numa única troca atômica; dados.json serve só para consulta rápida.
+    """
+    caminho_dados, caminho_meta, _ = _caminhos_cache_dados()
+    try:
+        with open(caminho_meta, "r", encoding="utf-8") as f:
+            if json.load(f).get("versao") != VERSAO_CACHE_DADOS:
+                return None
+        tabela = pq.read_table(caminho_dados, memory_map=True)
+        meta = json.loads(tabela.schema.metadata[b"cache_dados"])
+        if meta.get("versao") != VERSAO_CACHE_DADOS:
+            return None
+        return tabela.to_pandas(), datetime.fromisoformat(meta["carregado_em"])
+    except Exception:
+        return None
+
+
+def salvar_cache_compartilhado(df, carregado_em):
+    """Grava o snapshot compartilhado (versão e horário dentro do Parquet, cada arquivo com troca atômica)"""
+    caminho_dados, caminho_meta, _ = _caminhos_cache_dados()
+    meta = {"versao": VERSAO_CACHE_DADOS, "carregado_em": carregado_em.isoformat(), "linhas": len(df)}
+    try:
+        os.makedirs(DIRETORIO_CACHE_DADOS, exist_ok=True)
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        tabela = tabela.replace_schema_metadata(
+            {**(tabela.schema.metadata or {}), b"cache_dados": json.dumps(meta).encode("utf-8")}
+        )
+        temporario = f"{caminho_dados}.{os.getpid()}.tmp"
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, caminho_dados)
+
+        temporario = f"{caminho_meta}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporario, caminho_meta)
+    except Exception as e:
+        logging.warning(f"Não foi possível gravar o cache compartilhado: {e}")
+
+
+def _versao_valida(versao, desde=None):
+    """Versão existente, dentro do TTL e (se informado) carregada depois de `desde`"""
+    if versao is None:
+        return False
+    carregado_em = versao[1]
+    if datetime.now(pytz.timezone('America/Sao_Paulo')) - carregado_em > timedelta(seconds=TTL_SECONDS):
+        return False
+    return desde is None or carregado_em >= desde
+
+
+def carregar_ou_construir_compartilhado(desde=None):
+    """
+    Retorna (dados, carregado_em) do cache compartilhado, construindo só se ele
+    estiver vencido. Sob a trava de arquivo, um único processo constrói; os
+    demais esperam e leem o snapshot que ele gravou. Retorna None se não houver dados.
+    """
+    versao = carregar_cache_compartilhado()
+    if _versao_valida(versao, desde):
+        return versao
+
+    os.makedirs(DIRETORIO_CACHE_DADOS, exist_ok=True)
+    with FileLock(_caminhos_cache_dados()[2], timeout=ESPERA_MAXIMA_TRAVA):
+        # Outro processo pode ter atualizado enquanto esperávamos a trava
+        versao = carregar_cache_compartilhado()
+        if _versao_valida(versao, desde):
+            logging.info("Dados obtidos do cache compartilhado")
+            return versao
+
+        df = construir_dados()
+        if df is None or df.empty:
+            return None
+        versao = (df, datetime.now(pytz.timezone('America/Sao_Paulo')))
+        salvar_cache_compartilhado(*versao)
+        return versao
+
+
+class AtualizadorDados:
+    """
+    Guarda a última versão boa dos dados e a reconstrói em segundo plano
+    (stale-while-revalidate): quem pede recebe na hora a versão atual e, se ela
+    tiver mais de TTL_SECONDS, uma thread monta a próxima fora da execução do
+    usuário. A troca é uma única atribuição (dados, horário), então ninguém vê
+    versão pela metade; se a reconstrução falhar, a versão anterior continua.
+    A construção passa pelo cache compartilhado em disco, então entre réplicas
+    só uma busca os dados de origem a cada TTL.
+    """
+
+    def __init__(self):
+        self._versao = None  # (DataFrame, carregado_em)
+        self._trava = threading.Lock()
+        self._thread = None
+        self._ultima_tentativa = 0.0
+
+    def _reconstruir(self, desde=None):
+        inicio = time.time()
+        try:
+            versao = carregar_ou_construir_compartilhado(desde)
+        except Timeout:
+            logging.warning("Outro processo ainda está atualizando os dados; mantendo a versão anterior")
+            return
+        except Exception as e:
+            logging.error(f"Falha na atualização em segundo plano; mantendo a versão anterior: {e}")
+            return
+        if versao is None:
+            logging.warning("Atualização sem dados; mantendo a versão anterior")
+            return
+        self._versao = versao
+        logging.info(f"Dados atualizados em segundo plano ({len(versao[0])} linhas, {time.time() - inicio:.1f}s)")
+
+    def atualizando(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def atualizar_em_segundo_plano(self, forcar=False):
+        """
+        Dispara a reconstrução (no máximo uma por vez). Com forcar=True, ignora
+        snapshots anteriores ao pedido. Retorna False se já houver uma em andamento.
+        """
+        desde = datetime.now(pytz.timezone('America/Sao_Paulo')) if forcar else None
+        with self._trava:
+            if self.atualizando():
+                return False
+            self._ultima_tentativa = time.time()
+            self._thread = threading.Thread(target=self._reconstruir, args=(desde,), name="atualizador-dados", daemon=True)
+            self._thread.start()
+            return True
+
+    def _primeira_versao(self):
+        """
+        Versão inicial do processo. Um snapshot em disco é usado mesmo vencido
+        (a próxima vem em segundo plano); só sem snapshot a carga é síncrona.
+        Retorna (versao, atualizar_em_segundo_plano).
+        """
+        versao = carregar_cache_compartilhado()
+        if versao is not None:
+            return versao, not _versao_valida(versao)
+
+        self._ultima_tentativa = time.time()
+        try:
+            versao = carregar_ou_construir_compartilhado()
+        except Timeout:
+            logging.warning("Trava do cache compartilhado ocupada; carregando só neste processo")
+            df = construir_dados()
+            versao = (df, datetime.now(pytz.timezone('America/Sao_Paulo'))) if df is not None and not df.empty else None
+        if versao is None:
+            st.warning("⚠️ Nenhuma fonte de dados carregada. Usando dados de exemplo.")
+            # Já nasce vencida: a nova tentativa vem após INTERVALO_NOVA_TENTATIVA, não após o TTL
+            vencida_em = datetime.now(pytz.timezone('America/Sao_Paulo')) - timedelta(seconds=TTL_SECONDS + 1)
+            versao = (criar_dados_exemplo(), vencida_em)
+        return versao, False
+
+    def obter(self):
+        """Retorna (dados, carregado_em) da versão atual"""
+        if self._versao is None:
+            # Primeira carga do processo, feita uma vez só para todas as sessões
+            atualizar = False
+            with self._trava:
+                if self._versao is None:
+                    self._versao, atualizar = self._primeira_versao()
+            if atualizar:
+                self.atualizar_em_segundo_plano()
+            return self._versao
+
+        versao = self._versao
+        vencida = datetime.now(pytz.timezone('America/Sao_Paulo')) - versao[1] > timedelta(seconds=TTL_SECONDS)
+        # Se a última tentativa falhou, não insiste a cada interação
+        if vencida and time.time() - self._ultima_tentativa > INTERVALO_NOVA_TENTATIVA:
+            self.atualizar_em_segundo_plano()
+        return versao
+
+
+@st.cache_resource
+def obter_atualizador():
+    return AtualizadorDados()
+
+
+def load_data():
+    """Dados atuais e horário da carga (cópia por execução, para não alterar a versão compartilhada)"""
+    df, carregado_em = obter_atualizador().obter()
+    return df.copy(), carregado_em
 
 
 def criar_dados_exemplo():
@@ -4811,14 +5261,14 @@ def criar_dados_exemplo():
     df_exemplo = pd.DataFrame(dados)
     df_exemplo["GRUPO"] = df_exemplo["Etapa"].map(GRUPO_POR_ETAPA).fillna("PLANEJAMENTO MACROFLUXO")
     df_exemplo["SETOR"] = df_exemplo["Etapa"].map(SETOR_POR_ETAPA).fillna("PROSPECÇÃO")
-    return df_exemplo
+    return aplicar_esquema_dados(df_exemplo)
 
 @st.cache_data
 def get_unique_values(df, column):
     if column == "Empreendimento":
         # Para empreendimentos, garantir que estamos usando os nomes convertidos
         df_temp = df.copy()
-        df_temp[column] = df_temp[column].apply(converter_nome_empreendimento)
+        df_temp[column] = mapear_valores(df_temp[column], converter_nome_empreendimento)
         return sorted(df_temp[column].dropna().unique().tolist())
     else:
         return sorted(df[column].dropna().unique().tolist())
@@ -4830,7 +5280,7 @@ def filter_dataframe(df, ugb_filter, emp_filter, grupo_filter, setor_filter):
 
     # Aplicar conversão aos nomes dos empreendimentos
     df_filtered = df.copy()
-    df_filtered["Empreendimento"] = df_filtered["Empreendimento"].apply(converter_nome_empreendimento)
+    df_filtered["Empreendimento"] = mapear_valores(df_filtered["Empreendimento"], converter_nome_empreendimento)
     df_filtered = df_filtered[df_filtered["UGB"].isin(ugb_filter)]
     
     # Aplicar filtros apenas se não estiverem vazios
@@ -4847,7 +5297,7 @@ def filter_dataframe(df, ugb_filter, emp_filter, grupo_filter, setor_filter):
 
 # --- Bloco Principal ---
 with st.spinner("Carregando e processando dados..."):
-    df_data = load_data()
+    df_data, data_loaded_at = load_data()
     if df_data is not None and not df_data.empty:
         with st.sidebar:
             st.markdown("<br>", unsafe_allow_html=True)
@@ -4855,10 +5305,6 @@ with st.spinner("Carregando e processando dados..."):
 
             # --- WIDGET DE ATUALIZAÇÃO (REPLICADO) ---
             with col1:
-                 # Inicializar timestamp se necessário
-                if 'data_loaded_at' not in st.session_state:
-                    st.session_state.data_loaded_at = datetime.now(pytz.timezone('America/Sao_Paulo'))
-                
                 # CSS para fixar o botão no CABEÇALHO da sidebar (Visualmente fora do fluxo)
                 st.markdown("""
                 <style>
@@ -4896,8 +5342,11 @@ with st.spinner("Carregando e processando dados..."):
 
                 # Popover nativo
                 with st.popover("⚙", use_container_width=False):
-                    loaded_time = st.session_state.data_loaded_at.strftime("%d/%m %H:%M")
-                    next_refresh_time = (st.session_state.data_loaded_at + timedelta(hours=TTL_HOURS)).strftime("%H:%M")
+                    # Horário da versão exibida (não o da sessão): os dados valem "a partir de" loaded_time
+                    loaded_time = data_loaded_at.strftime("%d/%m %H:%M")
+                    next_refresh_time = (data_loaded_at + timedelta(hours=TTL_HOURS)).strftime("%H:%M")
+                    if obter_atualizador().atualizando():
+                        next_refresh_time = "em andamento"
                     
                     st.markdown(f"""
                     <div style="min-width: 150px; padding: 0 5px;">
@@ -4915,10 +5364,9 @@ with st.spinner("Carregando e processando dados..."):
                     """, unsafe_allow_html=True)
                     
                     if st.button("↻ Atualizar", type="secondary", use_container_width=True, key="refresh_popover_top"):
-                        st.cache_data.clear()
-                        st.cache_resource.clear()
-                        st.session_state.data_loaded_at = datetime.now(pytz.timezone('America/Sao_Paulo'))
-                        st.rerun()
+                        # Reconstrói em segundo plano; os dados atuais continuam disponíveis até a troca
+                        obter_atualizador().atualizar_em_segundo_plano(forcar=True)
+                        st.toast("Atualização iniciada. Os dados novos aparecem na próxima interação.")
 
             with col2:
                 try:
@@ -5064,7 +5512,7 @@ with st.spinner("Carregando e processando dados..."):
         # *** CORREÇÃO CRÍTICA: Usar df_filtered em vez de df_data ***
         # df_data pode não conter todos os empreendimentos que aparecem em df_filtered após filtros
         # Precisamos ordenar os empreendimentos que REALMENTE aparecem nos dados filtrados
-        empreendimentos_ordenados_por_meta_raw = criar_ordenacao_empreendimentos(df_data)
+        empreendimentos_ordenados_por_meta_raw = ordenacao_por_meta(data_loaded_at, df_data)
         empreendimentos_ordenados_por_meta_convertidos = [converter_nome_empreendimento(emp) for emp in empreendimentos_ordenados_por_meta_raw]
         
         # Pegar empreendimentos únicos que REALMENTE aparecem em df_filtered
@@ -5091,6 +5539,13 @@ with st.spinner("Carregando e processando dados..."):
             else:
                 df_para_gantt = filter_dataframe(df_data, selected_ugb, selected_emp, selected_grupo, selected_setor)
 
+                # EMP/GRUPO/SETOR são derivados da UGB e dos dados, então versão + UGB + modo identificam
+                # o payload; o dia entra porque status e datas em aberto dependem de hoje. O mesmo
+                # instante vai para a chave e para as métricas: um payload montado na virada do dia
+                # não fica guardado com a data anterior
+                agora_gantt = pd.Timestamp.now()
+                chave_gantt = (data_loaded_at, tuple(selected_ugb), tipo_visualizacao, selected_etapa_nome,
+                               filtrar_nao_concluidas, pulmao_status, pulmao_meses, agora_gantt.date())
                 gerar_gantt(
                     df_para_gantt.copy(), # Passa o DF filtrado (sem filtro de etapa/concluídas)
                     tipo_visualizacao, 
@@ -5098,7 +5553,10 @@ with st.spinner("Carregando e processando dados..."):
                     df_data, 
                     pulmao_status, 
                     pulmao_meses,
-                    selected_etapa_nome  # Novo parâmetro
+                    selected_etapa_nome,  # Novo parâmetro
+                    empreendimentos_ordenados_por_meta_raw,
+                    chave_gantt,
+                    agora_gantt
                 )
             st.markdown('<div id="visao-detalhada"></div>', unsafe_allow_html=True)
             st.subheader("Visão Detalhada por Empreendimento")
@@ -5109,11 +5567,7 @@ with st.spinner("Carregando e processando dados..."):
             else:
                 hoje = pd.Timestamp.now().normalize()
 
-                for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']:
-                    if col in df_detalhes.columns:
-                        df_detalhes[col] = pd.to_datetime(df_detalhes[col], errors='coerce')
-
-                df_agregado = df_detalhes.groupby(['Empreendimento', 'Etapa']).agg(
+                df_agregado = df_detalhes.groupby(['Empreendimento', 'Etapa'], observed=True).agg(
                     Inicio_Prevista=('Inicio_Prevista', 'min'),
                     Termino_Prevista=('Termino_Prevista', 'max'),
                     Inicio_Real=('Inicio_Real', 'min'),
@@ -5124,16 +5578,14 @@ with st.spinner("Carregando e processando dados..."):
                 if '% concluído' in df_detalhes.columns and not df_agregado.empty and (df_agregado['Percentual_Concluido'].fillna(0).max() <= 1):
                     df_agregado['Percentual_Concluido'] *= 100
 
-                df_agregado['Var. Term'] = df_agregado.apply(
-                    lambda row: calculate_business_days(row['Termino_Prevista'], row['Termino_Real']), axis=1
-                )
+                df_agregado['Var. Term'] = business_days(df_agregado['Termino_Prevista'], df_agregado['Termino_Real'])
                 
                 # *** ORDENAÇÃO POR META - USAR ÍNDICE NUMÉRICO DIRETO ***
                 # Criar dicionário de mapeamento: empreendimento -> índice de ordem
                 ordem_meta_dict = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados_por_meta)}
                 
                 # Mapear cada empreendimento para seu índice de ordem (número)
-                df_agregado['ordem_meta_num'] = df_agregado['Empreendimento'].map(ordem_meta_dict).fillna(9999)
+                df_agregado['ordem_meta_num'] = mapear_valores(df_agregado['Empreendimento'], ordem_meta_dict).fillna(9999)
                 
                 # 1. Mapear a etapa para sua ordem global (agora incluindo subetapas)
                 def get_global_order_linear(etapa):
@@ -5142,7 +5594,7 @@ with st.spinner("Carregando e processando dados..."):
                     except ValueError:
                         return len(ORDEM_ETAPAS_GLOBAL) # Coloca no final se não for encontrada
 
-                df_agregado['Etapa_Ordem'] = df_agregado['Etapa'].apply(get_global_order_linear)
+                df_agregado['Etapa_Ordem'] = mapear_valores(df_agregado['Etapa'], get_global_order_linear)
                 
                 # 2. Ordenar: PRIMEIRO por ordem_meta_num, DEPOIS por Ordem da Etapa
                 df_ordenado = df_agregado.sort_values(by=['ordem_meta_num', 'Etapa_Ordem'])
@@ -5156,7 +5608,7 @@ with st.spinner("Carregando e processando dados..."):
                 
                 if usar_layout_horizontal:
                     tabela_para_processar = df_ordenado.copy()
-                    tabela_para_processar['Etapa'] = tabela_para_processar['Etapa'].map(sigla_para_nome_completo)
+                    tabela_para_processar['Etapa'] = mapear_valores(tabela_para_processar['Etapa'], sigla_para_nome_completo)
                     tabela_final_lista.append(tabela_para_processar)
                 else:
                     for _, grupo in df_ordenado.groupby('ordem_meta_num', sort=False):
@@ -5179,7 +5631,7 @@ with st.spinner("Carregando e processando dados..."):
                         tabela_final_lista.append(cabecalho)
 
                         grupo_formatado = grupo.copy()
-                        grupo_formatado['Hierarquia'] = ' &nbsp; &nbsp; ' + grupo_formatado['Etapa'].map(sigla_para_nome_completo)
+                        grupo_formatado['Hierarquia'] = ' &nbsp; &nbsp; ' + mapear_valores(grupo_formatado['Etapa'], sigla_para_nome_completo)
                         tabela_final_lista.append(grupo_formatado)
 
                 if not tabela_final_lista:
@@ -5321,7 +5773,7 @@ with st.spinner("Carregando e processando dados..."):
                             except ValueError:
                                 return len(ORDEM_ETAPAS_GLOBAL)
 
-                        df_detalhes_tabelao['Etapa_Ordem'] = df_detalhes_tabelao['Etapa'].apply(get_global_order_linear_tabelao)
+                        df_detalhes_tabelao['Etapa_Ordem'] = mapear_valores(df_detalhes_tabelao['Etapa'], get_global_order_linear_tabelao)
                         
                         agg_dict = {
                             'Inicio_Prevista': ('Inicio_Prevista', 'min'),
@@ -5335,24 +5787,43 @@ with st.spinner("Carregando e processando dados..."):
 
                         # *** CALCULAR ORDEM POR META ANTES DE ABREVIAR NOMES ***
                         # Criar ordenação por meta de assinatura usando nomes completos
-                        empreendimentos_ordenados_por_meta = criar_ordenacao_empreendimentos(df_data)
+                        empreendimentos_ordenados_por_meta = ordenacao_por_meta(data_loaded_at, df_data)
                         ordem_meta_dict = {emp: idx for idx, emp in enumerate(empreendimentos_ordenados_por_meta)}
                         
                         # Mapear ordem de meta para cada empreendimento (ainda com nome completo)
-                        df_detalhes_tabelao['ordem_meta'] = df_detalhes_tabelao['Empreendimento'].map(ordem_meta_dict).fillna(999)
+                        df_detalhes_tabelao['ordem_meta'] = mapear_valores(df_detalhes_tabelao['Empreendimento'], ordem_meta_dict).fillna(999)
                         
                         # Agora abreviar os nomes dos empreendimentos
-                        df_detalhes_tabelao['Empreendimento'] = df_detalhes_tabelao['Empreendimento'].apply(abreviar_nome)
+                        df_detalhes_tabelao['Empreendimento'] = mapear_valores(df_detalhes_tabelao['Empreendimento'], abreviar_nome)
                         
                         # Adicionar ordem_meta ao agg_dict para preservar após groupby
                         agg_dict['ordem_meta'] = ('ordem_meta', 'first')
                         
-                        df_agregado = df_detalhes_tabelao.groupby(['UGB', 'Empreendimento', 'Etapa']).agg(**agg_dict).reset_index()
-                        
-                        df_agregado['Var. Term'] = df_agregado.apply(lambda row: calculate_business_days(row['Termino_Prevista'], row['Termino_Real']), axis=1)
+                        df_agregado = df_detalhes_tabelao.groupby(['UGB', 'Empreendimento', 'Etapa'], observed=True).agg(**agg_dict).reset_index()
                         
+                        df_agregado['Var. Term'] = business_days(df_agregado['Termino_Prevista'], df_agregado['Termino_Real'])
+
+                        # Cor das datas reais por (UGB, Empreendimento, Etapa), calculada uma vez para o agregado
+                        percentual = df_agregado['Percentual_Concluido'] if 'Percentual_Concluido' in df_agregado.columns else pd.Series(0, index=df_agregado.index)
+                        termino_real = df_agregado['Termino_Real']
+                        termino_previsto = df_agregado['Termino_Prevista']
+                        concluida = (percentual == 100) & termino_real.notna() & termino_previsto.notna()
+                        df_agregado['Cor_Status'] = np.select(
+                            [
+                                concluida & (termino_real < termino_previsto),
+                                concluida & (termino_real > termino_previsto),
+                                (percentual < 100) & termino_previsto.notna() & (termino_previsto < hoje),
+                            ],
+                            ["color: #2EAF5B; font-weight: bold;", "color: #C30202; font-weight: bold;", "color: #A38408; font-weight: bold;"],
+                            default='',
+                        )
+                        cor_por_etapa = dict(zip(
+                            zip(df_agregado['UGB'], df_agregado['Empreendimento'], df_agregado['Etapa']),
+                            df_agregado['Cor_Status']
+                        ))
+
                         ordem_etapas_completas = ORDEM_ETAPAS_GLOBAL
-                        df_agregado['Etapa_Ordem'] = df_agregado['Etapa'].apply(
+                        df_agregado['Etapa_Ordem'] = mapear_valores(df_agregado['Etapa'],
                             lambda x: ordem_etapas_completas.index(x) if x in ordem_etapas_completas else len(ordem_etapas_completas)
                         )
 
@@ -5367,7 +5838,8 @@ with st.spinner("Carregando e processando dados..."):
                             index=['UGB', 'Empreendimento'],
                             columns='Etapa',
                             values=['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real', 'Var. Term'],
-                            aggfunc='first'
+                            aggfunc='first',
+                            observed=True
                         )
 
                         etapas_existentes_no_pivot = df_pivot.columns.get_level_values(1).unique()
@@ -5437,26 +5909,7 @@ with st.spinner("Carregando e processando dados..."):
                                 if not etapa_sigla:
                                     return ''
 
-                                # Busca no df_agregado original
-                                etapa_data = df_agregado[
-                                    (df_agregado['UGB'] == ugb) &
-                                    (df_agregado['Empreendimento'] == empreendimento) &
-                                    (df_agregado['Etapa'] == etapa_sigla)
-                                ]
-
-                                if not etapa_data.empty:
-                                    dados = etapa_data.iloc[0]
-                                    percentual = dados.get('Percentual_Concluido', 0)
-                                    termino_real = pd.to_datetime(dados.get('Termino_Real'), errors='coerce')
-                                    termino_previsto = pd.to_datetime(dados.get('Termino_Prevista'), errors='coerce')
-
-                                    if percentual == 100:
-                                        if pd.notna(termino_real) and pd.notna(termino_previsto):
-                                            if termino_real < termino_previsto: return "color: #2EAF5B; font-weight: bold;"
-                                            if termino_real > termino_previsto: return "color: #C30202; font-weight: bold;"
-                                    elif percentual < 100 and pd.notna(termino_previsto) and (termino_previsto < hoje):
-                                        return "color: #A38408; font-weight: bold;"
-                                return ''
+                                return cor_por_etapa.get((ugb, empreendimento, etapa_sigla), '')
 
                             # Aplica a estilização célula por célula
                             for i, row in enumerate(styler.data.itertuples()):
@@ -0,0 +1,128 @@
+"""
+Benchmark e verificação diferencial da contagem de dias úteis.
+
+Compara calculate_business_days.business_days com a versão original por par
+(len(pd.bdate_range) para cada data), usando um calendário só com fins de
+semana. Confere que os resultados são idênticos — fim inclusivo, sinal
+negativo quando o fim é anterior ao início, NaT, mesmo dia, fins de semana e
+horários. Com o calendário de feriados, confere o índice acumulado contra
+np.busday_count(holidays=...) e mede os dois em 1M pares. A versão original é
+medida numa amostra e extrapolada.
+
+Uso:
+    python benchmarks/benchmark_dias_uteis.py
+    python benchmarks/benchmark_dias_uteis.py --pares 200000 --amostra 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from calculate_business_days import BusinessCalendar, business_days, get_calendar
+
+
+def calculate_business_days_legado(start_date, end_date):
+    """Implementação original (bdate_range por par), mantida só para comparação"""
+    if pd.isna(start_date) or pd.isna(end_date):
+        return pd.NA
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+        sign = -1
+    else:
+        sign = 1
+    return len(pd.bdate_range(start=start_date, end=end_date)) * sign
+
+
+def gerar_pares(n, semente=42, taxa_nat=0.05):
+    """Pares aleatórios em ~3 anos, com horários, NaT, dias iguais e fins invertidos"""
+    rng = np.random.default_rng(semente)
+    base = np.datetime64("2024-01-01", "s")
+    inicio = base + rng.integers(0, 3 * 365 * 86400, n).astype("timedelta64[s]")
+    fim = inicio + rng.integers(-400, 400, n).astype("timedelta64[D]")
+    mesmo_dia = rng.random(n) < 0.05
+    fim[mesmo_dia] = inicio[mesmo_dia].astype("datetime64[D]")
+    inicio = pd.Series(inicio.astype("datetime64[ns]"))
+    fim = pd.Series(fim.astype("datetime64[ns]"))
+    inicio[rng.random(n) < taxa_nat] = pd.NaT
+    fim[rng.random(n) < taxa_nat] = pd.NaT
+    return inicio, fim
+
+
+def busday_count_direto(inicio, fim, feriados):
+    """Mesma contagem sem o índice acumulado: np.busday_count com a lista de feriados"""
+    a = inicio.to_numpy(dtype="datetime64[ns]")
+    b = fim.to_numpy(dtype="datetime64[ns]")
+    validos = ~(np.isnat(a) | np.isnat(b))
+    sinal = np.where(b[validos] < a[validos], -1, 1)
+    a, b = a[validos].astype("datetime64[D]"), b[validos].astype("datetime64[D]")
+    dias = np.full(len(inicio), np.nan)
+    dias[validos] = np.busday_count(np.minimum(a, b), np.maximum(a, b) + np.timedelta64(1, "D"), holidays=feriados) * sinal
+    return dias
+
+
+def verificar(inicio, fim, calendario):
+    """Compara par a par com a versão original; retorna a quantidade de divergências"""
+    novo = business_days(inicio, fim, calendario)
+    divergencias = 0
+    for a, b, valor in zip(inicio, fim, novo):
+        esperado = calculate_business_days_legado(a, b)
+        if pd.isna(esperado):
+            ok = np.isnan(valor)
+        else:
+            ok = valor == esperado and business_days(a, b, calendario) == esperado
+        if not ok:
+            divergencias += 1
+            if divergencias <= 5:
+                print(f"  divergência: {a} -> {b}: legado={esperado} novo={valor}")
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pares", type=int, default=1_000_000)
+    parser.add_argument("--amostra", type=int, default=20_000, help="pares usados na verificação e no tempo do legado")
+    args = parser.parse_args()
+
+    # Casos de borda fixos: sábado->domingo, mesmo dia útil, fim antes do início, horário no mesmo dia
+    bordas_inicio = pd.Series(pd.to_datetime(["2025-03-01", "2025-03-03", "2025-03-14", "2025-03-05 18:00", None, "2025-03-07"], format="ISO8601"))
+    bordas_fim = pd.Series(pd.to_datetime(["2025-03-02", "2025-03-03", "2025-03-03", "2025-03-05", "2025-03-05", None]))
+    inicio, fim = gerar_pares(args.amostra)
+    sem_feriados = BusinessCalendar()
+    divergencias = verificar(bordas_inicio, bordas_fim, sem_feriados) + verificar(inicio, fim, sem_feriados)
+    print(f"verificação diferencial: {args.amostra + len(bordas_inicio)} pares, {divergencias} divergências")
+    if divergencias:
+        sys.exit(1)
+
+    t = time.perf_counter()
+    for a, b in zip(inicio, fim):
+        calculate_business_days_legado(a, b)
+    t_legado = (time.perf_counter() - t) * args.pares / args.amostra
+
+    inicio, fim = gerar_pares(args.pares)
+    t = time.perf_counter()
+    business_days(inicio, fim, sem_feriados)
+    t_novo = time.perf_counter() - t
+
+    calendario = get_calendar()
+    t = time.perf_counter()
+    com_feriados = business_days(inicio, fim, calendario)
+    t_indice = time.perf_counter() - t
+    t = time.perf_counter()
+    direto = busday_count_direto(inicio, fim, calendario.holidays)
+    t_direto = time.perf_counter() - t
+    np.testing.assert_array_equal(com_feriados, direto)
+
+    print(f"{args.pares} pares")
+    print(f"bdate_range por par (extrapolado):      {t_legado:8.2f} s")
+    print(f"business_days sem feriados:             {t_novo:8.3f} s  ({t_legado / t_novo:.0f}x)")
+    print(f"busday_count com {len(calendario.holidays)} feriados:         {t_direto:8.3f} s")
+    print(f"business_days com feriados (acumulado): {t_indice:8.3f} s  ({t_direto / t_indice:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
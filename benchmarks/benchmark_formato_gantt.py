@@ -0,0 +1,113 @@
+"""
+Tamanho e verificação do formato colunar dos dados dos Gantts no HTML.
+
+Monta carteiras sintéticas para as duas visões, compara o JSON antes embutido
+(allProjectsData + projectData + allTasks_baseData na visão por projeto;
+allDataByStage + projectData + allTasks_baseData na consolidada) com o payload
+colunar único, e — se o node estiver instalado — roda o DECODIFICADOR_GANTT_JS de
+app.py sobre o payload e exige tasks idênticas às geradas em Python.
+
+Uso:
+    python benchmarks/benchmark_formato_gantt.py
+    python benchmarks/benchmark_formato_gantt.py --empreendimentos 5000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculate_business_days import business_days, business_days_per_month
+from funcoes_app import carregar_do_app
+import benchmark_gantt_consolidado
+import benchmark_gantt_payload
+
+
+def sem_nan(valor):
+    """json.dumps escreve NaN (setor vazio); o formato colunar manda null"""
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, dict):
+        return {chave: sem_nan(v) for chave, v in valor.items()}
+    if isinstance(valor, list):
+        return [sem_nan(v) for v in valor]
+    return valor
+
+
+def decodificar_no_node(decodificador, funcao, dados_json):
+    """Roda decodificador JS de app.py no node e devolve o resultado como objeto Python"""
+    script = f"{decodificador}\nprocess.stdout.write(JSON.stringify({funcao}({dados_json})));\n"
+    with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False, encoding="utf-8") as f:
+        f.write(script)
+    try:
+        saida = subprocess.run(["node", f.name], capture_output=True, text=True, check=True).stdout
+    finally:
+        os.unlink(f.name)
+    return json.loads(saida)
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--empreendimentos", type=int, default=2000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    app = carregar_do_app(
+        "ORDEM_ETAPAS_GLOBAL", "sigla_para_nome_completo", "GRUPOS", "GRUPO_POR_ETAPA", "mapear_valores",
+        "calcular_metricas_etapas", "_formatar_por_valor", "_formatar_datas", "_formatar_meses", "_formatar_variacao",
+        "calcular_datas_meta_novo", "converter_dados_para_gantt", "montar_tarefas_por_etapa",
+        "CAMPOS_DIA_GANTT", "CAMPOS_TEXTO_GANTT", "CAMPOS_INTEIRO_GANTT", "CAMPOS_VARIACAO_GANTT",
+        "_dias_epoca", "_inteiros_ou_nulos", "_codificar_textos", "codificar_tarefas_gantt", "_dia_base", "codificar_gantt_projetos",
+        "codificar_gantt_etapas", "DECODIFICADOR_GANTT_JS",
+        business_days=business_days, business_days_per_month=business_days_per_month, json=json,
+    )
+    rnd = random.Random(args.semente)
+    node = shutil.which("node")
+
+    # Visão por projeto
+    df = app.calcular_metricas_etapas(benchmark_gantt_payload.gerar_agregado(args.empreendimentos, app.ORDEM_ETAPAS_GLOBAL, rnd))
+    gantt_data = app.converter_dados_para_gantt(df)
+    antes = len(json.dumps(gantt_data)) + len(json.dumps([gantt_data[0]])) + len(json.dumps(gantt_data[0]["tasks"]))
+    depois, t_projetos = medir(lambda: app.codificar_gantt_projetos(gantt_data))
+    print(f"visão por projeto, {len(gantt_data)} empreendimentos:")
+    print(f"  JSON antes:    {antes / 1e6:7.2f} MB")
+    print(f"  colunar:       {len(depois) / 1e6:7.2f} MB  ({antes / len(depois):.1f}x menor, codificado em {t_projetos:.3f} s)")
+    if node:
+        decodificado = decodificar_no_node(app.DECODIFICADOR_GANTT_JS, "decodificarProjetosGantt", depois)
+        assert decodificado == sem_nan(gantt_data), "decodificação diferente das tasks de converter_dados_para_gantt"
+        print("  decodificado no node: idêntico")
+
+    # Visão consolidada
+    df = benchmark_gantt_consolidado.gerar_agregado(app, args.empreendimentos, rnd)
+    ordem_meta = benchmark_gantt_consolidado.gerar_ordem_meta(args.empreendimentos, rnd, fora=0.1)
+    por_etapa, _ = app.montar_tarefas_por_etapa(df, ordem_meta)
+    inicial = next(iter(por_etapa.values()))
+    antes = len(json.dumps(por_etapa)) + 2 * len(json.dumps(inicial))
+    depois, t_etapas = medir(lambda: app.codificar_gantt_etapas(por_etapa))
+    print(f"visão consolidada, {len(por_etapa)} etapas x {args.empreendimentos} empreendimentos:")
+    print(f"  JSON antes:    {antes / 1e6:7.2f} MB")
+    print(f"  colunar:       {len(depois) / 1e6:7.2f} MB  ({antes / len(depois):.1f}x menor, codificado em {t_etapas:.3f} s)")
+    if node:
+        decodificado = decodificar_no_node(app.DECODIFICADOR_GANTT_JS, "decodificarEtapasGantt", depois)
+        assert decodificado == sem_nan(por_etapa), "decodificação diferente das tasks de montar_tarefas_por_etapa"
+        print("  decodificado no node: idêntico")
+    else:
+        print("node não encontrado: decodificação não verificada")
+
+
+if __name__ == "__main__":
+    main()
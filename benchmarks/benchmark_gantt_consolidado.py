@@ -0,0 +1,160 @@
+"""
+Verificação diferencial e benchmark das tarefas do Gantt consolidado.
+
+Compara montar_tarefas_por_etapa de app.py (uma ordenação do agregado inteiro e
+formatação por coluna, etapas como blocos contíguos) com o laço anterior por
+etapa (filtro, sort_values e iterrows) e exige o mesmo JSON. Empreendimentos
+fora da ordenação da meta empatam em 999: o sort_values do laço não é estável,
+então nesses agregados a comparação é por etapa sem a ordem (a versão nova
+mantém a ordem do agregado); sem empates a ordem tem que ser a mesma.
+
+Uso:
+    python benchmarks/benchmark_gantt_consolidado.py
+    python benchmarks/benchmark_gantt_consolidado.py --empreendimentos 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from calculate_business_days import business_days, business_days_per_month
+from funcoes_app import carregar_do_app
+
+COLUNAS_DATA = ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']
+
+
+def montar_tarefas_por_etapa_legado(app, df_gantt_agg, ordem_meta):
+    """Laço anterior por etapa, mantido só para comparação"""
+    all_data_by_stage_js = {}
+    all_stage_names_full = []
+    for i, etapa_sigla in enumerate(df_gantt_agg['Etapa'].unique()):
+        df_etapa_agg = df_gantt_agg[df_gantt_agg['Etapa'] == etapa_sigla].copy()
+        etapa_nome_completo = app.sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
+        all_stage_names_full.append(etapa_nome_completo)
+        df_etapa_agg['ordem_meta'] = app.mapear_valores(df_etapa_agg['Empreendimento'], ordem_meta).fillna(999)
+        df_etapa_agg = df_etapa_agg.sort_values('ordem_meta')
+
+        tasks_base_data_for_stage = []
+        for j, row in df_etapa_agg.iterrows():
+            start_date = row["Inicio_Efetivo"]
+            end_date = row["Termino_Efetivo"]
+            start_real = row.get("Inicio_Real")
+            end_real_original = row.get("Termino_Real")
+            end_real_visual = row["Termino_Real_Visual"]
+            vt = row["VT"]
+            vd = row["VD"]
+            tasks_base_data_for_stage.append({
+                "id": f"t{j}_{i}", "name": row["Empreendimento"], "numero_etapa": j + 1,
+                "start_previsto": start_date.strftime("%Y-%m-%d"),
+                "end_previsto": end_date.strftime("%Y-%m-%d"),
+                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
+                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
+                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
+                "setor": row.get("SETOR", "Não especificado"),
+                "grupo": "Consolidado",
+                "progress": int(row.get("% concluído", 0)),
+                "inicio_previsto": start_date.strftime("%d/%m/%y"),
+                "termino_previsto": end_date.strftime("%d/%m/%y"),
+                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
+                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
+                "duracao_prev_meses": f"{row['Dias_Corridos_Previstos'] / 30.4375:.1f}".replace('.', ',') if pd.notna(row['Dias_Corridos_Previstos']) else "-",
+                "duracao_real_meses": f"{row['Dias_Corridos_Reais'] / 30.4375:.1f}".replace('.', ',') if pd.notna(row['Dias_Corridos_Reais']) else "-",
+                "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
+                "vd_text": f"{int(vd):+d}d" if pd.notna(vd) else "-",
+                "status_color_class": row["status_color_class"]
+            })
+        all_data_by_stage_js[etapa_nome_completo] = tasks_base_data_for_stage
+    return all_data_by_stage_js, all_stage_names_full
+
+
+def data_aleatoria(rnd, vazia):
+    if rnd.random() < vazia:
+        return pd.NaT
+    return pd.Timestamp('2024-01-01') + pd.Timedelta(days=rnd.randint(0, 900))
+
+
+def gerar_agregado(app, n_empreendimentos, rnd, presenca=0.85):
+    """Agregado (Etapa, Empreendimento) como o de montar_payload_gantt_consolidado"""
+    linhas = []
+    for etapa in app.ORDEM_ETAPAS_GLOBAL:
+        for e in range(n_empreendimentos):
+            if rnd.random() > presenca:
+                continue
+            linhas.append({
+                'Etapa': etapa, 'Empreendimento': f"EMP-{e:04d}",
+                'Inicio_Prevista': data_aleatoria(rnd, 0.2), 'Termino_Prevista': data_aleatoria(rnd, 0.2),
+                'Inicio_Real': data_aleatoria(rnd, 0.4), 'Termino_Real': data_aleatoria(rnd, 0.5),
+                '% concluído': rnd.choice([0.0, 33.3, 99.99, 100.0]),
+                'SETOR': rnd.choice([etapa, np.nan]),
+            })
+    df = pd.DataFrame(linhas, columns=['Etapa', 'Empreendimento', *COLUNAS_DATA, '% concluído', 'SETOR'])
+    df = df.astype({'Etapa': 'category', 'Empreendimento': 'category', 'SETOR': 'category',
+                    '% concluído': 'float32', **{col: 'datetime64[ns]' for col in COLUNAS_DATA}})
+    return app.calcular_metricas_etapas(df, inicio_real_como_fallback=False)
+
+
+def gerar_ordem_meta(n_empreendimentos, rnd, fora=0.0):
+    """Posição de cada empreendimento na ordenação da meta; `fora` ficam sem posição (999)"""
+    nomes = [f"EMP-{e:04d}" for e in range(n_empreendimentos) if rnd.random() >= fora]
+    rnd.shuffle(nomes)
+    return {nome: idx for idx, nome in enumerate(nomes)}
+
+
+def sem_ordem(resultado):
+    """Tarefas de cada etapa ordenadas pelo id, para comparar sem a ordem dos empates"""
+    tarefas_por_etapa, nomes = resultado
+    return {etapa: sorted(tarefas, key=lambda tarefa: tarefa["id"]) for etapa, tarefas in tarefas_por_etapa.items()}, nomes
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agregados", type=int, default=200, help="agregados aleatórios na verificação")
+    parser.add_argument("--empreendimentos", type=int, default=2000, help="empreendimentos por etapa no benchmark")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    app = carregar_do_app(
+        "ORDEM_ETAPAS_GLOBAL", "sigla_para_nome_completo", "mapear_valores", "calcular_metricas_etapas",
+        "_formatar_por_valor", "_formatar_datas", "_formatar_meses", "_formatar_variacao", "montar_tarefas_por_etapa",
+        business_days=business_days, business_days_per_month=business_days_per_month,
+    )
+    rnd = random.Random(args.semente)
+
+    for k in range(args.agregados):
+        n = rnd.randint(0, 40)
+        df = gerar_agregado(app, n, rnd)
+        com_empates = k % 2 == 1
+        ordem_meta = gerar_ordem_meta(n, rnd, fora=0.3 if com_empates else 0.0)
+        esperado = montar_tarefas_por_etapa_legado(app, df, ordem_meta)
+        obtido = app.montar_tarefas_por_etapa(df, ordem_meta)
+        if com_empates:
+            esperado, obtido = sem_ordem(esperado), sem_ordem(obtido)
+        assert json.dumps(obtido) == json.dumps(esperado), "tarefas diferentes do laço por etapa"
+    print(f"verificação diferencial: {args.agregados} agregados com o mesmo JSON")
+
+    df = gerar_agregado(app, args.empreendimentos, rnd, presenca=1.0)
+    ordem_meta = gerar_ordem_meta(args.empreendimentos, rnd)
+    esperado, t_legado = medir(lambda: montar_tarefas_por_etapa_legado(app, df, ordem_meta))
+    obtido, t_novo = medir(lambda: app.montar_tarefas_por_etapa(df, ordem_meta))
+    assert json.dumps(obtido) == json.dumps(esperado)
+    print(f"{len(app.ORDEM_ETAPAS_GLOBAL)} etapas x {args.empreendimentos} empreendimentos ({len(df)} linhas agregadas)")
+    print(f"laço por etapa (iterrows): {t_legado:8.3f} s")
+    print(f"uma passada ordenada:      {t_novo:8.3f} s  ({t_legado / t_novo:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
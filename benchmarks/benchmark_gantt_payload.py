@@ -0,0 +1,289 @@
+"""
+Verificação diferencial e benchmark de converter_dados_para_gantt.
+
+Confere primeiro as métricas de calcular_metricas_etapas (datas efetivas,
+durações, VT, VD e status) contra as regras por linha originais de
+converter_dados_para_gantt e gerar_gantt_consolidado, com a contagem de dias
+úteis original (bdate_range, sem feriados) e o mesmo `agora`, em agregados
+com datas vazias, início previsto vazio caindo para o real, etapas em
+aberto e datas em volta de hoje.
+
+Depois compara o montador colunar de app.py (reindex contra ORDEM_ETAPAS_GLOBAL e
+formatação só dos valores distintos) com o laço original (filtro por empreendimento e etapa +
+iterrows) em agregados aleatórios — etapas ausentes, datas vazias, Etapa fora
+da ordem, progresso parcial — e exige o mesmo JSON. Depois mede os dois numa
+carteira grande.
+
+Uso:
+    python benchmarks/benchmark_gantt_payload.py
+    python benchmarks/benchmark_gantt_payload.py --agregados 200 --empreendimentos 5000
+"""
+import argparse
+import functools
+import json
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from calculate_business_days import BusinessCalendar, business_days, business_days_per_month
+from funcoes_app import carregar_do_app
+
+ETAPAS_EXTRAS = ['XX']  # etapa fora de ORDEM_ETAPAS_GLOBAL: não entra no Gantt
+
+
+def converter_dados_para_gantt_legado(app, df):
+    """Laço original (sem os prints de debug), mantido só para comparação"""
+    if df.empty:
+        return []
+    if "VT" not in df.columns:
+        df = app.calcular_metricas_etapas(df)
+    dias_uteis_mes = business_days_per_month()
+
+    gantt_data = []
+    for empreendimento in df["Empreendimento"].unique():
+        df_emp = df[df["Empreendimento"] == empreendimento].copy()
+        etapas_para_processar = []
+        for etapa_sigla in app.ORDEM_ETAPAS_GLOBAL:
+            etapa_data = df_emp[df_emp["Etapa"] == etapa_sigla]
+            if not etapa_data.empty:
+                for idx, row in etapa_data.iterrows():
+                    etapas_para_processar.append((etapa_sigla, row))
+            else:
+                etapas_para_processar.append((etapa_sigla, None))
+
+        tasks = []
+        for i, (etapa_sigla, row) in enumerate(etapas_para_processar):
+            etapa_nome_completo = app.sigla_para_nome_completo.get(etapa_sigla, etapa_sigla)
+            if row is None:
+                tasks.append({
+                    "id": f"t{i}", "name": etapa_nome_completo, "name_sigla": etapa_sigla, "numero_etapa": i + 1,
+                    "start_previsto": None, "end_previsto": None, "start_real": None, "end_real": None,
+                    "end_real_original_raw": None, "setor": "Não especificado",
+                    "grupo": app.GRUPO_POR_ETAPA.get(etapa_sigla, "Não especificado"), "progress": 0,
+                    "inicio_previsto": "N/D", "termino_previsto": "N/D", "inicio_real": "N/D", "termino_real": "N/D",
+                    "duracao_prev_meses": "-", "duracao_real_meses": "-", "vt_text": "-", "vd_text": "-",
+                    "status_color_class": 'status-default'
+                })
+                continue
+
+            start_date = row["Inicio_Efetivo"]
+            end_date = row["Termino_Efetivo"]
+            start_real = row.get("Inicio_Real")
+            end_real_original = row.get("Termino_Real")
+            end_real_visual = row["Termino_Real_Visual"]
+            progress = row.get("% concluído", 0)
+            dur_prev_meses = row["Dias_Uteis_Previstos"] / dias_uteis_mes if pd.notna(row["Dias_Uteis_Previstos"]) else None
+            dur_real_meses = row["Dias_Uteis_Reais"] / dias_uteis_mes if pd.notna(row["Dias_Uteis_Reais"]) else None
+            vt = row["VT"]
+            vd = row["VD"]
+            tasks.append({
+                "id": f"t{i}", "name": etapa_nome_completo, "name_sigla": etapa_sigla, "numero_etapa": i + 1,
+                "start_previsto": start_date.strftime("%Y-%m-%d") if pd.notna(start_date) else None,
+                "end_previsto": end_date.strftime("%Y-%m-%d") if pd.notna(end_date) else None,
+                "start_real": pd.to_datetime(start_real).strftime("%Y-%m-%d") if pd.notna(start_real) else None,
+                "end_real": pd.to_datetime(end_real_visual).strftime("%Y-%m-%d") if pd.notna(end_real_visual) else None,
+                "end_real_original_raw": pd.to_datetime(end_real_original).strftime("%Y-%m-%d") if pd.notna(end_real_original) else None,
+                "setor": row.get("SETOR", "Não especificado"),
+                "grupo": app.GRUPO_POR_ETAPA.get(etapa_sigla, "Não especificado"),
+                "progress": int(progress),
+                "inicio_previsto": start_date.strftime("%d/%m/%y") if pd.notna(start_date) else "N/D",
+                "termino_previsto": end_date.strftime("%d/%m/%y") if pd.notna(end_date) else "N/D",
+                "inicio_real": pd.to_datetime(start_real).strftime("%d/%m/%y") if pd.notna(start_real) else "N/D",
+                "termino_real": pd.to_datetime(end_real_original).strftime("%d/%m/%y") if pd.notna(end_real_original) else "N/D",
+                "duracao_prev_meses": f"{dur_prev_meses:.1f}".replace('.', ',') if dur_prev_meses is not None else "-",
+                "duracao_real_meses": f"{dur_real_meses:.1f}".replace('.', ',') if dur_real_meses is not None else "-",
+                "vt_text": f"{int(vt):+d}d" if pd.notna(vt) else "-",
+                "vd_text": f"{int(vd):+d}d" if pd.notna(vd) else "-",
+                "status_color_class": row["status_color_class"]
+            })
+
+        df_meta = df_emp[df_emp["Etapa"] == "M"]
+        data_meta = None
+        if not df_meta.empty:
+            for col in ["Inicio_Prevista", "Termino_Prevista", "Inicio_Real", "Termino_Real"]:
+                if pd.notna(df_meta[col].iloc[0]):
+                    data_meta = pd.to_datetime(df_meta[col].iloc[0])
+                    break
+        gantt_data.append({
+            "id": f"p{len(gantt_data)}", "name": empreendimento, "tasks": tasks,
+            "meta_assinatura_date": data_meta.strftime("%Y-%m-%d") if data_meta else None
+        })
+    return gantt_data
+
+
+def calculate_business_days_legado(start_date, end_date):
+    """calculate_business_days original (bdate_range, sem feriados)"""
+    if pd.isna(start_date) or pd.isna(end_date):
+        return pd.NA
+    sign = 1
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+        sign = -1
+    return len(pd.bdate_range(start=start_date, end=end_date)) * sign
+
+
+def metricas_legado(df, agora, inicio_real_como_fallback=True):
+    """
+    Regras por linha originais (converter_dados_para_gantt com fallback para o
+    real; gerar_gantt_consolidado sem), com datetime.now() trocado por `agora`
+    """
+    linhas = []
+    hoje = agora.normalize()
+    for _, row in df.iterrows():
+        start_date, end_date = row.get("Inicio_Prevista"), row.get("Termino_Prevista")
+        start_real, end_real_original = row.get("Inicio_Real"), row.get("Termino_Real")
+        progress = row.get("% concluído", 0)
+
+        if inicio_real_como_fallback:
+            if pd.isna(start_date):
+                start_date = start_real if pd.notna(start_real) else agora
+            if pd.isna(end_date):
+                end_date = end_real_original if pd.notna(end_real_original) else (start_date + timedelta(days=30))
+        else:
+            if pd.isna(start_date):
+                start_date = agora
+            if pd.isna(end_date):
+                end_date = start_date + timedelta(days=30)
+
+        end_real_visual = end_real_original
+        if pd.notna(start_real) and progress < 100 and pd.isna(end_real_original):
+            end_real_visual = agora
+
+        vt = calculate_business_days_legado(end_date, end_real_original)
+        duracao_prevista_uteis = calculate_business_days_legado(start_date, end_date)
+        duracao_real_uteis = calculate_business_days_legado(start_real, end_real_original)
+        vd = None
+        if pd.notna(duracao_real_uteis) and pd.notna(duracao_prevista_uteis):
+            vd = duracao_real_uteis - duracao_prevista_uteis
+
+        status_color_class = 'status-default'
+        if progress == 100:
+            if pd.notna(end_real_original) and pd.notna(end_date):
+                status_color_class = 'status-green' if end_real_original <= end_date else 'status-red'
+        elif progress < 100 and pd.notna(start_real) and pd.notna(end_real_original) and (end_real_original < hoje):
+            status_color_class = 'status-yellow'
+
+        linhas.append({
+            "Inicio_Efetivo": start_date, "Termino_Efetivo": end_date, "Termino_Real_Visual": end_real_visual,
+            "Dias_Uteis_Previstos": duracao_prevista_uteis, "Dias_Uteis_Reais": duracao_real_uteis,
+            "Dias_Corridos_Previstos": (end_date - start_date).days,
+            "Dias_Corridos_Reais": (end_real_original - start_real).days
+            if pd.notna(start_real) and pd.notna(end_real_original) else np.nan,
+            "VT": vt, "VD": vd, "status_color_class": status_color_class,
+        })
+    return pd.DataFrame(linhas, index=df.index, columns=COLUNAS_METRICAS)
+
+
+COLUNAS_METRICAS = ["Inicio_Efetivo", "Termino_Efetivo", "Termino_Real_Visual", "Dias_Uteis_Previstos",
+                    "Dias_Uteis_Reais", "Dias_Corridos_Previstos", "Dias_Corridos_Reais", "VT", "VD",
+                    "status_color_class"]
+
+
+def conferir_metricas(app_sem_feriados, rnd, n_agregados):
+    """calcular_metricas_etapas == regras por linha originais, nas duas visões"""
+    for i in range(n_agregados):
+        # Metade dos casos com agora à meia-noite (limite de "hoje"), metade no meio do dia
+        agora = pd.Timestamp('2025-06-02') + pd.Timedelta(days=rnd.randint(0, 400))
+        if i % 2:
+            agora += pd.Timedelta(seconds=rnd.randint(1, 86_399))
+        df = gerar_agregado(rnd.randint(0, 30), app_sem_feriados.ORDEM_ETAPAS_GLOBAL, rnd, agora)
+        for fallback in (True, False):
+            obtido = app_sem_feriados.calcular_metricas_etapas(df, inicio_real_como_fallback=fallback, agora=agora)
+            esperado = metricas_legado(df, agora, fallback)
+            for col in COLUNAS_METRICAS:
+                if col == "status_color_class":
+                    assert obtido[col].tolist() == esperado[col].tolist(), (col, fallback, agora)
+                elif col in ("Inicio_Efetivo", "Termino_Efetivo", "Termino_Real_Visual"):
+                    pd.testing.assert_series_equal(obtido[col], pd.to_datetime(esperado[col]).astype(obtido[col].dtype),
+                                                   check_names=False, obj=col)
+                else:
+                    # O original devolve pd.NA/None onde a versão vetorizada devolve NaN
+                    esperado_num = pd.to_numeric(esperado[col], errors='coerce').astype(float)
+                    pd.testing.assert_series_equal(obtido[col].astype(float), esperado_num, check_names=False, obj=col)
+
+
+def data_aleatoria(rnd, vazia=0.25, agora=None):
+    if rnd.random() < vazia:
+        return pd.NaT
+    if agora is not None and rnd.random() < 0.3:
+        # Em volta de hoje: ontem, hoje, amanhã ou o próprio instante de referência
+        return rnd.choice([agora.normalize() + pd.Timedelta(days=rnd.randint(-1, 1)), agora])
+    return pd.Timestamp('2024-01-01') + pd.Timedelta(days=rnd.randint(0, 900))
+
+
+def gerar_agregado(n_empreendimentos, etapas, rnd, agora=None):
+    """Agregado (Empreendimento, Etapa) como o de gerar_gantt_por_projeto (com `agora`, datas em volta dele)"""
+    linhas = []
+    for e in range(n_empreendimentos):
+        for etapa in etapas + ETAPAS_EXTRAS:
+            if rnd.random() < 0.2:
+                continue
+            linhas.append({
+                'Empreendimento': f"EMP-{e:04d}", 'Etapa': etapa,
+                'Inicio_Prevista': data_aleatoria(rnd, agora=agora), 'Termino_Prevista': data_aleatoria(rnd, agora=agora),
+                'Inicio_Real': data_aleatoria(rnd, 0.4, agora), 'Termino_Real': data_aleatoria(rnd, 0.5, agora),
+                '% concluído': rnd.choice([0.0, 33.3, 99.99, 100.0, 100.0]),
+                'SETOR': rnd.choice([etapa, np.nan]),
+            })
+    df = pd.DataFrame(linhas, columns=['Empreendimento', 'Etapa', 'Inicio_Prevista', 'Termino_Prevista',
+                                       'Inicio_Real', 'Termino_Real', '% concluído', 'SETOR'])
+    return df.astype({'Empreendimento': 'category', 'Etapa': 'category', '% concluído': 'float32',
+                      'SETOR': 'category',
+                      **{col: 'datetime64[ns]' for col in ['Inicio_Prevista', 'Termino_Prevista', 'Inicio_Real', 'Termino_Real']}})
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agregados", type=int, default=100, help="agregados aleatórios na verificação")
+    parser.add_argument("--empreendimentos", type=int, default=2000, help="tamanho da carteira do benchmark")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    app = carregar_do_app(
+        "ORDEM_ETAPAS_GLOBAL", "sigla_para_nome_completo", "GRUPOS", "GRUPO_POR_ETAPA", "mapear_valores",
+        "calcular_metricas_etapas", "_formatar_por_valor", "_formatar_datas", "_formatar_meses", "_formatar_variacao",
+        "calcular_datas_meta_novo", "converter_dados_para_gantt",
+        business_days=business_days, business_days_per_month=business_days_per_month,
+    )
+    rnd = random.Random(args.semente)
+
+    # Contagem sem feriados, como o calculate_business_days original
+    app_sem_feriados = carregar_do_app(
+        "ORDEM_ETAPAS_GLOBAL", "calcular_metricas_etapas",
+        business_days=functools.partial(business_days, calendar=BusinessCalendar([])),
+    )
+    conferir_metricas(app_sem_feriados, rnd, args.agregados)
+    print(f"métricas: {args.agregados} agregados iguais às regras por linha originais (visão por projeto e consolidada)")
+
+    for _ in range(args.agregados):
+        df = app.calcular_metricas_etapas(gerar_agregado(rnd.randint(0, 30), app.ORDEM_ETAPAS_GLOBAL, rnd))
+        esperado = json.dumps(converter_dados_para_gantt_legado(app, df))
+        obtido = json.dumps(app.converter_dados_para_gantt(df))
+        assert obtido == esperado, "payload diferente do laço original"
+    print(f"verificação diferencial: {args.agregados} agregados com o mesmo JSON")
+
+    df = app.calcular_metricas_etapas(gerar_agregado(args.empreendimentos, app.ORDEM_ETAPAS_GLOBAL, rnd))
+    esperado, t_legado = medir(lambda: converter_dados_para_gantt_legado(app, df))
+    obtido, t_novo = medir(lambda: app.converter_dados_para_gantt(df))
+    assert json.dumps(obtido) == json.dumps(esperado)
+    print(f"carteira de {args.empreendimentos} empreendimentos ({len(df)} linhas agregadas)")
+    print(f"iterrows por empreendimento/etapa: {t_legado:8.3f} s")
+    print(f"montador colunar:                  {t_novo:8.3f} s  ({t_legado / t_novo:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark dos motores de leitura do planejador (processa_venda_registro).
+
+Gera planilhas sintéticas com o mesmo layout da aba "PLANEJADOR MÓDULOS"
+(1k/10k/50k módulos por padrão) e mede, para cada motor disponível, o tempo
+da leitura completa e da leitura com projeção de colunas (fixas + PREV).
+
+Uso:
+    python benchmarks/benchmark_leitura_excel.py
+    python benchmarks/benchmark_leitura_excel.py --linhas 1000 5000 --repeticoes 3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+import processa_venda_registro as pvr
+
+ETAPAS = ["DM", "DOC", "LAE", "MEM", "CONT", "ASS", "M", "PJ"]
+
+
+def montar_cabecalho():
+    """Cabeçalho com as mesmas posições da planilha real (45 colunas)"""
+    cabecalho = [None, "UGB", "EMP", "MÓDULO", "Nº LOTES"]
+    for etapa in ETAPAS:
+        inicio_real = "DOC.REAL.INICIO" if etapa == "DOC" else f"{etapa}.REAL.INÍCIO"
+        cabecalho += [f"{etapa}.PREV.INÍCIO", f"{etapa}.PREV.TÉRMINO", inicio_real, f"{etapa}.REAL.TÉRMINO", None]
+    cabecalho[-1] = "Avaliação"
+    return cabecalho
+
+
+def gerar_planilha(caminho, n_linhas, semente=42):
+    rnd = random.Random(semente)
+    cabecalho = montar_cabecalho()
+    base = datetime(2025, 1, 1)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(pvr.ABA_PLANEJADOR)
+    for _ in range(6):
+        ws.append([None] * len(cabecalho))
+    ws.append(cabecalho)
+
+    for i in range(n_linhas):
+        linha = [None, rnd.choice(["CA", "GA", "SC", "JB"]), f"CONDOMINIO EMP-{i // 4:05d}",
+                 f"Módulo {i % 4 + 1:02d}", rnd.randint(10, 400)]
+        inicio = base + timedelta(days=rnd.randint(0, 700))
+        for _ in ETAPAS:
+            termino = inicio + timedelta(days=rnd.randint(10, 40))
+            real = rnd.random() < 0.5
+            linha += [inicio, termino, inicio if real else None, termino if real else None, None]
+            inicio = termino + timedelta(days=1)
+        linha[-1] = rnd.randint(-100, 100)
+        ws.append(linha)
+    wb.save(caminho)
+
+
+def motores_disponiveis():
+    disponiveis = []
+    for motor in pvr.MOTORES_EXCEL:
+        if motor == "calamine":
+            try:
+                import python_calamine  # noqa: F401
+            except ImportError:
+                print("(calamine não instalado - ignorado)")
+                continue
+        disponiveis.append(motor)
+    return disponiveis
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeticoes", type=int, default=1)
+    args = parser.parse_args()
+
+    motores = motores_disponiveis()
+    print(f"{'módulos':>8} | {'motor':<20} | {'completa (s)':>12} | {'projetada (s)':>13}")
+    print("-" * 64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_linhas in args.linhas:
+            caminho = os.path.join(tmp, f"planejador_{n_linhas}.xlsx")
+            gerar_planilha(caminho, n_linhas)
+
+            for motor in motores:
+                # A resolução do cabeçalho (projeção) também segue o motor configurado
+                pvr.MOTOR_EXCEL = motor
+                completa = medir(lambda: pvr._ler_planilha_planejador(caminho, False, motor), args.repeticoes)
+                projetada = medir(lambda: pvr._ler_planilha_planejador(caminho, True, motor), args.repeticoes)
+                print(f"{n_linhas:>8} | {motor:<20} | {completa:>12.3f} | {projetada:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
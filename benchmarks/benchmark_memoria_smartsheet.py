@@ -0,0 +1,107 @@
+"""
+Benchmark de memória da leitura do Smartsheet: planilha inteira x paginada.
+
+A planilha sintética é gerada sob demanda pelo cliente falso, então o pico
+medido (tracemalloc) é o da leitura em si: na leitura inteira cresce com o
+número de linhas (todos os objetos da API de uma vez); na paginada o excedente
+sobre o DataFrame final fica limitado pelo tamanho da página.
+
+Mede também a sincronização incremental (padrão, SMARTSHEET_SYNC_INCREMENTAL=1),
+na carga inicial e num delta com --modificadas das linhas alteradas, numa
+chamada só (TAMANHO_PAGINA=0) e em páginas. A paginação limita os objetos da
+API (delta e listagem de IDs) a uma página por vez, mas o armazenamento local
+guarda a planilha inteira (um dict por linha, relido e regravado em JSON a
+cada sincronização): nesse modo o pico cresce com a planilha, não com a
+página. Memória limitada pela página só com SMARTSHEET_SYNC_INCREMENTAL=0.
+
+Uso:
+    python benchmarks/benchmark_memoria_smartsheet.py
+    python benchmarks/benchmark_memoria_smartsheet.py --linhas 5000 20000 40000 --pagina 2000
+    python benchmarks/benchmark_memoria_smartsheet.py --linhas 20000 --modificadas 0.05
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import processa_venda_smartsheet as pvs
+from smartsheet_sintetico import ClienteSmartsheetFalso, ClientePaginadoSintetico, gerar_planilha
+
+
+def ler_inteira(client):
+    sheet = client.Sheets.get_sheet(1)
+    return pvs.converter_linhas_para_dataframe(sheet.columns, sheet.rows)
+
+
+def medir(funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    tempo = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tempo, pico / 2**20
+
+
+def medir_incremental(n_linhas, args, tamanho_pagina):
+    """Picos da carga inicial e do delta da sincronização incremental; retorna (picos, DataFrame do delta)"""
+    pvs.TAMANHO_PAGINA = tamanho_pagina
+    sheet = gerar_planilha(n_linhas, args.colunas)
+    falso = ClienteSmartsheetFalso(sheet)
+    with tempfile.TemporaryDirectory() as pasta, contextlib.redirect_stdout(io.StringIO()):
+        pvs.ARQUIVO_SINCRONIZACAO = os.path.join(pasta, "smartsheet_sync.json")
+        _, t_carga, pico_carga = medir(lambda: pvs.sincronizar_sheet_data(falso, sheet.id))
+        for row in sheet.rows[::max(1, round(1 / args.modificadas))]:
+            falso._tocar(sheet, row)
+        df_delta, t_delta, pico_delta = medir(lambda: pvs.sincronizar_sheet_data(falso, sheet.id))
+        df_completo = pvs.get_sheet_data(falso, sheet.id)
+    pd.testing.assert_frame_equal(df_delta, df_completo)
+    return (("carga", t_carga, pico_carga), ("delta", t_delta, pico_delta)), df_delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[2_500, 5_000, 10_000, 20_000])
+    parser.add_argument("--colunas", type=int, default=40)
+    parser.add_argument("--pagina", type=int, default=2_000)
+    parser.add_argument("--modificadas", type=float, default=0.05, help="fração de linhas alteradas antes do delta")
+    args = parser.parse_args()
+
+    print(f"{'linhas':>8} {'modo':>9} {'tempo (s)':>10} {'pico (MB)':>10} {'DataFrame (MB)':>15} {'excedente (MB)':>15}")
+    for n_linhas in args.linhas:
+        df_inteira, t_inteira, pico_inteira = medir(lambda: ler_inteira(ClientePaginadoSintetico(n_linhas, args.colunas)))
+        df_paginada, t_paginada, pico_paginada = medir(lambda: pvs.get_sheet_data_paginado(
+            ClientePaginadoSintetico(n_linhas, args.colunas), 1, tamanho_pagina=args.pagina))
+
+        pd.testing.assert_frame_equal(df_inteira, df_paginada)
+        tamanho_df = df_paginada.memory_usage(deep=True).sum() / 2**20
+        for modo, tempo, pico in (("inteira", t_inteira, pico_inteira), ("paginada", t_paginada, pico_paginada)):
+            print(f"{n_linhas:>8} {modo:>9} {tempo:>10.2f} {pico:>10.1f} {tamanho_df:>15.1f} {pico - tamanho_df:>15.1f}")
+
+    print(f"\nSincronização incremental ({args.modificadas:.0%} das linhas modificadas antes do delta)")
+    print(f"{'linhas':>8} {'modo':>16} {'tempo (s)':>10} {'pico (MB)':>10} {'DataFrame (MB)':>15} {'excedente (MB)':>15}")
+    for n_linhas in args.linhas:
+        for rotulo, tamanho_pagina in (("inteira", 0), ("paginada", args.pagina)):
+            medidas, df = medir_incremental(n_linhas, args, tamanho_pagina)
+            tamanho_df = df.memory_usage(deep=True).sum() / 2**20
+            for etapa, tempo, pico in medidas:
+                print(f"{n_linhas:>8} {rotulo + ' ' + etapa:>16} {tempo:>10.2f} {pico:>10.1f} {tamanho_df:>15.1f} {pico - tamanho_df:>15.1f}")
+
+    # Edição concorrente no meio da leitura: a leitura recomeça e o resultado continua coerente
+    cliente = ClientePaginadoSintetico(args.linhas[0], args.colunas)
+    cliente.Sheets.alterar_apos_pagina = 1
+    df = pvs.get_sheet_data_paginado(cliente, 1, tamanho_pagina=args.pagina)
+    pd.testing.assert_frame_equal(df, ler_inteira(ClientePaginadoSintetico(args.linhas[0], args.colunas)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark da leitura de várias planilhas do Smartsheet: sequencial x paralela.
+
+Usa o cliente falso com latência por chamada e respostas 429 e 503 aleatórias, o
+mesmo embrulho de backoff do cliente real (ClienteComBackoff) e confere que
+o resultado paralelo é igual ao sequencial e ao esperado (planilhas
+concatenadas na ordem, com a coluna de origem).
+
+Uso:
+    python benchmarks/benchmark_multiplas_planilhas.py
+    python benchmarks/benchmark_multiplas_planilhas.py --planilhas 6 --latencia 0.3 --taxa-429 0.3 --taxa-503 0.1
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import processa_venda_smartsheet as pvs
+from smartsheet_sintetico import ClienteSmartsheetFalso, gerar_planilha
+
+
+def ler(planilhas, args, conexoes):
+    pvs.MAX_CONEXOES = conexoes
+    falso = ClienteSmartsheetFalso(*planilhas, latencia=args.latencia, taxa_429=args.taxa_429,
+                                   taxa_falha=args.taxa_503, semente=args.semente)
+    client = pvs.ClienteComBackoff(falso)
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = pvs.obter_dados_planilhas(client, [sheet.name for sheet in planilhas])
+    return df, time.perf_counter() - inicio, len(falso.Sheets.chamadas), falso.Sheets.respostas_429 + falso.Sheets.respostas_503
+
+
+def esperado(planilhas):
+    partes = []
+    for sheet in planilhas:
+        colunas = [col for col in sheet.columns if col.title in pvs.COLUNAS_UTILIZADAS]
+        ids = {col.id for col in colunas}
+        linhas = [type(row)(id=row.id, cells=[c for c in row.cells if c.column_id in ids]) for row in sheet.rows]
+        df = pvs.converter_linhas_para_dataframe(colunas, linhas)
+        df[pvs.COLUNA_ORIGEM] = sheet.name
+        partes.append(df)
+    return pd.concat(partes, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--planilhas", type=int, default=4)
+    parser.add_argument("--linhas", type=int, default=5_000)
+    parser.add_argument("--latencia", type=float, default=0.2)
+    parser.add_argument("--taxa-429", type=float, default=0.2)
+    parser.add_argument("--taxa-503", type=float, default=0.05)
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args()
+
+    planilhas = [gerar_planilha(args.linhas, 25, semente=i, sheet_id=i + 1, nome=f"MÓDULOS DE VENDA - R{i + 1}")
+                 for i in range(args.planilhas)]
+
+    pvs.SINCRONIZACAO_INCREMENTAL = False
+    pvs.TAMANHO_PAGINA = 2_000
+    pvs.BACKOFF_BASE = 0.05
+    with tempfile.TemporaryDirectory() as pasta:
+        pvs.REGISTRO_IDS = os.path.join(pasta, "smartsheet_ids.json")
+        df_seq, t_seq, chamadas_seq, erros_seq = ler(planilhas, args, 1)
+        os.remove(pvs.REGISTRO_IDS)
+        df_par, t_par, chamadas_par, erros_par = ler(planilhas, args, args.planilhas)
+
+    pd.testing.assert_frame_equal(df_seq, esperado(planilhas))
+    pd.testing.assert_frame_equal(df_par, df_seq)
+    print(f"{args.planilhas} planilhas x {args.linhas} linhas, latência {args.latencia}s, 429 em {args.taxa_429:.0%} e 503 em {args.taxa_503:.0%} das chamadas")
+    print(f"sequencial: {t_seq:6.2f} s  ({chamadas_seq} chamadas, {erros_seq} respostas 429/503)")
+    print(f"paralela:   {t_par:6.2f} s  ({chamadas_par} chamadas, {erros_par} respostas 429/503)  ({t_seq / t_par:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
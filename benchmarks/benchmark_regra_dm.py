@@ -0,0 +1,104 @@
+"""
+Verificação diferencial e benchmark de aplicar_regra_definicao_modulo.
+
+Compara a versão vetorizada de app.py (groupby/transform numa passada) com o
+laço original por empreendimento em carteiras aleatórias — empreendimentos
+vazios, DM repetida, DM ausente, Termino_Real vazio, percentuais 0-100 — e
+exige saídas idênticas. Depois mede as duas numa carteira grande.
+
+Uso:
+    python benchmarks/benchmark_regra_dm.py
+    python benchmarks/benchmark_regra_dm.py --carteiras 1000 --empreendimentos 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from funcoes_app import carregar_do_app
+
+ETAPAS = ['DM', 'DOC', 'LAE', 'MEM', 'CONT', 'ASS', 'M', 'PJ']
+
+
+def aplicar_regra_definicao_modulo_legado(df_completo):
+    """Laço original por empreendimento, mantido só para comparação"""
+    ETAPA_MODULO = 'DM'
+    if 'Empreendimento' not in df_completo.columns or '% concluído' not in df_completo.columns:
+        return df_completo
+
+    df_modificado = df_completo.copy()
+    for empreendimento in df_modificado['Empreendimento'].unique():
+        indice_dm = df_modificado[(df_modificado['Empreendimento'] == empreendimento) & (df_modificado['Etapa'] == ETAPA_MODULO)].index
+        outras_etapas_100 = df_modificado[(df_modificado['Empreendimento'] == empreendimento) &
+                                          (df_modificado['Etapa'] != ETAPA_MODULO) &
+                                          (pd.to_numeric(df_modificado['% concluído'], errors='coerce') >= 100)]
+        if not indice_dm.empty:
+            dm_row = df_modificado.loc[indice_dm[0]]
+            if pd.isna(dm_row.get('Termino_Real')) and not outras_etapas_100.empty:
+                df_modificado.loc[indice_dm[0], '% concluído'] = 100.0
+    return df_modificado
+
+
+def gerar_carteira(n_empreendimentos, rnd):
+    """Carteira aleatória no esquema canônico (categóricas, datetime64, float32)"""
+    linhas = []
+    for e in range(n_empreendimentos):
+        nome = None if rnd.random() < 0.03 else f"EMP-{e:04d}"
+        etapas = [etapa for etapa in ETAPAS if rnd.random() < 0.8]
+        if 'DM' in etapas and rnd.random() < 0.1:
+            etapas.append('DM')  # DM repetida: só a primeira linha pode mudar
+        for etapa in etapas:
+            linhas.append({
+                'Empreendimento': nome,
+                'Etapa': etapa,
+                '% concluído': rnd.choice([0.0, 25.0, 50.0, 99.0, 100.0, 100.0, np.nan]),
+                'Termino_Real': pd.NaT if rnd.random() < 0.5 else pd.Timestamp('2025-01-01') + pd.Timedelta(days=rnd.randint(0, 500)),
+            })
+    rnd.shuffle(linhas)
+    df = pd.DataFrame(linhas, columns=['Empreendimento', 'Etapa', '% concluído', 'Termino_Real'])
+    return df.astype({'Empreendimento': 'category', 'Etapa': 'category', '% concluído': 'float32',
+                      'Termino_Real': 'datetime64[ns]'})
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--carteiras", type=int, default=300, help="carteiras aleatórias na verificação")
+    parser.add_argument("--empreendimentos", type=int, default=2000, help="tamanho da carteira do benchmark")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    app = carregar_do_app("aplicar_regra_definicao_modulo")
+    rnd = random.Random(args.semente)
+
+    alteradas = 0
+    for _ in range(args.carteiras):
+        df = gerar_carteira(rnd.randint(0, 40), rnd)
+        esperado = aplicar_regra_definicao_modulo_legado(df)
+        obtido = app.aplicar_regra_definicao_modulo(df)
+        pd.testing.assert_frame_equal(obtido, esperado)
+        alteradas += int((esperado['% concluído'].fillna(-1) != df['% concluído'].fillna(-1)).sum())
+    print(f"verificação diferencial: {args.carteiras} carteiras idênticas ({alteradas} linhas DM alteradas pela regra)")
+
+    df = gerar_carteira(args.empreendimentos, rnd)
+    esperado, t_legado = medir(lambda: aplicar_regra_definicao_modulo_legado(df))
+    obtido, t_novo = medir(lambda: app.aplicar_regra_definicao_modulo(df))
+    pd.testing.assert_frame_equal(obtido, esperado)
+    print(f"carteira de {args.empreendimentos} empreendimentos ({len(df)} linhas)")
+    print(f"laço por empreendimento: {t_legado:8.3f} s")
+    print(f"groupby/transform:       {t_novo:8.3f} s  ({t_legado / t_novo:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark da conversão das linhas do Smartsheet em DataFrame.
+
+Compara o laço antigo de get_sheet_data (busca linear da coluna por célula e
+um dict por linha) com processa_venda_smartsheet.converter_linhas_para_dataframe
+numa planilha sintética (20k linhas x 40 colunas por padrão), e o ganho de
+pedir à API só as colunas de COLUNAS_UTILIZADAS (células trafegadas e
+tempo de conversão). Confere também que chamar_com_backoff repete 429 e
+falhas temporárias (503/4004) e não repete erros definitivos, e que a
+sincronização incremental, depois de alterações na planilha (célula
+editada, célula apagada, linha incluída e linha excluída), chega ao mesmo
+DataFrame de uma carga completa.
+
+Uso:
+    python benchmarks/benchmark_smartsheet.py
+    python benchmarks/benchmark_smartsheet.py --linhas 5000 --colunas 20
+"""
+import argparse
+import contextlib
+import copy
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import processa_venda_smartsheet as pvs
+import smartsheet
+
+from smartsheet_sintetico import ClienteSmartsheetFalso, erro_api, gerar_planilha
+
+
+def converter_legado(sheet):
+    """Laço original de get_sheet_data, mantido só para comparação"""
+    rows = []
+    for row in sheet.rows:
+        row_data = {}
+        for cell in row.cells:
+            column_name = next((col.title for col in sheet.columns if col.id == cell.column_id), None)
+            if column_name:
+                row_data[column_name] = cell.value
+        rows.append(row_data)
+    return pd.DataFrame(rows)
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+
+def conferir_repeticoes(sheet):
+    """Erros marcados como repetíveis no resultado (como o SDK levanta) são repetidos; os demais, não"""
+    pvs.BACKOFF_BASE = 0.001
+    falso = ClienteSmartsheetFalso(sheet)
+    client = pvs.ClienteComBackoff(falso)
+
+    falso.Sheets.erros_fixos = [
+        erro_api(429, 4003, "Rate limit exceeded.", True),
+        erro_api(503, 4004, "An unexpected error has occurred. Please retry your request.", True),
+        erro_api(500, 4002, "Server timeout exceeded. Request has failed.", True),
+    ]
+    with contextlib.redirect_stdout(io.StringIO()):
+        versao = client.Sheets.get_sheet_version(sheet.id).version
+    assert versao == sheet.version
+    assert len(falso.Sheets.chamadas) == 4
+
+    falso.Sheets.chamadas.clear()
+    falso.Sheets.erros_fixos = [erro_api(404, 1006, "Not Found.", False)]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.Sheets.get_sheet_version(sheet.id)
+    except smartsheet.exceptions.ApiError:
+        pass
+    else:
+        raise AssertionError("erro definitivo não deveria ser engolido")
+    assert len(falso.Sheets.chamadas) == 1
+    print("backoff: 429, 503/4004 e 4002 repetidos; 404/1006 não")
+
+
+def conferir_sincronizacao(sheet, tamanho_pagina):
+    """Delta aplicado sobre o armazenamento local == carga completa da planilha alterada"""
+    sheet = copy.deepcopy(sheet)
+    falso = ClienteSmartsheetFalso(sheet)
+    pvs.TAMANHO_PAGINA = tamanho_pagina
+    with tempfile.TemporaryDirectory() as pasta, contextlib.redirect_stdout(io.StringIO()):
+        pvs.ARQUIVO_SINCRONIZACAO = os.path.join(pasta, "smartsheet_sync.json")
+        column_ids = pvs.resolver_ids_colunas(falso, sheet.id)
+        pvs.sincronizar_sheet_data(falso, sheet.id, column_ids)
+
+        ids = [row.id for row in sheet.rows]
+        falso.alterar_celula(sheet.id, ids[1], "Atividade", "ATIVIDADE ALTERADA")
+        falso.alterar_celula(sheet.id, ids[2], "% concluído", None)
+        falso.incluir_linha(sheet.id, posicao=3, semente=7)
+        falso.incluir_linha(sheet.id, semente=8)
+        falso.excluir_linha(sheet.id, ids[4])
+        falso.excluir_linha(sheet.id, ids[-1])
+
+        falso.Sheets.chamadas.clear()
+        df_incremental = pvs.sincronizar_sheet_data(falso, sheet.id, column_ids)
+        leituras = [chamada for chamada in falso.Sheets.chamadas if chamada[0] == "get_sheet"]
+        assert any(chamada[3] is not None for chamada in leituras), "a sincronização deveria ter usado o delta"
+        assert not any(chamada[2] == column_ids and chamada[3] is None for chamada in leituras), \
+            "o delta não deveria ter caído na carga completa"
+        df_sem_alteracao = pvs.sincronizar_sheet_data(falso, sheet.id, column_ids)
+        df_completo = pvs.get_sheet_data(falso, sheet.id, column_ids)
+
+    pd.testing.assert_frame_equal(df_incremental, df_completo)
+    pd.testing.assert_frame_equal(df_sem_alteracao, df_completo)
+    assert df_completo.loc[1, "Atividade"] == "ATIVIDADE ALTERADA"
+    assert pd.isna(df_completo.loc[2, "% concluído"])
+    assert len(df_completo) == len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=20_000)
+    parser.add_argument("--colunas", type=int, default=40)
+    args = parser.parse_args()
+
+    sheet = gerar_planilha(args.linhas, args.colunas)
+    print(f"Planilha sintética: {args.linhas} linhas x {args.colunas} colunas")
+
+    df_legado, t_legado = medir(lambda: converter_legado(sheet))
+    df_novo, t_novo = medir(lambda: pvs.converter_linhas_para_dataframe(sheet.columns, sheet.rows))
+
+    pd.testing.assert_frame_equal(df_legado, df_novo)
+    print(f"laço legado:        {t_legado:8.3f} s")
+    print(f"conversão colunar:  {t_novo:8.3f} s  ({t_legado / t_novo:.0f}x)")
+
+    cliente = ClienteSmartsheetFalso(sheet)
+    column_ids = pvs.resolver_ids_colunas(cliente, sheet.id)
+    filtrada = cliente.Sheets.get_sheet(sheet.id, column_ids=column_ids)
+    df_filtrado, t_filtrado = medir(lambda: pvs.converter_linhas_para_dataframe(filtrada.columns, filtrada.rows))
+
+    pd.testing.assert_frame_equal(df_filtrado, df_novo[df_filtrado.columns])
+    celulas_total = sum(len(row.cells) for row in sheet.rows)
+    celulas_filtradas = sum(len(row.cells) for row in filtrada.rows)
+    print(f"colunas filtradas:  {t_filtrado:8.3f} s  ({t_novo / t_filtrado:.1f}x), "
+          f"{celulas_filtradas} de {celulas_total} células ({celulas_filtradas / celulas_total:.0%})")
+
+    conferir_repeticoes(sheet)
+    for tamanho_pagina in (0, max(1, args.linhas // 3)):
+        conferir_sincronizacao(sheet, tamanho_pagina)
+    print("sincronização incremental: igual à carga completa após editar, apagar, incluir e excluir")
+
+
+if __name__ == "__main__":
+    main()
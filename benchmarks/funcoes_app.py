@@ -0,0 +1,36 @@
+"""
+Carrega funções e constantes de app.py sem executar o script Streamlit.
+
+app.py é um script (carrega dados e desenha a página ao ser importado), então
+os benchmarks compilam apenas as definições pedidas, na ordem do arquivo, sem
+os decoradores de cache do Streamlit.
+"""
+import ast
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def carregar_do_app(*nomes, **contexto):
+    """Executa as funções/atribuições de nível superior chamadas `nomes`; `contexto` completa os globais"""
+    with open(APP, encoding="utf-8") as f:
+        arvore = ast.parse(f.read(), APP)
+
+    definicoes = []
+    for no in arvore.body:
+        if isinstance(no, ast.FunctionDef) and no.name in nomes:
+            no.decorator_list = []
+            definicoes.append(no)
+        elif isinstance(no, ast.Assign) and any(isinstance(alvo, ast.Name) and alvo.id in nomes for alvo in no.targets):
+            definicoes.append(no)
+
+    globais = {"pd": pd, "np": np, **contexto}
+    exec(compile(ast.Module(definicoes, type_ignores=[]), APP, "exec"), globais)
+    faltando = [nome for nome in nomes if nome not in globais]
+    if faltando:
+        raise NameError(f"Definições não encontradas em app.py: {faltando}")
+    return SimpleNamespace(**{nome: globais[nome] for nome in nomes})
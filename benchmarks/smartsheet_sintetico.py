@@ -0,0 +1,214 @@
+"""
+Planilhas Smartsheet sintéticas para os benchmarks.
+
+Os objetos imitam apenas os atributos usados por processa_venda_smartsheet
+(sheet.columns[].id/.title, sheet.rows[].id/.cells[].column_id/.value).
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import smartsheet
+
+COLUNAS_REAIS = [
+    "Nome da tarefa", "Atividade", "Módulo", "Iniciar", "Terminar", "% concluído",
+    "RowNumber", "AT.", "Antecessores", "OK", "Var. Térm.", "Início LB", "Término LB",
+    "Dur. LB", "Atribuído a", "Status", "Coluna23", "Coluna24", "Coluna25", "Coluna26",
+    "% de alocação",
+]
+
+
+def gerar_colunas(n_colunas):
+    titulos = COLUNAS_REAIS[:n_colunas] + [f"Extra {i}" for i in range(len(COLUNAS_REAIS), n_colunas)]
+    return [SimpleNamespace(id=1000 + i, title=titulo, index=i, primary=(i == 0))
+            for i, titulo in enumerate(titulos)]
+
+
+def gerar_valor(titulo, rnd):
+    if titulo in ("Iniciar", "Terminar", "Início LB", "Término LB"):
+        return (datetime(2025, 1, 1) + timedelta(days=rnd.randint(0, 700))).strftime("%Y-%m-%dT%H:%M:%S")
+    if titulo == "% concluído":
+        return rnd.choice([0.0, 0.25, 0.5, 1.0])
+    if titulo == "Atividade":
+        return rnd.choice(["DEFINIÇÃO DO MÓDULO", "DOCUMENTAÇÃO", "LAE", "MEMORIAL", "CONTRATAÇÃO"])
+    if titulo == "Módulo":
+        return f"CA | CONDOMINIO EMP-{rnd.randint(0, 500):03d}"
+    return f"{titulo} {rnd.randint(0, 99)}"
+
+
+def gerar_linha(row_id, colunas, rnd):
+    return SimpleNamespace(
+        id=row_id,
+        cells=[SimpleNamespace(column_id=col.id, value=gerar_valor(col.title, rnd)) for col in colunas],
+    )
+
+
+def gerar_planilha(n_linhas, n_colunas=40, semente=42, sheet_id=1, nome="MÓDULOS DE VENDA"):
+    rnd = random.Random(semente)
+    colunas = gerar_colunas(n_colunas)
+    linhas = [gerar_linha(10_000 + i, colunas, rnd) for i in range(n_linhas)]
+    return SimpleNamespace(id=sheet_id, name=nome, version=1, columns=colunas, rows=linhas,
+                           total_row_count=n_linhas)
+
+
+def erro_api(status_code, error_code, mensagem, should_retry):
+    """
+    ApiError como o SDK levanta: a marca de repetição fica só no resultado
+    do erro (erro.error.result.should_retry), não no argumento should_retry.
+    """
+    resultado = SimpleNamespace(status_code=status_code, code=error_code, message=mensagem, should_retry=should_retry)
+    return smartsheet.exceptions.ApiError(SimpleNamespace(result=resultado), f"{error_code}: {mensagem}")
+
+
+class _SheetsFalso:
+    """Subconjunto de client.Sheets respondido a partir de uma planilha em memória"""
+
+    def __init__(self, planilhas, latencia=0.0, taxa_429=0.0, semente=0, taxa_falha=0.0):
+        self.planilhas = {sheet.id: sheet for sheet in planilhas}
+        self.chamadas = []
+        self.latencia, self.taxa_429, self.taxa_falha = latencia, taxa_429, taxa_falha
+        self.rnd = random.Random(semente)
+        self.respostas_429 = 0
+        self.respostas_503 = 0
+        self.erros_fixos = []
+
+    def _rede(self):
+        """Latência de rede, limite de requisições (429) e falhas temporárias (503) simulados"""
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self.erros_fixos:
+            raise self.erros_fixos.pop(0)
+        if not (self.taxa_429 or self.taxa_falha):
+            return
+        sorteio = self.rnd.random()
+        if sorteio < self.taxa_429:
+            self.respostas_429 += 1
+            raise erro_api(429, 4003, "Rate limit exceeded.", True)
+        if sorteio < self.taxa_429 + self.taxa_falha:
+            self.respostas_503 += 1
+            raise erro_api(503, 4004, "An unexpected error has occurred. Please retry your request.", True)
+
+    def list_sheets(self, include_all=None, **kwargs):
+        self.chamadas.append(("list_sheets",))
+        self._rede()
+        return SimpleNamespace(data=[SimpleNamespace(id=s.id, name=s.name) for s in self.planilhas.values()])
+
+    def get_sheet_version(self, sheet_id):
+        self.chamadas.append(("get_sheet_version", sheet_id))
+        self._rede()
+        return SimpleNamespace(version=self.planilhas[sheet_id].version)
+
+    def get_columns(self, sheet_id, include_all=None, **kwargs):
+        self.chamadas.append(("get_columns", sheet_id))
+        self._rede()
+        return SimpleNamespace(data=list(self.planilhas[sheet_id].columns))
+
+    def get_sheet(self, sheet_id, column_ids=None, rows_modified_since=None, page_size=None, page=None, **kwargs):
+        self.chamadas.append(("get_sheet", sheet_id, column_ids, rows_modified_since, page_size, page))
+        self._rede()
+        sheet = self.planilhas[sheet_id]
+        colunas = [c for c in sheet.columns if column_ids is None or c.id in column_ids]
+        ids_colunas = {c.id for c in colunas}
+
+        linhas = sheet.rows
+        if rows_modified_since is not None:
+            desde = datetime.strptime(rows_modified_since, "%Y-%m-%dT%H:%M:%SZ")
+            linhas = [row for row in linhas if row.modified_at >= desde]
+        total = len(linhas)
+        if page_size is not None:
+            pagina = page or 1
+            linhas = linhas[(pagina - 1) * page_size:pagina * page_size]
+
+        # Objetos novos a cada resposta, como os que o SDK desserializa (conta na memória de quem lê)
+        return SimpleNamespace(
+            id=sheet.id, name=sheet.name, version=sheet.version, columns=colunas, total_row_count=total,
+            rows=[SimpleNamespace(id=row.id, cells=[SimpleNamespace(column_id=c.column_id, value=c.value)
+                                                    for c in row.cells if c.column_id in ids_colunas])
+                  for row in linhas],
+        )
+
+
+class ClienteSmartsheetFalso:
+    """
+    Cliente local com a mesma interface usada por processa_venda_smartsheet.
+
+    Permite alterar, incluir e excluir linhas (atualizando versão e data de
+    modificação) para comparar a sincronização incremental com a carga completa,
+    e simular latência por chamada, respostas 429 (taxa_429 = probabilidade) e
+    falhas temporárias 503/4004 (taxa_falha). Erros em Sheets.erros_fixos são
+    levantados, em ordem, nas próximas chamadas.
+    """
+
+    def __init__(self, *planilhas, latencia=0.0, taxa_429=0.0, semente=0, taxa_falha=0.0):
+        for sheet in planilhas:
+            for row in sheet.rows:
+                row.modified_at = getattr(row, "modified_at", datetime(2020, 1, 1))
+        self.Sheets = _SheetsFalso(planilhas, latencia, taxa_429, semente, taxa_falha)
+
+    def _tocar(self, sheet, row=None):
+        sheet.version += 1
+        if row is not None:
+            row.modified_at = datetime.utcnow()
+
+    def alterar_celula(self, sheet_id, row_id, titulo, valor):
+        sheet = self.Sheets.planilhas[sheet_id]
+        coluna = next(c for c in sheet.columns if c.title == titulo)
+        row = next(r for r in sheet.rows if r.id == row_id)
+        row.cells = [c for c in row.cells if c.column_id != coluna.id] + [SimpleNamespace(column_id=coluna.id, value=valor)]
+        self._tocar(sheet, row)
+
+    def incluir_linha(self, sheet_id, posicao=None, semente=0):
+        sheet = self.Sheets.planilhas[sheet_id]
+        row = gerar_linha(max((r.id for r in sheet.rows), default=10_000) + 1, sheet.columns, random.Random(semente))
+        sheet.rows.insert(len(sheet.rows) if posicao is None else posicao, row)
+        self._tocar(sheet, row)
+        return row.id
+
+    def excluir_linha(self, sheet_id, row_id):
+        sheet = self.Sheets.planilhas[sheet_id]
+        sheet.rows = [r for r in sheet.rows if r.id != row_id]
+        self._tocar(sheet)
+
+
+class _SheetsPaginadoSintetico:
+    """get_sheet que gera só as linhas da página pedida (a planilha inteira nunca fica em memória)"""
+
+    def __init__(self, n_linhas, colunas, semente, sheet_id):
+        self.n_linhas, self.colunas, self.semente, self.sheet_id = n_linhas, colunas, semente, sheet_id
+        self.version = 1
+        self.alterar_apos_pagina = None
+        self.chamadas = []
+
+    def _linha(self, i, colunas):
+        return gerar_linha(10_000 + i, colunas, random.Random(self.semente * 1_000_003 + i))
+
+    def get_columns(self, sheet_id, include_all=None, **kwargs):
+        return SimpleNamespace(data=list(self.colunas))
+
+    def get_sheet(self, sheet_id, column_ids=None, page_size=None, page=None, **kwargs):
+        self.chamadas.append(("get_sheet", page_size, page))
+        inicio = (page - 1) * page_size if page_size else 0
+        fim = min(inicio + page_size, self.n_linhas) if page_size else self.n_linhas
+        ids_colunas = None if column_ids is None else set(column_ids)
+        colunas = [c for c in self.colunas if ids_colunas is None or c.id in ids_colunas]
+        linhas = []
+        for i in range(inicio, fim):
+            linha = self._linha(i, self.colunas)
+            linha.cells = [c for c in linha.cells if ids_colunas is None or c.column_id in ids_colunas]
+            linhas.append(linha)
+
+        sheet = SimpleNamespace(id=self.sheet_id, version=self.version, columns=colunas, rows=linhas,
+                                total_row_count=self.n_linhas)
+        # Simula edição concorrente: a versão muda logo depois da página indicada (uma vez)
+        if self.alterar_apos_pagina is not None and page == self.alterar_apos_pagina:
+            self.version += 1
+            self.alterar_apos_pagina = None
+        return sheet
+
+
+class ClientePaginadoSintetico:
+    """Cliente com planilha sintética gerada sob demanda, para medir memória da leitura paginada"""
+
+    def __init__(self, n_linhas, n_colunas=40, semente=42, sheet_id=1):
+        self.Sheets = _SheetsPaginadoSintetico(n_linhas, gerar_colunas(n_colunas), semente, sheet_id)
@@ -1,22 +1,133 @@
+import os
+import threading
+
+import numpy as np
 import pandas as pd
 
+# Holiday table bundled with the app (national + PE/BA/SE state and municipal entries)
+HOLIDAYS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feriados.csv")
+# National holidays always apply; regional ones only when listed here,
+# e.g. "PE;BA/Salvador" (a state code brings its state holidays, UF/Município the municipal ones)
+LOCAL_HOLIDAYS = os.getenv("FERIADOS_LOCAIS", "")
+
+
+def load_holidays(path=HOLIDAYS_CSV, locais=LOCAL_HOLIDAYS):
+    """Holiday dates (datetime64[D], sorted, unique) that apply to the given locations"""
+    if not os.path.exists(path):
+        print(f"Arquivo de feriados '{path}' não encontrado; usando apenas fins de semana.")
+        return np.array([], dtype='datetime64[D]')
+
+    feriados = pd.read_csv(path, dtype=str, keep_default_na=False)
+    selecionados = {local.strip().upper() for local in locais.split(";") if local.strip()}
+    chave = np.where(
+        feriados["abrangencia"] == "municipal",
+        feriados["uf"].str.upper() + "/" + feriados["municipio"].str.upper(),
+        feriados["uf"].str.upper(),
+    )
+    aplica = (feriados["abrangencia"] == "nacional") | pd.Series(chave).isin(selecionados).to_numpy()
+    return np.unique(pd.to_datetime(feriados.loc[aplica, "data"]).to_numpy(dtype='datetime64[D]'))
+
+
+class BusinessCalendar:
+    """
+    Business-day calendar (Mon-Fri minus holidays) with a cumulative index.
+
+    cumulative[i] is the number of business days in [start, start + i), so the
+    inclusive count between two days inside the span is two lookups and a
+    subtraction. Days outside the span fall back to np.busday_count with the
+    same holidays.
+    """
+
+    def __init__(self, holidays=(), start=None, end=None):
+        self.holidays = np.unique(np.asarray(holidays, dtype='datetime64[D]'))
+        if start is None or end is None:
+            years = self.holidays.astype('datetime64[Y]').astype(int) + 1970
+            start = np.datetime64(f"{years.min() if len(years) else 2020}-01-01")
+            end = np.datetime64(f"{years.max() if len(years) else 2035}-12-31")
+        self.start = np.datetime64(start, 'D')
+        self.end = np.datetime64(end, 'D')
+
+        days = np.arange(self.start, self.end + np.timedelta64(1, 'D'))
+        self.cumulative = np.concatenate(([0], np.cumsum(np.is_busday(days, holidays=self.holidays))))
+        total_months = (self.end.astype('datetime64[M]') - self.start.astype('datetime64[M]')).astype(int) + 1
+        # Average business days per month over the span (replaces the fixed 21.75)
+        self.business_days_per_month = self.cumulative[-1] / total_months
+
+    def count(self, first, last):
+        """Inclusive business days in [first, last] for datetime64[D] arrays with first <= last"""
+        first_idx = (first - self.start).astype(int)
+        last_idx = (last - self.start).astype(int) + 1
+        inside = (first_idx >= 0) & (last_idx <= len(self.cumulative) - 1)
+
+        result = np.empty(first.shape, dtype=np.int64)
+        result[inside] = self.cumulative[last_idx[inside]] - self.cumulative[first_idx[inside]]
+        if not inside.all():
+            result[~inside] = np.busday_count(first[~inside], last[~inside] + np.timedelta64(1, 'D'),
+                                              holidays=self.holidays)
+        return result
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def get_calendar():
+    """Calendar shared by the whole process (all Streamlit sessions), built on first use"""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = BusinessCalendar(load_holidays())
+    return _calendar
+
+
+def _as_datetime64(values):
+    values = pd.to_datetime(values if np.ndim(values) else [values])
+    return np.asarray(values, dtype='datetime64[ns]')
+
+
+def business_days(start_array, end_array, calendar=None):
+    """
+    Vectorized business-day count between aligned start/end dates.
+
+    Same semantics as calculate_business_days: both ends are inclusive, the
+    result is negative when the end is before the start, and missing dates
+    (None/NaN/NaT) give NaN. Holidays come from the shared calendar unless
+    another BusinessCalendar is given. Accepts Series, arrays, lists or
+    scalars; a Series comes back as a Series with the same index, two
+    scalars as a float.
+    """
+    calendar = calendar or get_calendar()
+    index = start_array.index if isinstance(start_array, pd.Series) else None
+    scalar = np.ndim(start_array) == 0 and np.ndim(end_array) == 0
+
+    start_ns, end_ns = np.broadcast_arrays(_as_datetime64(start_array), _as_datetime64(end_array))
+    valid = ~(np.isnat(start_ns) | np.isnat(end_ns))
+
+    # The sign compares full timestamps; the count only looks at the day,
+    # like the normalized bdate_range of the scalar version
+    sign = np.where(end_ns[valid] < start_ns[valid], -1, 1)
+    start_day = start_ns[valid].astype('datetime64[D]')
+    end_day = end_ns[valid].astype('datetime64[D]')
+    first, last = np.minimum(start_day, end_day), np.maximum(start_day, end_day)
+
+    days = np.full(start_ns.shape, np.nan)
+    days[valid] = calendar.count(first, last) * sign
+
+    if scalar:
+        return float(days[0])
+    if index is not None:
+        return pd.Series(days, index=index)
+    return days
+
+
+def business_days_per_month():
+    """Average business days per month in the shared calendar, for duration-in-months displays"""
+    return get_calendar().business_days_per_month
+
+
 def calculate_business_days(start_date, end_date):
     if pd.isna(start_date) or pd.isna(end_date):
         return pd.NA
-    # Ensure start_date is always earlier than or equal to end_date for bdate_range
-    if start_date > end_date:
-        start_date, end_date = end_date, start_date
-        sign = -1 # Indicate that the original end date was earlier than the start date
-    else:
-        sign = 1
-    
-    # Generate a business day range and count the number of days
-    # The bdate_range includes both start and end dates if they are business days
-    # So, if start_date == end_date and it's a business day, count is 1
-    # If start_date == end_date and it's a weekend, count is 0
-    business_days = len(pd.bdate_range(start=start_date, end=end_date))
-    
-    # Adjust for the direction of the original date difference
-    return business_days * sign
-
-
+    # Scalar wrapper kept for existing callers; the counting lives in business_days
+    return int(business_days(start_date, end_date))
@@ -1,48 +1,318 @@
 import pandas as pd
+import numpy as np
 import os
+import json
+import hashlib
+import operator
 
-def tratar_e_retornar_dados_previstos():
-    """Carrega e trata os dados, retornando apenas os dados PREV com a nova ordem de etapas."""
+# Configurações
+ARQUIVO_PLANEJADOR = "BASE - VENDA E REGISTRO.xlsx"
+DIRETORIO_SNAPSHOT = ".cache_planejador"
+# Incrementar sempre que o tratamento mudar, para invalidar snapshots antigos
+VERSAO_SNAPSHOT = 2
+ABA_PLANEJADOR = "PLANEJADOR MÓDULOS"
+
+# Motor de leitura do Excel: "auto", "calamine", "openpyxl_streaming" ou "openpyxl".
+# Em "auto" os motores são tentados na ordem de MOTORES_EXCEL, caindo para o
+# próximo quando o anterior não está instalado ou falha.
+MOTOR_EXCEL = os.getenv("MOTOR_EXCEL_PLANEJADOR", "auto")
+MOTORES_EXCEL = ["calamine", "openpyxl_streaming", "openpyxl"]
+
+# Colunas separadoras da planilha (posições), descartadas no tratamento
+COLUNAS_REMOVIDAS = [0, 9, 14, 19, 24, 29, 34]
+
+### ALTERADO ### - Adicionadas as novas colunas 'M' e 'PJ' na lista de unpivot.
+COLUNAS_UNPIVOT = [
+    "DM.REAL.TÉRMINO", "DM.REAL.INÍCIO", "DM.PREV.TÉRMINO", "DM.PREV.INÍCIO",
+    "DOC.REAL.TÉRMINO", "DOC.REAL.INICIO", "DOC.PREV.TÉRMINO", "DOC.PREV.INÍCIO",
+    "LAE.REAL.TÉRMINO", "LAE.REAL.INÍCIO", "LAE.PREV.TÉRMINO", "LAE.PREV.INÍCIO",
+    "MEM.REAL.TÉRMINO", "MEM.REAL.INÍCIO", "MEM.PREV.TÉRMINO", "MEM.PREV.INÍCIO",
+    "CONT.REAL.TÉRMINO", "CONT.REAL.INÍCIO", "CONT.PREV.TÉRMINO", "CONT.PREV.INÍCIO",
+    "ASS.REAL.TÉRMINO", "ASS.REAL.INÍCIO", "ASS.PREV.TÉRMINO", "ASS.PREV.INÍCIO",
+    "M.REAL.TÉRMINO", "M.REAL.INÍCIO", "M.PREV.TÉRMINO", "M.PREV.INÍCIO",      # Nova Etapa
+    "PJ.REAL.TÉRMINO", "PJ.REAL.INÍCIO", "PJ.PREV.TÉRMINO", "PJ.PREV.INÍCIO"      # Nova Etapa
+]
+COLUNAS_PREV = [col for col in COLUNAS_UNPIVOT if col.split('.')[1] == 'PREV']
+ETAPAS_PREV = list(dict.fromkeys(col.split('.')[0] for col in COLUNAS_PREV))
+
+def calcular_assinatura_arquivo(caminho_arquivo, incluir_hash=True):
+    """Retorna tamanho, mtime e (opcionalmente) o hash SHA-256 do arquivo"""
+    info = os.stat(caminho_arquivo)
+    assinatura = {"tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+    if incluir_hash:
+        sha256 = hashlib.sha256()
+        with open(caminho_arquivo, "rb") as f:
+            for bloco in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(bloco)
+        assinatura["sha256"] = sha256.hexdigest()
+    return assinatura
+
+def _caminhos_snapshot(diretorio_base, nome):
+    diretorio = os.path.join(diretorio_base, DIRETORIO_SNAPSHOT)
+    return (
+        diretorio,
+        os.path.join(diretorio, f"{nome}.parquet"),
+        os.path.join(diretorio, f"{nome}.json"),
+    )
+
+def carregar_snapshot(caminho_arquivo, nome="previstos"):
+    """
+    Retorna o DataFrame PREV salvo em Parquet se o snapshot corresponder ao
+    arquivo Excel atual; caso contrário retorna None.
+
+    Tamanho e mtime iguais bastam para reaproveitar o snapshot. Se apenas o
+    mtime mudou (ex.: arquivo copiado de novo), o hash do conteúdo decide.
+    """
+    try:
+        _, caminho_parquet, caminho_meta = _caminhos_snapshot(os.path.dirname(caminho_arquivo), nome)
+        if not os.path.exists(caminho_parquet) or not os.path.exists(caminho_meta):
+            return None
+
+        with open(caminho_meta, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("versao") != VERSAO_SNAPSHOT:
+            return None
+
+        assinatura = calcular_assinatura_arquivo(caminho_arquivo, incluir_hash=False)
+        if assinatura["tamanho"] != meta.get("tamanho"):
+            return None
+
+        if assinatura["mtime_ns"] != meta.get("mtime_ns"):
+            assinatura = calcular_assinatura_arquivo(caminho_arquivo)
+            if assinatura["sha256"] != meta.get("sha256"):
+                return None
+            # Conteúdo idêntico: atualiza o mtime para evitar recalcular o hash
+            meta["mtime_ns"] = assinatura["mtime_ns"]
+            _gravar_json_atomico(caminho_meta, meta)
+
+        df = pd.read_parquet(caminho_parquet)
+        # O Parquet só aceita nomes de coluna em texto; restaura os originais (inclusive NaN)
+        df.columns = [np.nan if col is None else col for col in meta["colunas"]]
+        for col in meta.get("colunas_data", []):
+            df[col] = pd.to_datetime(df[col], errors="coerce").dt.date
+        return df
+
+    except Exception as e:
+        print(f"Aviso: snapshot do planejador ignorado ({str(e)})")
+        return None
+
+def salvar_snapshot(df, caminho_arquivo, assinatura, nome="previstos"):
+    """Grava o DataFrame PREV tratado em Parquet junto com a assinatura do Excel"""
+    try:
+        diretorio, caminho_parquet, caminho_meta = _caminhos_snapshot(os.path.dirname(caminho_arquivo), nome)
+        os.makedirs(diretorio, exist_ok=True)
+
+        colunas = [None if pd.isna(col) else col for col in df.columns]
+        colunas_data = [col for col in ["Valor"] if col in df.columns]
+        df_gravar = df.copy()
+        df_gravar.columns = [str(i) for i in range(len(df_gravar.columns))]
+
+        caminho_temp = f"{caminho_parquet}.{os.getpid()}.tmp"
+        df_gravar.to_parquet(caminho_temp, index=False)
+        os.replace(caminho_temp, caminho_parquet)
+
+        meta = dict(assinatura, versao=VERSAO_SNAPSHOT, colunas=colunas, colunas_data=colunas_data)
+        _gravar_json_atomico(caminho_meta, meta)
+        return True
+
+    except Exception as e:
+        print(f"Aviso: não foi possível salvar o snapshot do planejador ({str(e)})")
+        return False
+
+def _iterar_linhas_iniciais(caminho_arquivo, motor=None):
+    """
+    Itera as linhas da aba do planejador sem carregar a planilha no pandas.
+    Com o motor "auto" ou "calamine" (padrão: MOTOR_EXCEL), usa o calamine quando
+    instalado (bem mais rápido para abrir); senão openpyxl read-only.
+    """
+    motor = motor or MOTOR_EXCEL
+    if motor != "auto" and motor not in LEITORES_EXCEL:
+        motor = "auto"
+
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None and motor in ("auto", "calamine"):
+        aba = CalamineWorkbook.from_path(caminho_arquivo).get_sheet_by_name(ABA_PLANEJADOR)
+        # O calamine omite as colunas vazias à esquerda; recompõe as posições absolutas
+        vazias_esquerda = [None] * (aba.start[1] if aba.start else 0)
+        for linha in aba.iter_rows():
+            yield vazias_esquerda + linha
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        yield from wb[ABA_PLANEJADOR].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+def resolver_colunas_projetadas(caminho_arquivo, motor=None):
+    """
+    Lê apenas o início da aba até encontrar a linha de cabeçalho (a primeira com
+    UGB e Nº LOTES preenchidos) e retorna as posições das colunas fixas e das
+    colunas PREV. As colunas REAL nunca são carregadas. `motor` como em
+    ler_aba_planejador.
+    """
+    cabecalho = None
+    for linha in _iterar_linhas_iniciais(caminho_arquivo, motor):
+        if len(linha) > 4 and linha[1] not in (None, "") and linha[4] not in (None, ""):
+            cabecalho = [None if v == "" else v for v in linha]
+            break
+
+    if cabecalho is None:
+        return None
+
+    posicoes = []
+    for posicao, nome in enumerate(cabecalho):
+        if posicao in COLUNAS_REMOVIDAS:
+            continue
+        # Colunas fixas (tudo que não é etapa) + apenas as etapas PREV
+        if nome not in COLUNAS_UNPIVOT or nome in COLUNAS_PREV:
+            posicoes.append(posicao)
+    return posicoes
+
+def _ler_excel_calamine(caminho_arquivo, colunas=None):
+    # Requer o pacote python-calamine (leitor em Rust)
+    return pd.read_excel(caminho_arquivo, sheet_name=ABA_PLANEJADOR, header=None,
+                         usecols=colunas, engine="calamine")
+
+def _ler_excel_openpyxl(caminho_arquivo, colunas=None):
+    return pd.read_excel(caminho_arquivo, sheet_name=ABA_PLANEJADOR, header=None,
+                         usecols=colunas, engine="openpyxl")
+
+def _ler_excel_openpyxl_streaming(caminho_arquivo, colunas=None):
+    """
+    Percorre a aba em modo read-only, linha a linha, já selecionando apenas as
+    colunas pedidas. O resultado tem o mesmo formato de pd.read_excel(header=None).
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    try:
+        ws = wb[ABA_PLANEJADOR]
+        if colunas is None:
+            linhas = ws.iter_rows(values_only=True)
+            dados = [tuple(np.nan if v is None else v for v in linha) for linha in linhas]
+            df = pd.DataFrame(dados)
+        else:
+            colunas = sorted(colunas)
+            seletor = operator.itemgetter(*colunas)
+            linhas = ws.iter_rows(max_col=colunas[-1] + 1, values_only=True)
+            if len(colunas) == 1:
+                dados = [(np.nan if linha[colunas[0]] is None else linha[colunas[0]],) for linha in linhas]
+            else:
+                dados = [tuple(np.nan if v is None else v for v in seletor(linha)) for linha in linhas]
+            df = pd.DataFrame(dados, columns=colunas)
+    finally:
+        wb.close()
+
+    # Assim como o pandas, descarta as linhas vazias do final da aba
+    preenchidas = np.flatnonzero(df.notna().any(axis=1).to_numpy())
+    return df.iloc[:preenchidas[-1] + 1] if len(preenchidas) else df.iloc[:0]
+
+LEITORES_EXCEL = {
+    "calamine": _ler_excel_calamine,
+    "openpyxl_streaming": _ler_excel_openpyxl_streaming,
+    "openpyxl": _ler_excel_openpyxl,
+}
+
+def ler_aba_planejador(caminho_arquivo, colunas=None, motor=None):
+    """
+    Lê a aba do planejador (header=None) com o motor configurado.
+    Se o motor escolhido não estiver disponível, tenta os demais em ordem.
+    """
+    motor = motor or MOTOR_EXCEL
+    if motor != "auto" and motor not in LEITORES_EXCEL:
+        print(f"Aviso: motor Excel '{motor}' desconhecido; usando 'auto'")
+        motor = "auto"
+
+    ordem = MOTORES_EXCEL if motor == "auto" else [motor] + [m for m in MOTORES_EXCEL if m != motor]
+    erro = None
+    for nome in ordem:
+        try:
+            return LEITORES_EXCEL[nome](caminho_arquivo, colunas)
+        except Exception as e:
+            print(f"Aviso: motor Excel '{nome}' falhou ({str(e)}); tentando o próximo")
+            erro = e
+    raise erro
+
+def _gravar_json_atomico(caminho, conteudo):
+    caminho_temp = f"{caminho}.{os.getpid()}.tmp"
+    with open(caminho_temp, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, ensure_ascii=False)
+    os.replace(caminho_temp, caminho)
+
+def _caminho_planejador():
+    # O ideal é usar um caminho absoluto ou garantir que o script e o arquivo estejam no mesmo local.
+    # Para este exemplo, vou assumir que o arquivo está no mesmo diretório do script.
+    diretorio_atual = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(diretorio_atual, ARQUIVO_PLANEJADOR)
+
+def _ler_planilha_planejador(caminho_arquivo, projetar_colunas=True, motor=None):
+    """
+    Lê a aba do planejador e promove a linha de cabeçalho.
+    Retorna (df, colunas_unpivot) ou (None, None) se a estrutura não for a esperada.
+    """
+    colunas_projetadas = resolver_colunas_projetadas(caminho_arquivo, motor) if projetar_colunas else None
+
+    if colunas_projetadas:
+        # CARREGAR SOMENTE AS COLUNAS NECESSÁRIAS (as removidas já ficam de fora)
+        df = ler_aba_planejador(caminho_arquivo, colunas_projetadas, motor)
+        colunas_unpivot = COLUNAS_PREV
+    else:
+        df = ler_aba_planejador(caminho_arquivo, motor=motor)
+
+        # REMOVER COLUNAS ESPECÍFICAS
+        df = df.drop(columns=COLUNAS_REMOVIDAS)
+        colunas_unpivot = COLUNAS_UNPIVOT
+
+    # FILTRAR LINHAS
+    df = df[df[1].notna() & df[4].notna()].copy()
+
+    # PROMOVER CABEÇALHOS
+    df.columns = df.iloc[0]
+    df = df.drop(df.index[0]).reset_index(drop=True)
+
+    if 'UGB' not in df.columns or 'Nº LOTES' not in df.columns:
+        print("Erro: Estrutura de colunas diferente do esperado.")
+        return None, None
+
+    return df, colunas_unpivot
+
+def tratar_e_retornar_dados_previstos(usar_snapshot=True, projetar_colunas=True):
+    """
+    Carrega e trata os dados, retornando apenas os dados PREV com a nova ordem de etapas.
+
+    Com projetar_colunas=True o cabeçalho é resolvido antes e só as colunas fixas e
+    PREV são lidas do Excel, sem materializar nem despivotar as colunas REAL.
+    """
     try:
         # 1. CARREGAR OS DADOS
-        # O ideal é usar um caminho absoluto ou garantir que o script e o arquivo estejam no mesmo local.
-        # Para este exemplo, vou assumir que o arquivo está no mesmo diretório do script.
-        diretorio_atual = os.path.dirname(os.path.abspath(__file__))
-        caminho_arquivo = os.path.join(diretorio_atual, "BASE - VENDA E REGISTRO.xlsx")
+        caminho_arquivo = _caminho_planejador()
         
         if not os.path.exists(caminho_arquivo):
             print(f"Erro: Arquivo não encontrado no caminho: {caminho_arquivo}")
             return None
 
-        df = pd.read_excel(caminho_arquivo, sheet_name="PLANEJADOR MÓDULOS", header=None)
-
-        # 2. REMOVER COLUNAS ESPECÍFICAS
-        df = df.drop(columns=[0, 9, 14, 19, 24, 29, 34])
-
-        # 3. FILTRAR LINHAS
-        df = df[df[1].notna() & df[4].notna()].copy()
-
-        # 4. PROMOVER CABEÇALHOS
-        df.columns = df.iloc[0]
-        df = df.drop(df.index[0]).reset_index(drop=True)
+        if usar_snapshot:
+            df_snapshot = carregar_snapshot(caminho_arquivo)
+            if df_snapshot is not None:
+                return df_snapshot
+            # Assinatura calculada antes da leitura: se o arquivo mudar durante
+            # o parse, o próximo carregamento detecta a divergência
+            assinatura = calcular_assinatura_arquivo(caminho_arquivo)
 
-        if 'UGB' not in df.columns or 'Nº LOTES' not in df.columns:
-            print("Erro: Estrutura de colunas diferente do esperado.")
+        # 2-4. LER, FILTRAR LINHAS E PROMOVER CABEÇALHOS
+        df, colunas_unpivot = _ler_planilha_planejador(caminho_arquivo, projetar_colunas)
+        if df is None:
             return None
 
         # 5. UNPIVOT (transformar colunas em linhas)
-        ### ALTERADO ### - Adicionadas as novas colunas 'M' e 'PJ' na lista de unpivot.
-        colunas_unpivot = [
-            "DM.REAL.TÉRMINO", "DM.REAL.INÍCIO", "DM.PREV.TÉRMINO", "DM.PREV.INÍCIO",
-            "DOC.REAL.TÉRMINO", "DOC.REAL.INICIO", "DOC.PREV.TÉRMINO", "DOC.PREV.INÍCIO",
-            "LAE.REAL.TÉRMINO", "LAE.REAL.INÍCIO", "LAE.PREV.TÉRMINO", "LAE.PREV.INÍCIO",
-            "MEM.REAL.TÉRMINO", "MEM.REAL.INÍCIO", "MEM.PREV.TÉRMINO", "MEM.PREV.INÍCIO",
-            "CONT.REAL.TÉRMINO", "CONT.REAL.INÍCIO", "CONT.PREV.TÉRMINO", "CONT.PREV.INÍCIO",
-            "ASS.REAL.TÉRMINO", "ASS.REAL.INÍCIO", "ASS.PREV.TÉRMINO", "ASS.PREV.INÍCIO",
-            "M.REAL.TÉRMINO", "M.REAL.INÍCIO", "M.PREV.TÉRMINO", "M.PREV.INÍCIO",      # Nova Etapa
-            "PJ.REAL.TÉRMINO", "PJ.REAL.INÍCIO", "PJ.PREV.TÉRMINO", "PJ.PREV.INÍCIO"      # Nova Etapa
-        ]
-        
         colunas_fixas = [col for col in df.columns if col not in colunas_unpivot]
         df_unpivoted = pd.melt(
             df,
@@ -79,12 +349,86 @@ def tratar_e_retornar_dados_previstos():
         # Ordena o DataFrame final pela ordem definida
         df_final = df_final.sort_values(by=['UGB', 'MÓDULO', 'Ordem_Etapa']).reset_index(drop=True)
 
+        # 10. SALVAR SNAPSHOT PARA OS PRÓXIMOS CARREGAMENTOS
+        if usar_snapshot:
+            salvar_snapshot(df_final, caminho_arquivo, assinatura)
+
         return df_final
 
     except Exception as e:
         print(f"Erro durante o processamento: {str(e)}")
         return None
 
+
+def tratar_e_retornar_previstos_por_etapa(usar_snapshot=True):
+    """
+    Retorna os dados PREV já no formato usado pelo app: uma linha por
+    UGB/Empreendimento/Etapa com Inicio_Prevista e Termino_Prevista.
+
+    Os nomes das colunas PREV são interpretados uma única vez (Etapa, Tipo,
+    Inicio_Fim) e as datas são remodeladas por array, sem melt, split por
+    linha ou pivot de volta.
+    """
+    try:
+        caminho_arquivo = _caminho_planejador()
+
+        if not os.path.exists(caminho_arquivo):
+            print(f"Erro: Arquivo não encontrado no caminho: {caminho_arquivo}")
+            return None
+
+        if usar_snapshot:
+            df_snapshot = carregar_snapshot(caminho_arquivo, nome="previstos_por_etapa")
+            if df_snapshot is not None:
+                return df_snapshot
+            assinatura = calcular_assinatura_arquivo(caminho_arquivo)
+
+        df, _ = _ler_planilha_planejador(caminho_arquivo)
+        if df is None:
+            return None
+
+        # Nomes "ETAPA.PREV.INÍCIO" -> MultiIndex (Etapa, Tipo, Inicio_Fim)
+        datas = df[COLUNAS_PREV]
+        datas.columns = pd.MultiIndex.from_tuples(
+            [tuple(col.split('.')) for col in COLUNAS_PREV],
+            names=['Etapa', 'Tipo', 'Inicio_Fim']
+        )
+        datas = datas.droplevel('Tipo', axis=1)
+
+        # Matrizes (módulos x etapas), achatadas linha a linha: módulo 1 etapas 1..8, módulo 2...
+        n_etapas = len(ETAPAS_PREV)
+        inicio = datas.xs('INÍCIO', level='Inicio_Fim', axis=1)[ETAPAS_PREV].to_numpy().ravel()
+        termino = datas.xs('TÉRMINO', level='Inicio_Fim', axis=1)[ETAPAS_PREV].to_numpy().ravel()
+
+        df_etapas = pd.DataFrame({
+            'UGB': np.repeat(df['UGB'].astype(str).to_numpy(), n_etapas),
+            'Empreendimento': np.repeat(df['EMP'].astype(str).to_numpy(), n_etapas),
+            'MÓDULO': np.repeat(df['MÓDULO'].astype(str).to_numpy(), n_etapas),
+            'Etapa': np.tile(ETAPAS_PREV, len(df)),
+            'Inicio_Prevista': pd.to_datetime(pd.Series(inicio), errors='coerce').dt.normalize(),
+            'Termino_Prevista': pd.to_datetime(pd.Series(termino), errors='coerce').dt.normalize(),
+        })
+
+        # Etapas sem nenhuma data prevista não entram (mesmo efeito do antigo pivot_table)
+        df_etapas = df_etapas[df_etapas['Inicio_Prevista'].notna() | df_etapas['Termino_Prevista'].notna()]
+
+        # Módulos repetidos para o mesmo empreendimento: primeira data preenchida de cada coluna,
+        # na ordem UGB/MÓDULO (a mesma que o antigo pivot_table recebia de tratar_e_retornar_dados_previstos)
+        if df_etapas.duplicated(['UGB', 'Empreendimento', 'Etapa']).any():
+            df_etapas = df_etapas.sort_values(['UGB', 'MÓDULO'], kind='stable')
+            df_etapas = df_etapas.groupby(['UGB', 'Empreendimento', 'Etapa'], as_index=False).first()
+        else:
+            df_etapas = df_etapas.sort_values(['UGB', 'Empreendimento', 'Etapa'])
+        df_etapas = df_etapas.drop(columns='MÓDULO').reset_index(drop=True)
+
+        if usar_snapshot:
+            salvar_snapshot(df_etapas, caminho_arquivo, assinatura, nome="previstos_por_etapa")
+
+        return df_etapas
+
+    except Exception as e:
+        print(f"Erro durante o processamento: {str(e)}")
+        return None
+
 # Executa a função e mostra o resultado
 if __name__ == "__main__":
     dados_previstos = tratar_e_retornar_dados_previstos()
@@ -1,14 +1,44 @@
 import pandas as pd
+import numpy as np
 import smartsheet
 import os
 from dotenv import load_dotenv
 import streamlit as st
 import sys
-from datetime import datetime
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 # Configurações
 SHEET_NAME = "MÓDULOS DE VENDA"
+# Planilhas lidas (uma por regional), separadas por ";" em SMARTSHEET_SHEETS
+SHEET_NAMES = [nome.strip() for nome in os.getenv("SMARTSHEET_SHEETS", SHEET_NAME).split(";") if nome.strip()]
+# Coluna com o nome da planilha de origem de cada linha
+COLUNA_ORIGEM = "Planilha"
+# Conexões do cliente compartilhado (= planilhas buscadas em paralelo)
+MAX_CONEXOES = int(os.getenv("SMARTSHEET_MAX_CONEXOES", "4"))
+# Repetição de chamadas limitadas pela API (429) ou com falha temporária
+MAX_TENTATIVAS = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAXIMO = 30.0
 OUTPUT_CSV = "modulos_venda_tratados.csv"
+OUTPUT_PARQUET = "modulos_venda_tratados.parquet"
+# Registro nome -> ID das planilhas, ao lado do CSV, para não listar todas a cada atualização
+REGISTRO_IDS = os.path.join(os.path.dirname(OUTPUT_CSV), "smartsheet_ids.json")
+# Sincronização incremental: estado local (versão, última sincronização e linhas por ID), um arquivo por planilha
+SINCRONIZACAO_INCREMENTAL = os.getenv("SMARTSHEET_SYNC_INCREMENTAL", "1") == "1"
+ARQUIVO_SINCRONIZACAO = os.path.join(os.path.dirname(OUTPUT_CSV), "smartsheet_sync.json")
+# Folga aplicada ao "modificado desde" para cobrir diferença de relógio com o servidor
+MARGEM_SINCRONIZACAO = timedelta(minutes=5)
+# Linhas por requisição na leitura paginada (0 = planilha inteira numa requisição só). Vale também para o
+# delta e a listagem de IDs da sincronização incremental, mas o estado local dela guarda a planilha inteira:
+# memória limitada pela página só com SMARTSHEET_SYNC_INCREMENTAL=0
+TAMANHO_PAGINA = int(os.getenv("SMARTSHEET_PAGE_SIZE", "5000"))
+# Colunas consumidas pelo dashboard; as demais não são baixadas (None = todas)
+COLUNAS_UTILIZADAS = ["Nome da tarefa", "Atividade", "Módulo", "Iniciar", "Terminar", "% concluído"]
 
 def carregar_configuracao():
     """Carrega as configurações e verifica o ambiente"""
@@ -31,18 +61,104 @@ def carregar_configuracao():
         print(f"\nERRO DE CONFIGURAÇÃO: {str(e)}")
         return None
 
+def _deve_repetir(erro):
+    """
+    Limite de requisições (429) e falhas temporárias que a própria API marca
+    como repetíveis (4001, 4002, 4004, 503...). O SDK não repassa essa marca
+    ao ApiError: ela fica no resultado do erro (erro.error.result.should_retry).
+    """
+    if not isinstance(erro, smartsheet.exceptions.ApiError):
+        return False
+    resultado = getattr(erro.error, "result", None)
+    status = getattr(resultado, "status_code", None)
+    return bool(getattr(resultado, "should_retry", False)) or status == 429
+
+def chamar_com_backoff(funcao, *args, **kwargs):
+    """Chama a API repetindo com backoff exponencial e jitter completo enquanto houver limite de requisições ou falha temporária"""
+    for tentativa in range(MAX_TENTATIVAS):
+        try:
+            return funcao(*args, **kwargs)
+        except Exception as erro:
+            if tentativa == MAX_TENTATIVAS - 1 or not _deve_repetir(erro):
+                raise
+            espera = random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** tentativa))
+            print(f"⏳ Limite de requisições ou falha temporária da API; nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+
+class ClienteComBackoff:
+    """Repassa as chamadas de client.Sheets aplicando chamar_com_backoff"""
+
+    def __init__(self, client):
+        self._client = client
+        self.Sheets = _SheetsComBackoff(client.Sheets)
+
+    def __getattr__(self, nome):
+        return getattr(self._client, nome)
+
+class _SheetsComBackoff:
+    def __init__(self, sheets):
+        self._sheets = sheets
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._sheets, nome)
+        if not callable(atributo):
+            return atributo
+        return lambda *args, **kwargs: chamar_com_backoff(atributo, *args, **kwargs)
+
 def setup_smartsheet_client(token):
-    """Configura o cliente Smartsheet"""
+    """Configura o cliente Smartsheet (um só, com pool de conexões, compartilhado entre as planilhas)"""
     try:
-        client = smartsheet.Smartsheet(token)
+        # A repetição fica com chamar_com_backoff, que repete os mesmos erros que o SDK
+        # repetiria (should_retry do resultado); a do SDK é desligada para não somar esperas
+        client = smartsheet.Smartsheet(token, max_connections=MAX_CONEXOES, max_retry_time=0)
         client.errors_as_exceptions(True)
-        return client
+        return ClienteComBackoff(client)
     except Exception as e:
         print(f"\nERRO: Falha ao configurar cliente Smartsheet - {str(e)}")
         return None
 
+def carregar_registro_ids():
+    """Lê o registro local nome -> ID de planilha (vazio se não existir ou estiver corrompido)"""
+    try:
+        with open(REGISTRO_IDS, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_trava_registro = threading.Lock()
+
+def salvar_registro_id(sheet_name, sheet_id):
+    """Grava o ID no registro local (escrita atômica)"""
+    # Várias planilhas podem ser resolvidas ao mesmo tempo: a leitura+gravação não pode se intercalar
+    with _trava_registro:
+        try:
+            registro = carregar_registro_ids()
+            registro[sheet_name] = sheet_id
+            caminho_temp = f"{REGISTRO_IDS}.{os.getpid()}.tmp"
+            with open(caminho_temp, "w", encoding="utf-8") as f:
+                json.dump(registro, f, ensure_ascii=False, indent=2)
+            os.replace(caminho_temp, REGISTRO_IDS)
+        except OSError as e:
+            print(f"⚠️ Não foi possível salvar o registro de IDs: {str(e)}")
+
+def validar_sheet_id(client, sheet_id, sheet_name):
+    """Confere com uma chamada leve (uma linha) se o ID ainda aponta para a planilha"""
+    try:
+        sheet = client.Sheets.get_sheet(sheet_id, page_size=1)
+        return sheet.name == sheet_name
+    except Exception as e:
+        print(f"ID em cache ({sheet_id}) inválido: {str(e)}")
+        return False
+
 def get_sheet_id(client, sheet_name):
     """Obtém o ID da planilha"""
+    sheet_id = carregar_registro_ids().get(sheet_name)
+    if sheet_id:
+        if validar_sheet_id(client, sheet_id, sheet_name):
+            print(f"Planilha '{sheet_name}' encontrada no registro local (ID: {sheet_id})")
+            return sheet_id
+        print("Registro local desatualizado; buscando na lista de planilhas")
+
     try:
         print(f"\nBuscando planilha '{sheet_name}'...")
         response = client.Sheets.list_sheets(include_all=True)
@@ -50,6 +166,7 @@ def get_sheet_id(client, sheet_name):
         for sheet in response.data:
             if sheet.name == sheet_name:
                 print(f"Planilha encontrada (ID: {sheet.id})")
+                salvar_registro_id(sheet_name, sheet.id)
                 return sheet.id
         
         print(f"\nERRO: Planilha '{sheet_name}' não encontrada")
@@ -65,23 +182,111 @@ def get_sheet_id(client, sheet_name):
         print(f"\nErro inesperado ao buscar planilhas: {str(e)}")
         return None
 
-def get_sheet_data(client, sheet_id):
-    """Obtém os dados da planilha"""
+def resolver_ids_colunas(client, sheet_id, titulos=None):
+    """
+    Resolve os títulos das colunas usadas para os IDs, para pedir à API só
+    essas colunas. Retorna None (sem filtro) se não houver títulos ou se a
+    consulta falhar.
+    """
+    titulos = COLUNAS_UTILIZADAS if titulos is None else titulos
+    if not titulos:
+        return None
+
+    try:
+        response = client.Sheets.get_columns(sheet_id, include_all=True)
+        por_titulo = {col.title: col.id for col in response.data}
+    except Exception as e:
+        print(f"⚠️ Não foi possível consultar as colunas ({str(e)}); baixando todas")
+        return None
+
+    faltantes = [titulo for titulo in titulos if titulo not in por_titulo]
+    if faltantes:
+        print(f"⚠️ Colunas não encontradas na planilha: {faltantes}")
+    column_ids = [por_titulo[titulo] for titulo in titulos if titulo in por_titulo]
+    return column_ids or None
+
+def converter_linhas_para_dataframe(columns, rows):
+    """
+    Converte linhas do Smartsheet em DataFrame de forma colunar.
+
+    O mapa column_id -> posição é montado uma única vez e os valores são
+    gravados direto em listas por coluna (células ausentes ficam NaN),
+    construindo o DataFrame de uma vez no final.
+    """
+    columns = list(columns)
+    rows = list(rows)
+    posicoes = {col.id: i for i, col in enumerate(columns)}
+    valores = [[np.nan] * len(rows) for _ in columns]
+    preenchidas = [False] * len(columns)
+
+    for i, row in enumerate(rows):
+        for cell in row.cells:
+            posicao = posicoes.get(cell.column_id)
+            if posicao is not None:
+                valores[posicao][i] = cell.value
+                preenchidas[posicao] = True
+
+    # Só entram colunas com ao menos uma célula retornada (como no DataFrame de dicts)
+    return pd.DataFrame({
+        col.title: valores[i] for i, col in enumerate(columns) if preenchidas[i]
+    }, index=pd.RangeIndex(len(rows)))
+
+def iterar_paginas(client, sheet_id, column_ids=None, tamanho_pagina=None, **filtros):
+    """
+    Gera a planilha página a página (cada item é um Sheet com parte das linhas).
+    `filtros` vão direto para get_sheet (ex.: rows_modified_since).
+    """
+    tamanho_pagina = tamanho_pagina or TAMANHO_PAGINA
+    pagina, lidas = 1, 0
+    while True:
+        sheet = client.Sheets.get_sheet(sheet_id, column_ids=column_ids, page_size=tamanho_pagina, page=pagina, **filtros)
+        yield sheet
+        lidas += len(sheet.rows)
+        # Página incompleta também encerra: com filtros, total_row_count pode não ser o das linhas filtradas
+        if len(sheet.rows) < tamanho_pagina or lidas >= sheet.total_row_count:
+            return
+        pagina += 1
+
+def ler_em_paginas(client, sheet_id, converter, column_ids=None, tamanho_pagina=None, tentativas=3, **filtros):
+    """
+    Aplica `converter` a cada página e retorna (colunas, versão, resultados).
+
+    Só uma página de objetos da API fica em memória por vez. Se a versão da
+    planilha mudar no meio da leitura, as páginas não são mais coerentes entre
+    si e a leitura recomeça.
+    """
+    for _ in range(tentativas):
+        colunas, versao, resultados = None, None, []
+        for sheet in iterar_paginas(client, sheet_id, column_ids, tamanho_pagina, **filtros):
+            if versao is None:
+                colunas, versao = list(sheet.columns), sheet.version
+            elif sheet.version != versao:
+                print("⚠️ Planilha alterada durante a leitura paginada; recomeçando")
+                break
+            resultados.append(converter(sheet))
+        else:
+            return colunas, versao, resultados
+    raise RuntimeError("planilha alterada durante todas as tentativas de leitura paginada")
+
+def get_sheet_data_paginado(client, sheet_id, column_ids=None, tamanho_pagina=None):
+    """Lê a planilha em páginas, convertendo cada uma num bloco colunar, e junta os blocos"""
+    colunas, _, blocos = ler_em_paginas(
+        client, sheet_id, lambda sheet: converter_linhas_para_dataframe(sheet.columns, sheet.rows),
+        column_ids, tamanho_pagina,
+    )
+    df = pd.concat(blocos, ignore_index=True)
+    # Mesma ordem de colunas da conversão numa página só
+    return df[[col.title for col in colunas if col.title in df.columns]]
+
+def get_sheet_data(client, sheet_id, column_ids=None):
+    """Obtém os dados da planilha (só as colunas em column_ids, se informado)"""
     try:
         print("\nObtendo dados da planilha...")
-        sheet = client.Sheets.get_sheet(sheet_id)
-        
-        # Converter para DataFrame de forma eficiente
-        rows = []
-        for row in sheet.rows:
-            row_data = {}
-            for cell in row.cells:
-                column_name = next((col.title for col in sheet.columns if col.id == cell.column_id), None)
-                if column_name:
-                    row_data[column_name] = cell.value
-            rows.append(row_data)
-        
-        df = pd.DataFrame(rows)
+        if TAMANHO_PAGINA:
+            df = get_sheet_data_paginado(client, sheet_id, column_ids)
+        else:
+            sheet = client.Sheets.get_sheet(sheet_id, column_ids=column_ids)
+            df = converter_linhas_para_dataframe(sheet.columns, sheet.rows)
         print(f"✅ Dados obtidos ({len(df)} linhas)")
         return df
     
@@ -89,6 +294,162 @@ def get_sheet_data(client, sheet_id):
         print(f"\n❌ Falha ao obter dados: {str(e)}")
         return pd.DataFrame()
 
+def _arquivo_sincronizacao(sheet_id):
+    base, extensao = os.path.splitext(ARQUIVO_SINCRONIZACAO)
+    return f"{base}_{sheet_id}{extensao}"
+
+def carregar_estado_sincronizacao(sheet_id):
+    """Lê o estado local da sincronização incremental (None se não existir)"""
+    try:
+        with open(_arquivo_sincronizacao(sheet_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def salvar_estado_sincronizacao(estado):
+    """Grava o estado local da sincronização (escrita atômica)"""
+    try:
+        caminho = _arquivo_sincronizacao(estado["sheet_id"])
+        caminho_temp = f"{caminho}.{os.getpid()}.tmp"
+        with open(caminho_temp, "w", encoding="utf-8") as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(caminho_temp, caminho)
+    except OSError as e:
+        print(f"⚠️ Não foi possível salvar o estado da sincronização: {str(e)}")
+
+def _linhas_para_estado(rows):
+    """Linhas da API -> {row_id: {column_id: valor}} (chaves em texto, como no JSON)"""
+    return {
+        str(row.id): {str(cell.column_id): cell.value for cell in row.cells}
+        for row in rows
+    }
+
+def dataframe_do_estado(estado):
+    """Monta o DataFrame a partir do armazenamento local, no mesmo formato de get_sheet_data"""
+    colunas = estado["colunas"]
+    linhas = list(estado["linhas"].values())
+    posicoes = {str(col["id"]): i for i, col in enumerate(colunas)}
+    valores = [[np.nan] * len(linhas) for _ in colunas]
+    preenchidas = [False] * len(colunas)
+
+    for i, celulas in enumerate(linhas):
+        for column_id, valor in celulas.items():
+            posicao = posicoes.get(column_id)
+            if posicao is not None:
+                valores[posicao][i] = valor
+                preenchidas[posicao] = True
+
+    return pd.DataFrame({
+        col["title"]: valores[i] for i, col in enumerate(colunas) if preenchidas[i]
+    }, index=pd.RangeIndex(len(linhas)))
+
+def _ler_convertido(client, sheet_id, converter, column_ids=None, **filtros):
+    """
+    Como ler_em_paginas, em páginas de TAMANHO_PAGINA; com TAMANHO_PAGINA=0,
+    numa chamada só. Retorna (colunas, versão, resultados por página).
+    """
+    if TAMANHO_PAGINA:
+        return ler_em_paginas(client, sheet_id, converter, column_ids, **filtros)
+    sheet = client.Sheets.get_sheet(sheet_id, column_ids=column_ids, **filtros)
+    return sheet.columns, sheet.version, [converter(sheet)]
+
+def _ler_linhas_para_estado(client, sheet_id, column_ids=None, **filtros):
+    """(colunas, versão, {row_id: {column_id: valor}}) lendo uma página por vez"""
+    colunas, versao, paginas = _ler_convertido(
+        client, sheet_id, lambda sheet: _linhas_para_estado(sheet.rows), column_ids, **filtros
+    )
+    linhas = {}
+    for pagina in paginas:
+        linhas.update(pagina)
+    return colunas, versao, linhas
+
+def _sincronizacao_completa(client, sheet_id, inicio, column_ids=None):
+    print("\nSincronização completa da planilha...")
+    colunas, versao, linhas = _ler_linhas_para_estado(client, sheet_id, column_ids)
+    return {
+        "sheet_id": sheet_id,
+        "versao": versao,
+        "ultima_sincronizacao": inicio.isoformat(),
+        "colunas": [{"id": col.id, "title": col.title} for col in colunas],
+        "linhas": linhas,
+    }
+
+def _sincronizacao_delta(client, sheet_id, estado, inicio, column_ids=None):
+    """
+    Aplica ao estado só as linhas modificadas desde a última sincronização e
+    remove as excluídas. Retorna None quando é preciso refazer a carga completa.
+    """
+    versao = client.Sheets.get_sheet_version(sheet_id).version
+    if versao == estado["versao"]:
+        print("\nPlanilha sem alterações desde a última sincronização")
+        estado["ultima_sincronizacao"] = inicio.isoformat()
+        return estado
+
+    desde = datetime.fromisoformat(estado["ultima_sincronizacao"]) - MARGEM_SINCRONIZACAO
+    colunas_api, versao_delta, modificadas = _ler_linhas_para_estado(
+        client, sheet_id, column_ids, rows_modified_since=desde.strftime("%Y-%m-%dT%H:%M:%SZ")
+    )
+
+    # Mudança de estrutura (colunas criadas/removidas/renomeadas ou outro filtro): recarrega tudo
+    colunas = [{"id": col.id, "title": col.title} for col in colunas_api]
+    if colunas != estado["colunas"]:
+        print("Estrutura de colunas alterada; refazendo a carga completa")
+        return None
+
+    linhas = estado["linhas"]
+    linhas.update(modificadas)
+
+    # Exclusões: lista só os IDs (uma coluna, em páginas) e reordena como na planilha
+    coluna_chave = next((col for col in colunas_api if getattr(col, "primary", False)), colunas_api[0])
+    _, _, paginas_ids = _ler_convertido(
+        client, sheet_id, lambda sheet: [str(row.id) for row in sheet.rows], [coluna_chave.id]
+    )
+    ids_atuais = [row_id for pagina in paginas_ids for row_id in pagina]
+    faltantes = [row_id for row_id in ids_atuais if row_id not in linhas]
+    if faltantes:
+        print(f"{len(faltantes)} linha(s) ausentes no armazenamento local; refazendo a carga completa")
+        return None
+
+    removidas = len(linhas) - len(ids_atuais)
+    estado["linhas"] = {row_id: linhas[row_id] for row_id in ids_atuais}
+    estado["versao"] = versao_delta
+    estado["ultima_sincronizacao"] = inicio.isoformat()
+    print(f"✅ Delta aplicado: {len(modificadas)} linha(s) modificada(s), {removidas} removida(s)")
+    return estado
+
+def sincronizar_sheet_data(client, sheet_id, column_ids=None):
+    """
+    Obtém os dados da planilha de forma incremental.
+
+    Guarda localmente a versão da planilha, o horário da última sincronização e
+    as linhas por ID. Nas próximas chamadas, busca só as linhas modificadas desde
+    então, remove as excluídas (via listagem leve de IDs) e monta o DataFrame a
+    partir do armazenamento local. O resultado é o mesmo de get_sheet_data.
+    """
+    inicio = datetime.now(timezone.utc)
+    try:
+        estado = carregar_estado_sincronizacao(sheet_id)
+        if estado is not None and estado.get("sheet_id") == sheet_id:
+            try:
+                estado = _sincronizacao_delta(client, sheet_id, estado, inicio, column_ids)
+            except Exception as e:
+                print(f"⚠️ Falha na sincronização incremental ({str(e)}); refazendo a carga completa")
+                estado = None
+        else:
+            estado = None
+
+        if estado is None:
+            estado = _sincronizacao_completa(client, sheet_id, inicio, column_ids)
+
+        salvar_estado_sincronizacao(estado)
+        df = dataframe_do_estado(estado)
+        print(f"✅ Dados obtidos ({len(df)} linhas)")
+        return df
+
+    except Exception as e:
+        print(f"\n❌ Falha ao obter dados: {str(e)}")
+        return pd.DataFrame()
+
 def process_data(df):
     """Processa e limpa os dados"""
     if df.empty:
@@ -170,11 +531,25 @@ def process_data(df):
         print(f"\n❌ ERRO NO PROCESSAMENTO: {str(e)}")
         return pd.DataFrame()
 
-def salvar_resultados(df):
-    """Salva os dados processados em CSV"""
+def _gravar_atomico(caminho, gravar):
+    """Grava em arquivo temporário e substitui o destino de uma vez, evitando leituras de arquivo pela metade"""
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        gravar(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+def salvar_resultados(df, salvar_csv=True, salvar_parquet=False):
+    """Salva os dados processados em CSV e/ou Parquet"""
     try:
-        df.to_csv(OUTPUT_CSV, index=False, encoding='utf-8-sig')
-        print(f"\n💾 Arquivo salvo com sucesso: {OUTPUT_CSV}")
+        if salvar_csv:
+            _gravar_atomico(OUTPUT_CSV, lambda caminho: df.to_csv(caminho, index=False, encoding='utf-8-sig'))
+            print(f"\n💾 Arquivo salvo com sucesso: {OUTPUT_CSV}")
+        if salvar_parquet:
+            _gravar_atomico(OUTPUT_PARQUET, lambda caminho: df.to_parquet(caminho, index=False))
+            print(f"\n💾 Arquivo salvo com sucesso: {OUTPUT_PARQUET}")
         print("\n📋 Visualização dos dados:")
         print(df.head())
         return True
@@ -182,7 +557,45 @@ def salvar_resultados(df):
         print(f"\n❌ ERRO AO SALVAR: {str(e)}")
         return False
 
-def main():
+def obter_dados_planilha(client, sheet_name):
+    """Obtém os dados brutos de uma planilha, com a coluna de origem (vazio em caso de falha)"""
+    sheet_id = get_sheet_id(client, sheet_name)
+    if not sheet_id:
+        return pd.DataFrame()
+
+    # Só as colunas usadas pelo dashboard
+    column_ids = resolver_ids_colunas(client, sheet_id)
+    if SINCRONIZACAO_INCREMENTAL:
+        df = sincronizar_sheet_data(client, sheet_id, column_ids)
+    else:
+        df = get_sheet_data(client, sheet_id, column_ids)
+    if not df.empty:
+        df[COLUNA_ORIGEM] = sheet_name
+    return df
+
+def obter_dados_planilhas(client, sheet_names):
+    """
+    Busca várias planilhas em paralelo e concatena o resultado (na ordem de
+    sheet_names). Se alguma falhar, retorna vazio: dados parciais de uma
+    regional não devem substituir o último resultado completo.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONEXOES, len(sheet_names)))) as executor:
+        resultados = list(executor.map(lambda nome: obter_dados_planilha(client, nome), sheet_names))
+
+    falhas = [nome for nome, df in zip(sheet_names, resultados) if df.empty]
+    if falhas:
+        print(f"\n❌ Sem dados das planilhas: {falhas}")
+        return pd.DataFrame()
+    return pd.concat(resultados, ignore_index=True)
+
+def obter_dados_processados(salvar_csv=True, salvar_parquet=False):
+    """
+    Executa o pipeline do Smartsheet e retorna o DataFrame tratado, já tipado.
+
+    A gravação em CSV/Parquet é apenas uma saída adicional (para consulta e
+    como último dado conhecido); quem chama não precisa reler o arquivo.
+    Retorna None se alguma etapa falhar.
+    """
     print("\n" + "="*50)
     print(" INÍCIO DO PROCESSAMENTO ".center(50, "="))
     print("="*50)
@@ -191,31 +604,31 @@ def main():
     token = carregar_configuracao()
     if not token:
         print("Aborting: No Token found.")
-        return # Substitui sys.exit(1)
+        return None
 
     # 2. Configurar cliente Smartsheet
     client = setup_smartsheet_client(token)
     if not client:
-        return # Substitui sys.exit(1)
-
-    # 3. Obter ID da planilha
-    sheet_id = get_sheet_id(client, SHEET_NAME)
-    if not sheet_id:
-        return # Substitui sys.exit(1)
+        return None
 
-    # 4. Obter dados
-    raw_data = get_sheet_data(client, sheet_id)
+    # 3/4. Obter os dados das planilhas (em paralelo, pelo mesmo cliente)
+    raw_data = obter_dados_planilhas(client, SHEET_NAMES)
     if raw_data.empty:
-        return # Substitui sys.exit(1)
+        return None
 
     # 5. Processar dados
     processed_data = process_data(raw_data)
     if processed_data.empty:
-        return # Substitui sys.exit(1)
+        return None
+
+    # 6. Salvar resultados (opcional; falha na gravação não invalida os dados)
+    if salvar_csv or salvar_parquet:
+        salvar_resultados(processed_data, salvar_csv=salvar_csv, salvar_parquet=salvar_parquet)
 
-    # 6. Salvar resultados
-    if not salvar_resultados(processed_data):
-        return # Substitui sys.exit(1)
+    return processed_data
+
+def main():
+    obter_dados_processados(salvar_csv=True)
 
 if __name__ == "__main__":
     main()